@@ -0,0 +1,155 @@
+"""Planning where an eliminated alliance's territories and players go.
+
+Deleting an alliance hands its hexes and players to the remaining alliances,
+always to the one with the fewest so far. The planners keep the remaining
+alliances in a min-heap keyed by (count, alliance id), so a plan for n
+hexes or players over k alliances costs O(n log k). Hexes are additionally
+given to a neighbouring alliance when that does not unbalance the counts:
+they are visited breadth-first from the border, so a hex deep inside the
+eliminated territory sees the owners already chosen for the hexes around it.
+
+sqllite_helper.eliminate_alliance loads the inputs and writes the plan in a
+single transaction (or only returns it, for a dry run).
+"""
+
+import heapq
+from collections import deque
+from dataclasses import dataclass, field
+
+# An adjacent alliance may be picked over the least loaded one while it has
+# at most this many more hexes.
+MAX_IMBALANCE = 1
+
+# Mission created per redistributed resource (see eliminate_alliance).
+RESOURCE_MISSION = (
+    "Resource Collection",  # deploy
+    "resource_collection",  # rules
+    None,  # cell (NULL)
+    "Collect resources from eliminated alliance reserves.",
+    None,  # winner_bonus
+    None,  # map_description
+)
+
+
+@dataclass
+class EliminationPlan:
+    """What eliminating an alliance changes; executed=False for a dry run."""
+    alliance_id: int
+    alliance_name: str
+    territories: list = field(default_factory=list)  # (new patron, hex id)
+    players: list = field(default_factory=list)  # (new alliance or 0, telegram id)
+    resources: int = 0
+    resource_missions: int = 0
+    executed: bool = False
+
+    @property
+    def player_ids(self):
+        return [telegram_id for _, telegram_id in self.players]
+
+    def summary(self):
+        return {
+            'alliance_id': self.alliance_id,
+            'alliance_name': self.alliance_name,
+            'territories': len(self.territories),
+            'players': len(self.players),
+            'resources': self.resources,
+            'resource_missions': self.resource_missions,
+            'executed': self.executed,
+        }
+
+
+class _LeastLoaded:
+    """Min-heap of alliances by count; stale entries are skipped lazily."""
+
+    def __init__(self, counts):
+        self.counts = dict(counts)
+        self._heap = [(count, alliance) for alliance, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def minimum(self):
+        while True:
+            count, alliance = self._heap[0]
+            if self.counts[alliance] == count:
+                return count, alliance
+            heapq.heappop(self._heap)
+
+    def add(self, alliance):
+        self.counts[alliance] += 1
+        heapq.heappush(self._heap, (self.counts[alliance], alliance))
+
+
+def plan_players(players, counts):
+    """
+    Assign players evenly to the alliances in counts.
+
+    Args:
+        players: telegram ids to move
+        counts: {alliance id: current player count} of the recipients
+
+    Returns:
+        list of (alliance id, telegram id)
+    """
+    if not counts:
+        return [(0, player) for player in players]
+    least = _LeastLoaded(counts)
+    assignments = []
+    for player in players:
+        _, alliance = least.minimum()
+        assignments.append((alliance, player))
+        least.add(alliance)
+    return assignments
+
+
+def _border_first(hexes, neighbours, owner, recipients):
+    """Hexes in breadth-first order, starting from all those next to a recipient."""
+    eliminated = set(hexes)
+    border = [h for h in hexes
+              if any(owner.get(n) in recipients for n in neighbours.get(h, ()))]
+    order = []
+    seen = set()
+    # Enclaves with no recipient around them are walked after the rest.
+    for seeds in [border] + [[h] for h in hexes]:
+        queue = deque(h for h in seeds if h not in seen)
+        seen.update(queue)
+        while queue:
+            current = queue.popleft()
+            order.append(current)
+            for n in neighbours.get(current, ()):
+                if n in eliminated and n not in seen:
+                    seen.add(n)
+                    queue.append(n)
+    return order
+
+
+def plan_territories(hexes, neighbours, owner, counts, max_imbalance=MAX_IMBALANCE):
+    """
+    Assign hexes evenly to the alliances in counts, preferring neighbours.
+
+    Args:
+        hexes: ids of the eliminated alliance's hexes
+        neighbours: {hex id: iterable of adjacent hex ids} for those hexes
+        owner: {hex id: patron} of the adjacent hexes
+        counts: {alliance id: current hex count} of the recipients
+        max_imbalance: see MAX_IMBALANCE
+
+    Returns:
+        list of (alliance id, hex id); the patron is None without recipients
+    """
+    if not counts:
+        return [(None, hex_id) for hex_id in hexes]
+    least = _LeastLoaded(counts)
+    owner = dict(owner)
+    assignments = []
+    for hex_id in _border_first(hexes, neighbours, owner, least.counts):
+        min_count, target = least.minimum()
+        adjacent = {owner.get(n) for n in neighbours.get(hex_id, ())}
+        candidates = [
+            (least.counts[alliance], alliance) for alliance in adjacent
+            if alliance in least.counts and least.counts[alliance] <= min_count + max_imbalance
+        ]
+        if candidates:
+            target = min(candidates)[1]
+        assignments.append((target, hex_id))
+        owner[hex_id] = target
+        least.add(target)
+    return assignments
@@ -0,0 +1,163 @@
+"""Periodic maintenance jobs run on the bot's JobQueue.
+
+Jobs run on the bot's event loop and share its database pool; each one
+keeps its transactions short so user requests are never queued behind it.
+Every run is recorded in JobStats and reported by metrics() (see /health).
+"""
+
+import datetime
+import logging
+import os
+import threading
+import time
+
+import config
+import mission_helper
+
+# Автоматическое переключение на mock версию в тестовом режиме
+if config.TEST_MODE:
+    import mock_sqlite_helper as sqllite_helper
+else:
+    import sqllite_helper
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_RETENTION_INTERVAL = int(os.environ.get('SCHEDULE_RETENTION_INTERVAL', str(6 * 60 * 60)))
+SCHEDULE_RETENTION_BATCH = int(os.environ.get('SCHEDULE_RETENTION_BATCH', '500'))
+# Missions are locked for one day; the midnight run does the real work, the
+# sweep catches a midnight missed while the bot was down.
+MISSION_EXPIRY_SWEEP_INTERVAL = int(os.environ.get('MISSION_EXPIRY_SWEEP_INTERVAL', str(60 * 60)))
+# Claims refill their ruleset on their own; this covers startup and rulesets
+# that drained while the bot was down.
+MISSION_POOL_REFILL_INTERVAL = int(os.environ.get('MISSION_POOL_REFILL_INTERVAL', str(15 * 60)))
+
+
+class JobStats:
+    """Last-run information and row counters of one job."""
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.last_run = None
+        self.last_seconds = None
+        self.last_rows = None
+        self.total_rows = 0
+        self.last_error = None
+
+    def record(self, started, seconds, rows=None, error=None):
+        self.runs += 1
+        self.last_run = started.isoformat(timespec='seconds')
+        self.last_seconds = seconds
+        if error is not None:
+            self.failures += 1
+            self.last_error = str(error)
+            return
+        self.last_rows = rows
+        self.total_rows += rows or 0
+        self.last_error = None
+
+    def snapshot(self):
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_run': self.last_run,
+            'last_seconds': self.last_seconds,
+            'last_rows': self.last_rows,
+            'total_rows': self.total_rows,
+            'last_error': self.last_error,
+        }
+
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+async def _run_tracked(name, job):
+    """Await job(), which returns the number of rows it touched, and record it."""
+    started = datetime.datetime.now()
+    start = time.perf_counter()
+    rows = error = None
+    try:
+        rows = await job()
+    except Exception as e:
+        logger.error(f"Background job {name} failed: {e}")
+        error = e
+    with _stats_lock:
+        _stats.setdefault(name, JobStats()).record(
+            started, time.perf_counter() - start, rows, error)
+    return rows
+
+
+def metrics():
+    """Snapshot of every job that has run at least once."""
+    with _stats_lock:
+        return {name: stats.snapshot() for name, stats in _stats.items()}
+
+
+def schedule_retention_cutoff(today: datetime.date) -> datetime.date:
+    """First day still kept in schedule: Monday of the previous ISO week.
+
+    Works on dates rather than ISO week numbers, so it is correct across
+    the new year, when week 1 follows week 52 or 53.
+    """
+    return today - datetime.timedelta(days=today.weekday() + 7)
+
+
+async def archive_expired_schedule(context=None):
+    """Move schedule rows older than the retention cutoff to schedule_history."""
+    cutoff = schedule_retention_cutoff(datetime.date.today())
+
+    async def job():
+        return await sqllite_helper.archive_expired_schedule(
+            cutoff.isoformat(), SCHEDULE_RETENTION_BATCH)
+
+    archived = await _run_tracked('schedule_retention', job)
+    if archived:
+        logger.info(f"Archived {archived} schedule rows dated before {cutoff}")
+
+
+async def unlock_expired_missions(context=None):
+    """Release missions locked on a previous day."""
+    unlocked = await _run_tracked('mission_expiry', sqllite_helper.unlock_expired_missions)
+    if unlocked:
+        logger.info(f"Unlocked {unlocked} expired missions")
+
+
+async def refill_mission_pools(context=None):
+    """Top every mission pool up to its target size."""
+    generated = await _run_tracked('mission_pool_refill', mission_helper.pool.refill_all)
+    if generated:
+        logger.info(f"Generated {generated} missions for the mission pools")
+
+
+def register(job_queue):
+    """Schedule every maintenance job on job_queue."""
+    if job_queue is None:
+        logger.warning(
+            "JobQueue is not available (install python-telegram-bot[job-queue]); "
+            "background jobs are disabled")
+        return
+    job_queue.run_repeating(
+        archive_expired_schedule,
+        interval=SCHEDULE_RETENTION_INTERVAL,
+        first=60,
+        name='schedule_retention',
+    )
+    local_midnight = datetime.time(0, 0, tzinfo=datetime.datetime.now().astimezone().tzinfo)
+    job_queue.run_daily(
+        unlock_expired_missions,
+        time=local_midnight,
+        name='mission_expiry_midnight',
+    )
+    job_queue.run_repeating(
+        unlock_expired_missions,
+        interval=MISSION_EXPIRY_SWEEP_INTERVAL,
+        first=0,
+        name='mission_expiry_sweep',
+    )
+    job_queue.run_repeating(
+        refill_mission_pools,
+        interval=MISSION_POOL_REFILL_INTERVAL,
+        first=5,
+        name='mission_pool_refill',
+    )
@@ -0,0 +1,93 @@
+"""How the bot receives updates: long polling (default) or a webhook.
+
+Settings come from config.py, falling back to environment variables of the
+same name in upper case (BOT_MODE, WEBHOOK_URL, ...):
+
+* bot_mode: "polling" or "webhook"
+* webhook_url: public base URL Telegram posts to, e.g. the reverse proxy's
+  https://bot.example.com; url_path is appended to it
+* webhook_listen / webhook_port: local address of the webhook HTTP server
+  (keep it on 127.0.0.1 behind a reverse proxy)
+* webhook_url_path: path of the endpoint, "telegram" by default
+* webhook_secret_token: checked against every incoming request; a random
+  one is generated on each start when unset (setWebhook re-registers it)
+* concurrent_updates: how many updates may be processed at once (8); a
+  user's own updates are still handled in order (update_processor)
+
+Webhook mode needs the webhooks extra of python-telegram-bot (tornado).
+"""
+
+import logging
+import os
+import secrets
+from typing import NamedTuple, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+MODES = ('polling', 'webhook')
+
+
+class TransportSettings(NamedTuple):
+    mode: str
+    webhook_url: Optional[str]
+    listen: str
+    port: int
+    url_path: str
+    secret_token: str
+    concurrent_updates: int
+
+
+def _setting(name, default=None):
+    value = getattr(config, name, None)
+    if value is None or value == '':
+        value = os.environ.get(name.upper(), default)
+    return value
+
+
+def load_settings() -> TransportSettings:
+    """Read the transport settings; raises ValueError if they are inconsistent."""
+    mode = str(_setting('bot_mode', 'polling')).strip().lower()
+    if mode not in MODES:
+        raise ValueError(f"bot_mode must be one of {MODES}, got {mode!r}")
+
+    url_path = str(_setting('webhook_url_path', 'telegram')).strip('/')
+    base_url = _setting('webhook_url')
+    if mode == 'webhook' and not base_url:
+        raise ValueError("bot_mode 'webhook' needs webhook_url")
+    webhook_url = f"{base_url.rstrip('/')}/{url_path}" if base_url else None
+
+    return TransportSettings(
+        mode=mode,
+        webhook_url=webhook_url,
+        listen=str(_setting('webhook_listen', '127.0.0.1')),
+        port=int(_setting('webhook_port', '8443')),
+        url_path=url_path,
+        secret_token=_setting('webhook_secret_token') or secrets.token_urlsafe(32),
+        concurrent_updates=int(_setting('concurrent_updates', '8')),
+    )
+
+
+def webhook_kwargs(settings: TransportSettings) -> dict:
+    """Arguments for Application.run_webhook / Updater.start_webhook."""
+    return {
+        'listen': settings.listen,
+        'port': settings.port,
+        'url_path': settings.url_path,
+        'webhook_url': settings.webhook_url,
+        'secret_token': settings.secret_token,
+    }
+
+
+def run(application, settings: TransportSettings):
+    """Serve updates until stopped (blocking), in the configured mode."""
+    if settings.mode == 'webhook':
+        logger.info(
+            "Starting webhook on %s:%s/%s for %s (%s concurrent updates)",
+            settings.listen, settings.port, settings.url_path,
+            settings.webhook_url, settings.concurrent_updates)
+        application.run_webhook(**webhook_kwargs(settings))
+    else:
+        logger.info("Starting long polling (%s concurrent updates)", settings.concurrent_updates)
+        application.run_polling()
@@ -1,9 +1,22 @@
 # -*- coding: utf-8 -*-
-import sqlite3
-import random
+"""Генерация карты планеты (таблицы map и edges).
+
+Все гексы и рёбра строятся в памяти (координаты колец и соседи считаются
+массивами numpy) и записываются executemany в одной транзакции, так что
+даже планета на 50 колец создаётся меньше чем за секунду. С seed карта
+воспроизводима.
+
+    python generate_planet.py [--db PATH] [--seed N]
+"""
+import argparse
 import os
+import random
+import sqlite3
+import time
 from collections import Counter
 
+import numpy as np
+
 # Константы
 PLANET_ID = 1
 STATES = [
@@ -26,105 +39,157 @@ HEX_DIRECTIONS = [
     (-1, 0), (-1, 1), (0, 1)
 ]
 
-def hex_ring(center_q, center_r, radius):
-    if radius == 0:
-        return [(center_q, center_r)]
-    results = []
-    q, r = center_q + HEX_DIRECTIONS[4][0] * radius, center_r + HEX_DIRECTIONS[4][1] * radius
-    for i in range(6):
-        for _ in range(radius):
-            results.append((q, r))
-            dq, dr = HEX_DIRECTIONS[i]
-            q += dq
-            r += dr
-    return results
-
-def hex_neighbors(q, r):
-    return [(q + dq, r + dr) for dq, dr in HEX_DIRECTIONS]
-
-def most_common_state(neighbor_coords, hex_map):
-    states = [hex_map[coord]["state"] for coord in neighbor_coords if coord in hex_map]
-    if not states:
-        return random.choice(STATES)
-    return Counter(states).most_common(1)[0][0]
-
-def generate_map_and_edges(db_path=None):
-    # Определяем путь к базе данных
-    if db_path is None:
-        # Если скрипт запускается из контейнера
-        if os.path.exists('/app/data/game_database.db'):
-            db_path = '/app/data/game_database.db'
-        # Если запускается локально из папки database
-        elif os.path.exists('../db/game_database.db'):
-            db_path = '../db/game_database.db'
-        else:
-            db_path = 'game_database.db'
-    
+# Доля гексов, которые берут самый частый state уже созданных соседей.
+NEIGHBOUR_STATE_CHANCE = 0.1
+WAREHOUSE_CHANCE = 0.1
+
+# Угол кольца, с которого начинается каждая из шести сторон.
+_RING_CORNERS = np.cumsum([(0, 0)] + HEX_DIRECTIONS[:-1], axis=0)
+
+
+def planet_coordinates(ring_count):
+    """(q, r) всех гексов планеты в порядке id: кольцо за кольцом от (0, 0).
+
+    Кольцо k начинается в SW*k и проходит шесть направлений по k шагов.
+    """
+    positions = np.arange(1 + 3 * ring_count * (ring_count + 1))
+    # Кольцо k занимает позиции [1 + 3k(k-1), 1 + 3k(k+1)).
+    radius = np.ceil((np.sqrt(12 * positions + 9) - 3) / 6).astype(np.int64)
+    radius[0] = 0
+    safe_radius = np.maximum(radius, 1)
+    offset = positions - (1 + 3 * radius * (radius - 1))
+    side = (offset // safe_radius) % 6
+    step = offset % safe_radius
+
+    directions = np.asarray(HEX_DIRECTIONS)
+    coords = (directions[4] + _RING_CORNERS[side]) * radius[:, None] + directions[side] * step[:, None]
+    coords[0] = 0
+    return coords
+
+
+def neighbour_positions(coords):
+    """(n, 6) позиции соседей по HEX_DIRECTIONS, -1 за краем карты."""
+    q, r = coords[:, 0], coords[:, 1]
+    size = max(int(np.abs(coords).max(initial=0)), 0) + 2
+    grid = np.full((2 * size + 1, 2 * size + 1), -1, dtype=np.int64)
+    grid[q + size, r + size] = np.arange(len(coords))
+    return np.column_stack([grid[q + dq + size, r + dr + size] for dq, dr in HEX_DIRECTIONS])
+
+
+def build_planet(ring_count, patron_ids, states=STATES, seed=None):
+    """
+    Строит гексы и рёбра планеты в памяти.
+
+    Args:
+        ring_count: число колец вокруг центрального гекса
+        patron_ids: id альянсов, между которыми раздаются гексы
+        states: типы местности
+        seed: зерно генератора случайных чисел (None - случайная карта)
+
+    Returns:
+        (hexes, edges): строки (id, planet_id, state, patron, has_warehouse, q, r)
+        и (id, left_hexagon, right_hexagon)
+    """
+    if not patron_ids:
+        raise ValueError("Нет данных в таблице alliances")
+    rng = random.Random(seed)
+    coords = planet_coordinates(ring_count)
+    neighbours = neighbour_positions(coords)
+
+    hexes = []
+    chosen = []
+    for i, ((q, r), around) in enumerate(zip(coords.tolist(), neighbours.tolist())):
+        state = None
+        if i and rng.random() < NEIGHBOUR_STATE_CHANCE:
+            # Соседи с меньшей позицией уже созданы.
+            placed = [chosen[j] for j in around if 0 <= j < i]
+            if placed:
+                state = Counter(placed).most_common(1)[0][0]
+        if state is None:
+            state = rng.choice(states)
+        chosen.append(state)
+        has_warehouse = 1 if rng.random() < WAREHOUSE_CHANCE else 0
+        patron = rng.choice(patron_ids)
+        hexes.append((i + 1, PLANET_ID, state, patron, has_warehouse, q, r))
+
+    # Каждая пара один раз: три направления, остальные три им противоположны.
+    own = np.repeat(np.arange(len(coords)), 3)
+    other = neighbours[:, :3].reshape(-1)
+    mask = other >= 0
+    pairs = np.sort(np.column_stack((own[mask], other[mask])), axis=1) + 1
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    edges = zip(range(1, len(pairs) + 1), pairs[:, 0].tolist(), pairs[:, 1].tolist())
+    return hexes, list(edges)
+
+
+def write_planet(db_path, hexes, edges, clear=False):
+    """Записывает гексы и рёбра одной транзакцией (clear - удалить старую карту)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        (synchronous,) = conn.execute("PRAGMA synchronous").fetchone()
+        # Массовая загрузка в одной транзакции: fsync не нужен до COMMIT.
+        conn.execute("PRAGMA synchronous=OFF")
+        try:
+            with conn:
+                if clear:
+                    conn.execute("DELETE FROM map")
+                    conn.execute("DELETE FROM edges")
+                    has_sequence = conn.execute(
+                        "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'"
+                    ).fetchone()
+                    if has_sequence:
+                        conn.execute("DELETE FROM sqlite_sequence WHERE name IN ('map', 'edges')")
+                conn.executemany("""
+                    INSERT INTO map (id, planet_id, state, patron, has_warehouse, q, r)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, hexes)
+                conn.executemany("""
+                    INSERT INTO edges (id, left_hexagon, right_hexagon, state)
+                    VALUES (?, ?, ?, NULL)
+                """, edges)
+        finally:
+            conn.execute(f"PRAGMA synchronous={synchronous}")
+    finally:
+        conn.close()
+
+
+def planet_parameters(db_path):
+    """Число колец (по числу игроков в альянсах) и id альянсов."""
     conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
+    try:
+        ring_count = conn.execute("SELECT COUNT(*) FROM warmasters WHERE alliance != 0").fetchone()[0]
+        patron_ids = [row[0] for row in conn.execute("SELECT id FROM alliances")]
+    finally:
+        conn.close()
+    return ring_count, patron_ids
 
-    # Получаем количество колец от warmasters
-    cur.execute("SELECT COUNT(*) FROM warmasters WHERE alliance != 0")
-    ring_count = cur.fetchone()[0]
 
-    # Получаем все patron id (из alliances)
-    cur.execute("SELECT id FROM alliances")
-    patron_ids = [row[0] for row in cur.fetchall()]
-    if not patron_ids:
-        raise ValueError("Нет данных в таблице alliances")
+def default_db_path():
+    # Если скрипт запускается из контейнера
+    if os.path.exists('/app/data/game_database.db'):
+        return '/app/data/game_database.db'
+    # Если запускается локально из папки database
+    if os.path.exists('../db/game_database.db'):
+        return '../db/game_database.db'
+    return 'game_database.db'
+
+
+def generate_map_and_edges(db_path=None, seed=None, clear=False):
+    if db_path is None:
+        db_path = default_db_path()
+
+    start = time.perf_counter()
+    ring_count, patron_ids = planet_parameters(db_path)
+    hexes, edges = build_planet(ring_count, patron_ids, seed=seed)
+    write_planet(db_path, hexes, edges, clear=clear)
+    print(f"Карта планеты сгенерирована: {len(hexes)} гексов, {len(edges)} рёбер "
+          f"за {time.perf_counter() - start:.2f} с")
+    return len(hexes), len(edges)
 
-    hex_map = {}  # (q, r) -> {'id', 'state', ...}
-    hex_id = 1
-    edge_id = 1
-
-    for radius in range(ring_count + 1):
-        for q, r in hex_ring(0, 0, radius):
-            coord = (q, r)
-
-            # Выбор state
-            if radius == 0:
-                state = random.choice(STATES)
-            else:
-                if random.random() < 0.1:
-                    neighbors = hex_neighbors(q, r)
-                    state = most_common_state(neighbors, hex_map)
-                else:
-                    state = random.choice(STATES)
-
-            has_warehouse = 1 if random.random() < 0.1 else 0
-            patron = random.choice(patron_ids)
-
-            # Вставка в map
-            cur.execute("""
-                INSERT INTO map (id, planet_id, state, patron, has_warehouse)
-                VALUES (?, ?, ?, ?, ?)
-            """, (hex_id, PLANET_ID, state, patron, has_warehouse))
-
-            hex_map[coord] = {
-                'id': hex_id,
-                'state': state,
-                'patron': patron
-            }
-            hex_id += 1
-
-    # Создаём рёбра
-    for (q, r), hex_data in hex_map.items():
-        current_id = hex_data['id']
-        for nq, nr in hex_neighbors(q, r):
-            neighbor = hex_map.get((nq, nr))
-            if neighbor:
-                neighbor_id = neighbor['id']
-                # Добавляем только одну связь для каждой пары
-                if current_id < neighbor_id:
-                    cur.execute("""
-                        INSERT INTO edges (id, left_hexagon, right_hexagon, state)
-                        VALUES (?, ?, ?, NULL)
-                    """, (edge_id, current_id, neighbor_id))
-                    edge_id += 1
-
-    conn.commit()
-    conn.close()
-    print(f"Карта планеты сгенерирована: {hex_id-1} гексов, {edge_id-1} рёбер")
 
 if __name__ == "__main__":
-    generate_map_and_edges()
+    parser = argparse.ArgumentParser(description="Генерация карты планеты")
+    parser.add_argument('--db', help="путь к базе данных")
+    parser.add_argument('--seed', type=int, help="зерно для воспроизводимой карты")
+    args = parser.parse_args()
+    generate_map_and_edges(args.db, seed=args.seed)
@@ -0,0 +1,173 @@
+"""Shared aiosqlite connection pool used by sqllite_helper.
+
+The bot used to open a fresh aiosqlite connection (thread, file handle and
+connection setup) for every helper call. This module keeps a small set of
+long-lived connections instead:
+
+* a pool of reader connections, handed out one coroutine at a time;
+* a single writer connection, serialized with an asyncio lock so that
+  writes from concurrent handlers never fight over the SQLite write lock.
+
+Connections are configured once (WAL journal, busy timeout, statement cache)
+when the pool is opened. The pool is bound to the event loop it was opened
+on; callers running on any other loop (or before the pool is opened) fall
+back to a short-lived connection, which keeps scripts and tests working
+unchanged.
+"""
+
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+READER_POOL_SIZE = int(os.environ.get('DB_READER_POOL_SIZE', '4'))
+BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', '5000'))
+STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', '256'))
+
+
+async def _open_connection(database_path):
+    """Open and configure a single long-lived connection."""
+    db = await aiosqlite.connect(database_path, cached_statements=STATEMENT_CACHE_SIZE)
+    await db.execute('PRAGMA journal_mode=WAL')
+    await db.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    await db.execute('PRAGMA synchronous=NORMAL')
+    return db
+
+
+async def _reset_connection(db):
+    """Return a connection to a clean state before it goes back to the pool."""
+    if db.in_transaction:
+        await db.rollback()
+    db.row_factory = None
+
+
+class ConnectionPool:
+    """Reader pool plus a single serialized writer for one database file."""
+
+    def __init__(self, database_path, readers=READER_POOL_SIZE):
+        self.database_path = database_path
+        self.size = max(1, readers)
+        self.loop = None
+        self._readers = None
+        self._all_readers = []
+        self._writer = None
+        self._writer_lock = None
+        self._writer_task = None
+
+    @property
+    def is_open(self):
+        return self._writer is not None
+
+    async def open(self):
+        """Open all connections on the running event loop."""
+        self.loop = asyncio.get_running_loop()
+        self._readers = asyncio.Queue()
+        self._writer_lock = asyncio.Lock()
+        self._writer = await _open_connection(self.database_path)
+        for _ in range(self.size):
+            db = await _open_connection(self.database_path)
+            self._all_readers.append(db)
+            self._readers.put_nowait(db)
+        logger.info(
+            "Opened database pool for %s (%s readers + 1 writer)",
+            self.database_path, self.size)
+
+    async def close(self):
+        """Close every connection. Safe to call more than once."""
+        connections = self._all_readers + ([self._writer] if self._writer else [])
+        self._all_readers = []
+        self._writer = None
+        for db in connections:
+            try:
+                await db.close()
+            except Exception as e:
+                logger.warning("Error closing pooled connection: %s", e)
+        logger.info("Closed database pool for %s", self.database_path)
+
+    def serves(self, database_path):
+        """Whether this pool can serve a call for database_path right now."""
+        if not self.is_open or database_path != self.database_path:
+            return False
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    @asynccontextmanager
+    async def reader(self):
+        db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            try:
+                await _reset_connection(db)
+            finally:
+                self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def writer(self):
+        task = asyncio.current_task()
+        if task is not None and task is self._writer_task:
+            # Re-entrant use from a helper that already holds the writer
+            # (e.g. delete_alliance -> redistribute_*); share the connection.
+            yield self._writer
+            return
+
+        async with self._writer_lock:
+            self._writer_task = task
+            try:
+                yield self._writer
+            finally:
+                self._writer_task = None
+                await _reset_connection(self._writer)
+
+
+_pool: Optional[ConnectionPool] = None
+
+
+async def init_pool(database_path, readers=READER_POOL_SIZE):
+    """Open the shared pool for database_path on the running loop."""
+    global _pool
+    if _pool is not None and _pool.is_open:
+        await _pool.close()
+    pool = ConnectionPool(database_path, readers)
+    await pool.open()
+    _pool = pool
+    return pool
+
+
+async def close_pool():
+    """Close the shared pool if it is open."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None and pool.is_open:
+        await pool.close()
+
+
+def get_pool() -> Optional[ConnectionPool]:
+    return _pool
+
+
+@asynccontextmanager
+async def _single_connection(database_path):
+    async with aiosqlite.connect(database_path) as db:
+        yield db
+
+
+def read(database_path):
+    """Async context manager yielding a connection for read-only queries."""
+    if _pool is not None and _pool.serves(database_path):
+        return _pool.reader()
+    return _single_connection(database_path)
+
+
+def write(database_path):
+    """Async context manager yielding the connection used for writes."""
+    if _pool is not None and _pool.serves(database_path):
+        return _pool.writer()
+    return _single_connection(database_path)
@@ -1 +1,10 @@
-crusade_care_bot_telegram_token = ""
\ No newline at end of file
+crusade_care_bot_telegram_token = ""
+# Update delivery (see bot_transport.py): "polling" or "webhook"
+bot_mode = "polling"
+# Public URL of the reverse proxy in front of the webhook, e.g. "https://bot.example.com"
+webhook_url = ""
+webhook_listen = "127.0.0.1"
+webhook_port = 8443
+webhook_secret_token = ""
+# Updates handled at once; one user's updates always run in order
+concurrent_updates = 8
@@ -2,9 +2,12 @@
 # -*- coding: utf-8 -*-
 # vim:fileencoding=utf-8
 import notification_service
+import notification_dispatcher
 import localization
 import migrate_db
 import mission_helper
+import asyncio
+import functools
 import logging
 import keyboard_constructor
 import players_helper
@@ -16,6 +19,13 @@ import schedule_helper
 import mission_message_builder
 import feature_flags_helper
 import map_export_service
+import db_pool
+import request_cache
+import web_loop
+import upload_cache
+import background_jobs
+import bot_transport
+import update_processor
 # Автоматическое переключение на mock версию в тестовом режиме
 if config.TEST_MODE:
     import mock_sqlite_helper as sqllite_helper
@@ -23,7 +33,7 @@ if config.TEST_MODE:
 else:
     import sqllite_helper
     print("✅ Handlers using REAL SQLite helper")
-from telegram.ext import ApplicationBuilder, CallbackQueryHandler, CommandHandler, ContextTypes, ConversationHandler, MessageHandler, filters
+from telegram.ext import ApplicationBuilder, CallbackQueryHandler, CommandHandler, ContextTypes, ConversationHandler, MessageHandler, TypeHandler, filters
 from telegram import InputFile, InlineKeyboardMarkup, InlineKeyboardButton, KeyboardButton, ReplyKeyboardMarkup, Update
 from datetime import datetime
 import re
@@ -78,18 +88,32 @@ async def export_realistic_map(update: Update, context: ContextTypes.DEFAULT_TYP
 
     status_message = await update.message.reply_text("Формирую реалистичную карту планеты...")
     try:
-        png_bytes = await map_export_service.generate_realistic_map_png()
+        # A map already uploaded in this state is neither loaded nor rendered.
+        export = await map_export_service.export_map(await upload_cache.known_map_hashes())
     except map_export_service.EmptyMapExportError:
         await status_message.edit_text("Карта пуста, экспортировать нечего.")
         return MAIN_MENU
+    except map_export_service.MapRenderBusyError:
+        await status_message.edit_text("Сейчас формируется слишком много карт, попробуйте через минуту.")
+        return MAIN_MENU
     except Exception as e:
         logger.error("Failed to export realistic map: %s", e, exc_info=True)
         await status_message.edit_text("Не удалось экспортировать карту. Проверьте логи приложения.")
         return MAIN_MENU
 
+    async def load_png():
+        png_bytes = export.png
+        if png_bytes is None:
+            # The cached file_id was rejected: fetch the PNG after all.
+            png_bytes = (await map_export_service.export_map()).png
+        return InputFile(png_bytes, filename="carebot_realistic_map.png")
+
     try:
-        await update.message.reply_photo(
-            photo=InputFile(png_bytes, filename="carebot_realistic_map.png"),
+        await upload_cache.send_photo(
+            update.message.reply_photo,
+            upload_cache.map_key(export.etag),
+            upload_cache.MAP_KIND,
+            load_png,
             caption="Реалистичная карта: местность, склады и контроль альянсов.",
         )
         await status_message.delete()
@@ -266,14 +290,22 @@ async def get_the_mission(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         deploy_asset_name = mission[0]
         deploy_asset_path = DEPLOY_ASSETS_DIR / deploy_asset_name
 
+    deploy_key = None
     if deploy_asset_path and deploy_asset_path.exists():
-        with deploy_asset_path.open("rb") as deploy_photo:
-            await context.bot.send_photo(
-                chat_id=update.effective_user.id,
-                photo=deploy_photo,
-                caption=attacker_text,
-                reply_markup=back_markup,
-            )
+        deploy_key = upload_cache.deploy_key(deploy_asset_path)
+
+    async def load_deploy_photo():
+        return deploy_asset_path.read_bytes()
+
+    if deploy_key:
+        await upload_cache.send_photo(
+            functools.partial(context.bot.send_photo, chat_id=update.effective_user.id),
+            deploy_key,
+            upload_cache.DEPLOY_KIND,
+            load_deploy_photo,
+            caption=attacker_text,
+            reply_markup=back_markup,
+        )
         await query.edit_message_text("Mission sent as a separate message.")
     else:
         await query.edit_message_text(
@@ -288,13 +320,15 @@ async def get_the_mission(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             new_mission_prefix = await localization.get_text("new_mission_prefix", defender_lang)
             
             defender_text = f"{new_mission_prefix}\n{defender_message}"
-            if deploy_asset_path and deploy_asset_path.exists():
-                with deploy_asset_path.open("rb") as deploy_photo:
-                    await context.bot.send_photo(
-                        chat_id=defender_id,
-                        photo=deploy_photo,
-                        caption=defender_text,
-                    )
+            if deploy_key:
+                # Usually a hit: the attacker's copy was just uploaded.
+                await upload_cache.send_photo(
+                    functools.partial(context.bot.send_photo, chat_id=defender_id),
+                    deploy_key,
+                    upload_cache.DEPLOY_KIND,
+                    load_deploy_photo,
+                    caption=defender_text,
+                )
             else:
                 await context.bot.send_message(
                     chat_id=defender_id,
@@ -315,10 +349,12 @@ async def back_to_settings(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     query = update.callback_query
     await query.answer()
 
-    menu = await keyboard_constructor.setting(userId)
+    user_context = await settings_helper.get_user_context(userId)
+    menu = await keyboard_constructor.setting(userId, user_context)
     menu_markup = InlineKeyboardMarkup(menu)
 
-    settings_text = await localization.get_text_for_user(userId, "settings_title")
+    settings_text = await localization.get_text(
+        "settings_title", user_context.language if user_context else 'ru')
     await query.edit_message_text(settings_text, reply_markup=menu_markup)
     logger.info("Successfully returned to settings menu")
     return SETTINGS
@@ -333,21 +369,22 @@ async def back_to_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
     logger.info(f"🔧 Callback data received: '{query.data}'")
     await query.answer()
 
-    menu = await keyboard_constructor.get_main_menu(userId)
+    # One read for the whole menu and greeting
+    user_context = await settings_helper.get_user_context(userId)
+    menu = await keyboard_constructor.get_main_menu(userId, user_context)
     menu_markup = InlineKeyboardMarkup(menu)
 
     # Check if user has nickname to show appropriate message
-    user_settings = await settings_helper.get_user_settings(userId)
-    has_nickname = user_settings and user_settings[0]
+    language = user_context.language if user_context else 'ru'
     user_name = update.effective_user.first_name or "User"
     
-    if has_nickname:
-        greeting_text = await localization.get_text_for_user(
-            userId, 'main_menu_greeting', name=user_name
+    if user_context and user_context.nickname:
+        greeting_text = await localization.get_text(
+            'main_menu_greeting', language, name=user_name
         )
     else:
-        greeting_text = await localization.get_text_for_user(
-            userId, 'main_menu_nickname_required', name=user_name
+        greeting_text = await localization.get_text(
+            'main_menu_nickname_required', language, name=user_name
         )
 
     logger.info(f"🔧 Sending main menu to user {userId}")
@@ -362,21 +399,22 @@ async def hello(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
     await players_helper.add_warmaster(userId)
     
-    menu = await keyboard_constructor.get_main_menu(userId)
+    # One read for the whole menu and greeting
+    user_context = await settings_helper.get_user_context(userId)
+    menu = await keyboard_constructor.get_main_menu(userId, user_context)
     menu_markup = InlineKeyboardMarkup(menu)
 
     # Check if user has nickname to show appropriate message
-    user_settings = await settings_helper.get_user_settings(userId)
-    has_nickname = user_settings and user_settings[0]
+    language = user_context.language if user_context else 'ru'
     user_name = update.effective_user.first_name or "User"
     
-    if has_nickname:
-        greeting_text = await localization.get_text_for_user(
-            userId, 'main_menu_greeting', name=user_name
+    if user_context and user_context.nickname:
+        greeting_text = await localization.get_text(
+            'main_menu_greeting', language, name=user_name
         )
     else:
-        greeting_text = await localization.get_text_for_user(
-            userId, 'main_menu_nickname_required', name=user_name
+        greeting_text = await localization.get_text(
+            'main_menu_nickname_required', language, name=user_name
         )
 
     if update.callback_query:
@@ -422,8 +460,7 @@ async def show_alliance_resources(update: Update, context: ContextTypes.DEFAULT_
 
     # Get alliance statistics
     resources = await sqllite_helper.get_alliance_resources(alliance_id)
-    player_count = await sqllite_helper.get_alliance_player_count(alliance_id)
-    territory_count = await sqllite_helper.get_alliance_territory_count(alliance_id)
+    player_count, territory_count, _ = await sqllite_helper.get_alliance_stats(alliance_id)
 
     info_text = await localization.get_text_for_user(
         user_id,
@@ -749,6 +786,7 @@ async def handle_mission_reply(
     return MAIN_MENU
 
 
+@update_processor.exclusive
 async def confirm_result(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handler for confirming a pending battle result."""
     query = update.callback_query
@@ -960,12 +998,14 @@ async def setting(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id = update.effective_user.id
     logger.info(f"setting function called by user {user_id}")
     
-    menu = await keyboard_constructor.setting(user_id)
+    user_context = await settings_helper.get_user_context(user_id)
+    menu = await keyboard_constructor.setting(user_id, user_context)
     query = update.callback_query
     await query.answer()
     markup = InlineKeyboardMarkup(menu)
 
-    settings_text = await localization.get_text_for_user(user_id, "settings_title")
+    settings_text = await localization.get_text(
+        "settings_title", user_context.language if user_context else 'ru')
     await query.edit_message_text(settings_text, reply_markup=markup)
     logger.info(f"Returning to SETTINGS state for user {user_id}")
     return SETTINGS
@@ -1067,18 +1107,17 @@ async def handle_name_input(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await players_helper.set_name(user_id, name)
     logger.info(f"Successfully set name for user {user_id}")
     
-    # Send confirmation and return to main menu
-    success_text = await localization.get_text_for_user(user_id, "name_set_success", name=name)
-    
     # Create main menu
-    menu = await keyboard_constructor.get_main_menu(user_id)
+    user_context = await settings_helper.get_user_context(user_id)
+    menu = await keyboard_constructor.get_main_menu(user_id, user_context)
     menu_markup = InlineKeyboardMarkup(menu)
     
-    # Get greeting text
-    user_settings = await settings_helper.get_user_settings(user_id)
+    # Send confirmation and greeting in the user's language
+    language = user_context.language if user_context else 'ru'
+    success_text = await localization.get_text("name_set_success", language, name=name)
     user_name = update.effective_user.first_name or "User"
-    greeting_text = await localization.get_text_for_user(
-        user_id, 'main_menu_greeting', name=user_name
+    greeting_text = await localization.get_text(
+        'main_menu_greeting', language, name=user_name
     )
     
     logger.info(f"Sending success confirmation to user {user_id} and returning to MAIN_MENU")
@@ -1163,6 +1202,7 @@ async def admin_select_player(update: Update, context: ContextTypes.DEFAULT_TYPE
     return MAIN_MENU
 
 
+@update_processor.exclusive
 async def admin_assign_alliance_to_player(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Admin assigned alliance to player."""
     user_id = update.effective_user.id
@@ -1275,7 +1315,8 @@ async def admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     logger.info(f"🔧 admin_menu called by user {user_id}")
     
     # Check if user is admin
-    is_admin = await sqllite_helper.is_user_admin(user_id)
+    user_context = await settings_helper.get_user_context(user_id)
+    is_admin = bool(user_context and user_context.is_admin)
     logger.info(f"🔧 User {user_id} is_admin: {is_admin}")
     
     if not is_admin:
@@ -1284,10 +1325,10 @@ async def admin_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         await query.edit_message_text(error_text)
         return MAIN_MENU
     
-    menu = await keyboard_constructor.get_admin_menu(user_id)
+    menu = await keyboard_constructor.get_admin_menu(user_id, user_context)
     markup = InlineKeyboardMarkup(menu)
     
-    admin_title = await localization.get_text_for_user(user_id, "admin_menu_title")
+    admin_title = await localization.get_text("admin_menu_title", user_context.language)
     logger.info(f"🔧 Showing admin menu to user {user_id} with title: {admin_title}")
     await query.edit_message_text(admin_title, reply_markup=markup)
     return MAIN_MENU
@@ -1714,6 +1755,7 @@ async def admin_delete_alliance(update: Update, context: ContextTypes.DEFAULT_TY
     return MAIN_MENU
 
 
+@update_processor.exclusive
 async def admin_confirm_delete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Confirm and execute alliance deletion."""
     user_id = update.effective_user.id
@@ -1745,6 +1787,7 @@ async def admin_confirm_delete(update: Update, context: ContextTypes.DEFAULT_TYP
     return MAIN_MENU
 
 
+@update_processor.exclusive
 async def handle_alliance_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Route text input to appropriate alliance handler based on context."""
     user_id = update.effective_user.id
@@ -1965,6 +2008,7 @@ async def admin_confirm_mission(update: Update, context: ContextTypes.DEFAULT_TY
     return MAIN_MENU
 
 
+@update_processor.exclusive
 async def admin_do_confirm_mission(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Admin actually confirms the mission result."""
     user_id = update.effective_user.id
@@ -2372,38 +2416,25 @@ async def handle_notification_message(update: Update, context: ContextTypes.DEFA
         return MAIN_MENU
     
     # Send the message to all recipients
-    success_count = 0
-    failure_count = 0
-    
-    for recipient_id in recipients:
-        try:
-            # Check if message has photo
-            if update.message.photo:
-                # Get the largest photo
-                photo = update.message.photo[-1]
-                caption = update.message.caption if update.message.caption else ""
-                
-                await context.bot.send_photo(
-                    chat_id=recipient_id,
-                    photo=photo.file_id,
-                    caption=caption
-                )
-            elif update.message.text:
-                # Send text message
-                await context.bot.send_message(
-                    chat_id=recipient_id,
-                    text=update.message.text
-                )
-            else:
-                # Unsupported message type
-                continue
-                
-            success_count += 1
-            logger.info(f"Custom notification sent to {recipient_id}")
-            
-        except Exception as e:
-            failure_count += 1
-            logger.error(f"Failed to send custom notification to {recipient_id}: {e}")
+    if update.message.photo:
+        # Get the largest photo
+        photo = update.message.photo[-1]
+        method, kwargs = 'send_photo', {
+            'photo': photo.file_id,
+            'caption': update.message.caption if update.message.caption else ""
+        }
+    elif update.message.text:
+        method, kwargs = 'send_message', {'text': update.message.text}
+    else:
+        # Unsupported message type: nothing to send
+        method, kwargs, recipients = None, None, []
+    deliveries = [
+        notification_dispatcher.Delivery(recipient_id, method, kwargs)
+        for recipient_id in recipients
+    ]
+    stats = await notification_dispatcher.dispatcher.send(context.bot, deliveries, 'custom_notification')
+    success_count = stats.sent
+    failure_count = stats.failed
     
     # Send confirmation to admin
     confirmation_text = await localization.get_text_for_user(
@@ -2415,7 +2446,7 @@ async def handle_notification_message(update: Update, context: ContextTypes.DEFA
     )
     
     # Return to main menu
-    menu = await keyboard_constructor.main_menu(user_id)
+    menu = await keyboard_constructor.get_main_menu(user_id)
     markup = InlineKeyboardMarkup(menu)
     
     await update.message.reply_text(confirmation_text, reply_markup=markup)
@@ -2427,6 +2458,22 @@ async def handle_notification_message(update: Update, context: ContextTypes.DEFA
     return MAIN_MENU
 
 
+async def on_startup(application):
+    """Open shared resources once the bot's event loop is running."""
+    if not config.TEST_MODE:
+        await db_pool.init_pool(sqllite_helper.DATABASE_PATH)
+    await localization.load_catalog()
+    # Flask views (hybrid mode) run their coroutines on this loop and pool.
+    web_loop.attach(asyncio.get_running_loop())
+
+
+async def on_shutdown(application):
+    """Close pooled database connections and render workers on shutdown."""
+    web_loop.detach(asyncio.get_running_loop())
+    await db_pool.close_pool()
+    map_export_service.shutdown()
+
+
 def start_bot():
     """Initialize and start the Telegram bot."""
     # Run database migrations before starting the bot
@@ -2437,9 +2484,13 @@ def start_bot():
         return False
     print("✅ Database migrations completed successfully.")
 
+    transport = bot_transport.load_settings()
+
     bot = (
         ApplicationBuilder()
         .token(config.crusade_care_bot_telegram_token)
+        # Different users' updates run in parallel, each user's in order.
+        .concurrent_updates(update_processor.KeyedUpdateProcessor(transport.concurrent_updates))
         .connect_timeout(30)
         .read_timeout(30)
         .write_timeout(30)
@@ -2448,6 +2499,8 @@ def start_bot():
         .get_updates_read_timeout(30)
         .get_updates_write_timeout(30)
         .get_updates_pool_timeout(30)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
         .build()
     )
 
@@ -2552,6 +2605,10 @@ def start_bot():
         fallbacks=[CommandHandler("start", hello)],
     )
 
+    # Per-update warmaster cache: opened before any handler runs, dropped after.
+    bot.add_handler(TypeHandler(Update, request_cache.begin_update), group=-1)
+    bot.add_handler(TypeHandler(Update, request_cache.end_update), group=1)
+
     # Handler for catching replies to the bot's messages, specifically replies to
     # get_the_mission
     bot.add_handler(
@@ -2559,13 +2616,16 @@ def start_bot():
     )
     bot.add_handler(conv_handler)
     bot.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_message))
-    bot.add_handler(CommandHandler("map_export", export_realistic_map))
+    # Rendering can take a while; don't hold other updates behind it.
+    bot.add_handler(CommandHandler("map_export", export_realistic_map, block=False))
     bot.add_handler(CommandHandler("setname", input_name))
     bot.add_handler(CommandHandler("regme", contact))
     bot.add_handler(MessageHandler(filters.CONTACT, contact_callback))
 
-    print("🤖 Starting Telegram bot polling...")
-    bot.run_polling()
+    background_jobs.register(bot.job_queue)
+
+    print(f"🤖 Starting Telegram bot ({transport.mode})...")
+    bot_transport.run(bot, transport)
     return True
 
 
@@ -0,0 +1,175 @@
+"""In-memory adjacency graph of the planet map.
+
+The map changes rarely (a hex changes patron after a battle, a warehouse is
+built or destroyed) but is queried on every wh40k/killteam mission: route to
+a warehouse, friendly neighbours, adjacency between alliances. HexGraph loads
+map + edges once into flat arrays indexed by position and answers those
+queries without SQL joins. sqllite_helper owns the shared instance and keeps
+it in sync with set_cell_patron / create_warehouse / destroy_warehouse.
+Adjacency comes from the stored axial coordinates (coordinate_edges) when
+every hex has them, otherwise from the edges table.
+"""
+
+from collections import deque
+
+# Axial (q, r) offsets of the six neighbours of a hex.
+DIRECTIONS = ((1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1))
+
+
+def axial_neighbours(q, r):
+    """Coordinates of the six hexes around (q, r)."""
+    return [(q + dq, r + dr) for dq, dr in DIRECTIONS]
+
+
+def coordinate_edges(cells):
+    """
+    Edges between hexes, computed from their axial coordinates.
+
+    Args:
+        cells: Iterable of (id, q, r)
+
+    Returns:
+        list of (id, id), one per adjacent pair (like the edges table)
+    """
+    cells = list(cells)
+    position = {(q, r): cell_id for cell_id, q, r in cells}
+    edges = []
+    for cell_id, q, r in cells:
+        # The other three directions are the opposites of these.
+        for dq, dr in DIRECTIONS[:3]:
+            neighbour = position.get((q + dq, r + dr))
+            if neighbour is not None:
+                edges.append((cell_id, neighbour))
+    return edges
+
+
+def _normalize_patron(patron):
+    """Compare patrons the way SQLite does against the INTEGER patron column."""
+    if isinstance(patron, str):
+        try:
+            return int(patron)
+        except ValueError:
+            return patron
+    return patron
+
+
+class HexGraph:
+    """Adjacency lists, patron array and warehouse bitset for the map."""
+
+    def __init__(self, cells, edges):
+        """
+        Args:
+            cells: Iterable of (id, patron, has_warehouse) rows from map
+            edges: Iterable of (left_hexagon, right_hexagon) rows from edges
+        """
+        self.ids = []
+        self.index = {}
+        patrons = []
+        warehouses = []
+        for cell_id, patron, has_warehouse in cells:
+            self.index[cell_id] = len(self.ids)
+            self.ids.append(cell_id)
+            patrons.append(patron)
+            warehouses.append(1 if has_warehouse == 1 else 0)
+        self.patron = patrons
+        self.warehouse = bytearray(warehouses)
+
+        neighbours = [set() for _ in self.ids]
+        for left, right in edges:
+            i = self.index.get(left)
+            j = self.index.get(right)
+            if i is None or j is None or i == j:
+                continue
+            neighbours[i].add(j)
+            neighbours[j].add(i)
+        self.neighbours = [tuple(sorted(n)) for n in neighbours]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, cell_id):
+        return self._position(cell_id) is not None
+
+    def _position(self, cell_id):
+        i = self.index.get(cell_id)
+        if i is None and isinstance(cell_id, str) and cell_id.isdigit():
+            i = self.index.get(int(cell_id))
+        return i
+
+    # --- incremental updates -------------------------------------------
+
+    def set_patron(self, cell_id, patron):
+        """Return False if the cell is unknown (graph needs a reload)."""
+        i = self._position(cell_id)
+        if i is None:
+            return False
+        self.patron[i] = _normalize_patron(patron)
+        return True
+
+    def set_warehouse(self, cell_id, has_warehouse):
+        """Return False if the cell is unknown (graph needs a reload)."""
+        i = self._position(cell_id)
+        if i is None:
+            return False
+        self.warehouse[i] = 1 if has_warehouse else 0
+        return True
+
+    # --- queries -------------------------------------------------------
+
+    def neighbours_of(self, cell_id):
+        i = self._position(cell_id)
+        if i is None:
+            return []
+        return [self.ids[j] for j in self.neighbours[i]]
+
+    def neighbours_with_patron(self, cell_id, patron):
+        """Ids of neighbours of cell_id owned by patron."""
+        i = self._position(cell_id)
+        if i is None:
+            return []
+        patron = _normalize_patron(patron)
+        if patron is None:
+            return []
+        return [self.ids[j] for j in self.neighbours[i] if self.patron[j] == patron]
+
+    def safe_neighbour_count(self, cell_id):
+        """Number of neighbours sharing cell_id's patron."""
+        i = self._position(cell_id)
+        if i is None:
+            return 0
+        patron = self.patron[i]
+        if patron is None:
+            return 0
+        return sum(1 for j in self.neighbours[i] if self.patron[j] == patron)
+
+    def has_route_to_warehouse(self, start_id, patron):
+        """Whether start_id connects to a patron's warehouse through patron's hexes."""
+        start = self._position(start_id)
+        patron = _normalize_patron(patron)
+        if start is None or patron is None or self.patron[start] != patron:
+            return False
+        seen = {start}
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            if self.warehouse[i]:
+                return True
+            for j in self.neighbours[i]:
+                if j not in seen and self.patron[j] == patron:
+                    seen.add(j)
+                    queue.append(j)
+        return False
+
+    def adjacent_between(self, attacker_patron, defender_patron):
+        """Ids of defender hexes sharing an edge with an attacker hex."""
+        attacker_patron = _normalize_patron(attacker_patron)
+        defender_patron = _normalize_patron(defender_patron)
+        if attacker_patron is None or defender_patron is None:
+            return []
+        result = []
+        for i, patron in enumerate(self.patron):
+            if patron != defender_patron:
+                continue
+            if any(self.patron[j] == attacker_patron for j in self.neighbours[i]):
+                result.append(self.ids[i])
+        return result
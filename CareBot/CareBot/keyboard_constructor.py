@@ -91,107 +91,107 @@ async def get_keyboard_rules_keyboard_for_user(user_telegram: str):
     
     return buttons
 
-async def get_main_menu(userId):
+async def _get_user_context(userId, user_context):
+    if user_context is None:
+        user_context = await settings_helper.get_user_context(userId)
+    return user_context
+
+
+async def get_main_menu(userId, user_context=None):
+    """Main menu keyboard.
+
+    Built from a single user context read; pass user_context when the
+    caller already has it to skip even that.
+    """
+    user_context = await _get_user_context(userId, user_context)
+    language = user_context.language if user_context else 'ru'
     items = []
-    
-    # Check if user has a nickname set
-    user_settings = await settings_helper.get_user_settings(userId)
-    has_nickname = user_settings and user_settings[0]  # nickname is the first field
-    alliance = await sqllite_helper.get_alliance_of_warmaster(userId)
-    has_alliance = alliance and alliance[0] not in (None, 0)
-    
-    if has_nickname:
+
+    if user_context and user_context.nickname:
         # If user has nickname, show missions and games
         items.append([
             InlineKeyboardButton(
-                await localization.get_text_for_user(userId, "button_missions"),
+                await localization.get_text("button_missions", language),
                 callback_data="missions")
         ])
         items.append([
             InlineKeyboardButton(
-                await localization.get_text_for_user(userId, "button_games"),
+                await localization.get_text("button_games", language),
                 callback_data="games")
         ])
 
-    if has_alliance:
+    if user_context and user_context.has_alliance:
         items.append([
             InlineKeyboardButton(
-                await localization.get_text_for_user(userId, "button_alliance_resources"),
+                await localization.get_text("button_alliance_resources", language),
                 callback_data="alliance_resources")
         ])
 
-    # Check if user is admin and add admin buttons
-    is_admin = await sqllite_helper.is_user_admin(userId)
-    print(f"DEBUG: User {userId} is_admin check: {is_admin}")  # Debug log
-    if is_admin:
-        admin_button_text = await localization.get_text_for_user(userId, "button_admin")
-        print(f"DEBUG: Adding admin button with text: {admin_button_text}")  # Debug log
+    if user_context and user_context.is_admin:
         items.append([
             InlineKeyboardButton(
-                admin_button_text,
+                await localization.get_text("button_admin", language),
                 callback_data="admin_menu")
         ])
 
     # Settings button is always available
     items.append([
         InlineKeyboardButton(
-            await localization.get_text_for_user(userId, "button_settings"),
+            await localization.get_text("button_settings", language),
             callback_data="setting")
     ])
 
     return items
 
 
-async def setting(userId):
+async def setting(userId, user_context=None):
     """Generate settings keyboard for user"""
-    settings = await settings_helper.get_user_settings(userId)
+    user_context = await _get_user_context(userId, user_context)
     items = []
 
-    if not settings:
+    if not user_context:
         items.append([
             InlineKeyboardButton(
-                await localization.get_text_for_user(userId, "button_set_name"),
+                await localization.get_text("button_set_name", 'ru'),
                 callback_data="requestsetname")
         ])
+        language = 'ru'
     else:
+        language = user_context.language
         # Show current language
-        current_language = settings[2] if len(settings) > 2 and settings[2] else 'ru'
-        language_text = await localization.get_text_for_user(
-            userId, "button_language")
+        language_text = await localization.get_text("button_language", language)
         items.append([
             InlineKeyboardButton(
-                f"{language_text}: {current_language}",
+                f"{language_text}: {language}",
                 callback_data="changelanguage")
         ])
         
         # Show notification status
-        notifications_on = settings[3] if len(settings) > 3 and settings[3] is not None else 1
-        notification_status = "ON" if notifications_on == 1 else "OFF"
-        notifications_text = await localization.get_text_for_user(
-            userId, "button_notifications")
+        notification_status = "ON" if user_context.notifications_enabled == 1 else "OFF"
+        notifications_text = await localization.get_text("button_notifications", language)
         items.append([
             InlineKeyboardButton(
                 f"{notifications_text}: {notification_status}",
                 callback_data="togglenotifications")
         ])
         
-        if not settings[0]:  # nickname not set
+        if not user_context.nickname:
             items.append([
                 InlineKeyboardButton(
-                    await localization.get_text_for_user(userId, "button_set_name"),
+                    await localization.get_text("button_set_name", language),
                     callback_data="requestsetname")
             ])
         
-        if not settings[1]:  # registered_as not set
+        if not user_context.registered_as:
             items.append([
                 InlineKeyboardButton(
-                    await localization.get_text_for_user(userId, "button_registration"),
+                    await localization.get_text("button_registration", language),
                     callback_data="registration")
             ])
     
     items.append([
         InlineKeyboardButton(
-            await localization.get_text_for_user(userId, "button_back"),
+            await localization.get_text("button_back", language),
             callback_data="back_to_main")
     ])
     return items
@@ -212,19 +212,20 @@ async def this_week(rule, user_id):
     def format_day(date_obj):
         return f"{day_abbr[date_obj.weekday()]} {date_obj.strftime('%d.%m')}"
     
-    async def create_day_button(date, user_bookings, rule):
+    def create_day_button(date, user_bookings, participant_counts, rule):
         """Helper function to create a calendar day button.
         
         Args:
             date: datetime object for the day
             user_bookings: dict mapping date strings to rule names
+            participant_counts: dict mapping date strings to participant counts
             rule: current rule being displayed
             
         Returns:
             InlineKeyboardButton for the day
         """
         date_str = str(date.date())
-        count = await sqllite_helper.get_daily_rule_participant_count(rule, date_str)
+        count = participant_counts.get(date_str, 0)
         emoji = get_participant_count_emoji(count)
         
         # Check if user is booked for other rules on this date
@@ -245,9 +246,10 @@ async def this_week(rule, user_id):
         date = today + timedelta(days=i)
         menu_values.append(date)
 
-    # Get user's existing bookings for all dates in the week
+    # Get user's existing bookings and participant counts for the whole week
     date_strs = [str(date.date()) for date in menu_values]
     user_bookings = await sqllite_helper.get_user_bookings_for_dates(user_id, date_strs)
+    participant_counts = await sqllite_helper.get_daily_rule_participant_counts(rule, date_strs)
 
     # Разделяем дни на выходные (суббота=5, воскресенье=6) и будни
     weekend_days = []
@@ -271,14 +273,14 @@ async def this_week(rule, user_id):
     if weekend_days:
         weekend_row = []
         for date in weekend_days:
-            button = await create_day_button(date, user_bookings, rule)
+            button = create_day_button(date, user_bookings, participant_counts, rule)
             weekend_row.append(button)
         days.append(weekend_row)
     
     # Остальные ряды: будни (по 2-3 кнопки в ряду)
     weekday_buttons = []
     for date in weekdays:
-        button = await create_day_button(date, user_bookings, rule)
+        button = create_day_button(date, user_bookings, participant_counts, rule)
         weekday_buttons.append(button)
     
     # Распределяем будни по рядам (по 2-3 кнопки)
@@ -377,14 +379,13 @@ async def admin_assign_alliance_list(userId, player_telegram_id):
     Returns:
         List of button rows for InlineKeyboardMarkup
     """
-    alliances = await sqllite_helper.get_all_alliances()
+    alliances = await sqllite_helper.get_alliance_overview()
     buttons = []
     
     # Get user language for localized text
     user_lang = await localization.get_user_language(userId)
     
-    for alliance_id, alliance_name in alliances:
-        player_count = await sqllite_helper.get_alliance_player_count(alliance_id)
+    for alliance_id, alliance_name, _, player_count, _, _ in alliances:
         button_text = await localization.get_text(
             "alliance_player_count",
             user_lang,
@@ -445,66 +446,67 @@ async def admin_appoint_admin_users(userId):
     return buttons
 
 
-async def get_admin_menu(userId):
+async def get_admin_menu(userId, user_context=None):
     """Generate admin menu keyboard"""
+    user_context = await _get_user_context(userId, user_context)
+    language = user_context.language if user_context else 'ru'
     items = []
     
     # Player alliance assignment (existing functionality)
     items.append([
         InlineKeyboardButton(
-            await localization.get_text_for_user(userId, "button_admin_assign_alliance"),
+            await localization.get_text("button_admin_assign_alliance", language),
             callback_data="admin_assign_alliance")
     ])
     
     # Admin appointment (existing functionality)
     items.append([
         InlineKeyboardButton(
-            await localization.get_text_for_user(userId, "button_appoint_admin"),
+            await localization.get_text("button_appoint_admin", language),
             callback_data="admin_appoint_admin")
     ])
     
     # Alliance management (new functionality)
     items.append([
         InlineKeyboardButton(
-            await localization.get_text_for_user(userId, "button_admin_alliance_management"),
+            await localization.get_text("button_admin_alliance_management", language),
             callback_data="admin_alliance_management")
     ])
 
     # Alliance resource adjustments
     items.append([
         InlineKeyboardButton(
-            await localization.get_text_for_user(userId, "button_admin_adjust_resources"),
+            await localization.get_text("button_admin_adjust_resources", language),
             callback_data="admin_adjust_resources")
     ])
     
     # Custom notifications (new functionality)
     items.append([
         InlineKeyboardButton(
-            await localization.get_text_for_user(userId, "button_admin_custom_notification"),
+            await localization.get_text("button_admin_custom_notification", language),
             callback_data="admin_custom_notification")
     ])
 
     # Statistics menu
     items.append([
         InlineKeyboardButton(
-            await localization.get_text_for_user(userId, "button_admin_stats"),
+            await localization.get_text("button_admin_stats", language),
             callback_data="admin_stats_menu")
     ])
     
     # Feature flags management
     items.append([
         InlineKeyboardButton(
-            await localization.get_text_for_user(userId, "button_admin_feature_flags"),
+            await localization.get_text("button_admin_feature_flags", language),
             callback_data="admin_feature_flags")
     ])
     
     # Pending mission confirmations - only show if there are pending missions
     pending_count = await sqllite_helper.get_pending_missions_count()
     if pending_count > 0:
-        user_lang = await localization.get_user_language(userId)
         button_text = await localization.get_text(
             "admin_pending_count",
-            user_lang,
+            language,
             pending_count=pending_count
         )
         items.append([
@@ -516,7 +518,7 @@ async def get_admin_menu(userId):
     # Back to main menu
     items.append([
         InlineKeyboardButton(
-            await localization.get_text_for_user(userId, "button_back"),
+            await localization.get_text("button_back", language),
             callback_data="back_to_main")
     ])
     
@@ -583,12 +585,9 @@ async def get_alliance_list_for_edit(userId):
     """Generate keyboard with list of alliances for editing"""
     items = []
     
-    alliances = await sqllite_helper.get_all_alliances()
-    for alliance in alliances:
-        alliance_id = alliance[0]
-        alliance_name = alliance[1]
+    alliances = await sqllite_helper.get_alliance_overview()
+    for alliance_id, alliance_name, _, player_count, _, _ in alliances:
         # Show alliance name and player count
-        player_count = await sqllite_helper.get_alliance_player_count(alliance_id)
         display_text = f"{alliance_name} ({player_count})"
         
         items.append([
@@ -611,12 +610,9 @@ async def get_alliance_list_for_delete(userId):
     """Generate keyboard with list of alliances for deletion"""
     items = []
     
-    alliances = await sqllite_helper.get_all_alliances()
-    for alliance in alliances:
-        alliance_id = alliance[0]
-        alliance_name = alliance[1]
+    alliances = await sqllite_helper.get_alliance_overview()
+    for alliance_id, alliance_name, _, player_count, _, _ in alliances:
         # Show alliance name and player count
-        player_count = await sqllite_helper.get_alliance_player_count(alliance_id)
         display_text = f"{alliance_name} ({player_count})"
         
         items.append([
@@ -639,8 +635,8 @@ async def get_alliance_list_for_resources(userId):
     """Generate keyboard for selecting alliance to adjust resources."""
     items = []
     
-    alliances = await sqllite_helper.get_all_alliances_with_resources()
-    for alliance_id, alliance_name, resource_amount in alliances:
+    alliances = await sqllite_helper.get_alliance_overview()
+    for alliance_id, alliance_name, resource_amount, _, _, _ in alliances:
         display_text = f"{alliance_name} ({resource_amount})"
         items.append([
             InlineKeyboardButton(
@@ -13,11 +13,69 @@ else:
     import sqllite_helper
     print("✅ Localization using REAL SQLite helper")
 import logging
+from types import MappingProxyType
 
 logger = logging.getLogger(__name__)
 
-# Cache for texts to avoid frequent database queries
-_text_cache = {}
+
+class TextTemplate:
+    """A catalog entry with its placeholder check done once at load time."""
+
+    __slots__ = ('text', 'has_fields')
+
+    def __init__(self, text):
+        self.text = text
+        self.has_fields = '{' in text
+
+    def render(self, kwargs):
+        if kwargs and self.has_fields:
+            return self.text.format(**kwargs)
+        return self.text
+
+
+class TextCatalog:
+    """Immutable snapshot of the whole texts table."""
+
+    def __init__(self, rows, version):
+        self.version = version
+        self._templates = MappingProxyType({
+            (key, language): TextTemplate(value)
+            for key, language, value in rows
+            if value is not None
+        })
+
+    def __len__(self):
+        return len(self._templates)
+
+    def lookup(self, key, language):
+        """Return the template for key, falling back to Russian."""
+        template = self._templates.get((key, language))
+        if template is None and language != 'ru':
+            template = self._templates.get((key, 'ru'))
+        return template
+
+
+# Current catalog; replaced as a whole, never mutated.
+_catalog = None
+
+
+async def load_catalog():
+    """Load every text for every language in one query and swap it in."""
+    global _catalog
+    version = sqllite_helper.get_texts_version()
+    rows = await sqllite_helper.get_all_texts()
+    catalog = TextCatalog(rows, version)
+    _catalog = catalog
+    logger.info(f"Loaded localization catalog: {len(catalog)} texts (version {version})")
+    return catalog
+
+
+async def _get_catalog():
+    catalog = _catalog
+    if catalog is None or catalog.version != sqllite_helper.get_texts_version():
+        catalog = await load_catalog()
+    return catalog
+
 
 async def get_user_language(user_telegram_id):
     """Get user's language preference from database."""
@@ -43,29 +101,12 @@ async def get_text(key, language='ru', **kwargs):
         Formatted text string
     """
     try:
-        # Check cache first
-        cache_key = f"{key}_{language}"
-        if cache_key not in _text_cache:
-            # Load from database
-            text = await sqllite_helper.get_text_by_key(key, language)
-            if text is None:
-                # Fallback to Russian if text not found
-                if language != 'ru':
-                    text = await sqllite_helper.get_text_by_key(key, 'ru')
-                
-                # If still not found, return the key as fallback
-                if text is None:
-                    logger.warning(f"Text not found for key: {key}, language: {language}")
-                    return f"[{key}]"
-            
-            _text_cache[cache_key] = text
-        
-        text = _text_cache[cache_key]
-        
-        # Format text with provided variables
-        if kwargs:
-            return text.format(**kwargs)
-        return text
+        catalog = await _get_catalog()
+        template = catalog.lookup(key, language)
+        if template is None:
+            logger.warning(f"Text not found for key: {key}, language: {language}")
+            return f"[{key}]"
+        return template.render(kwargs)
         
     except Exception as e:
         logger.error(f"Error getting text for key {key}: {e}")
@@ -87,9 +128,9 @@ async def get_text_for_user(user_telegram_id, key, **kwargs):
     return await get_text(key, language, **kwargs)
 
 def clear_cache():
-    """Clear the text cache. Useful for testing or after text updates."""
-    global _text_cache
-    _text_cache.clear()
+    """Drop the catalog so the next lookup reloads it from the database."""
+    global _catalog
+    _catalog = None
 
 # Convenience functions for common text patterns
 async def get_button_text(button_key, language='ru', **kwargs):
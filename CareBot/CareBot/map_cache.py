@@ -0,0 +1,118 @@
+"""Content-addressed on-disk cache for rendered map PNGs.
+
+The bot and the Flask views run in separate processes and both export the
+same planet map. Rendered PNGs are stored as ``<hash>.png`` in a shared
+directory (MAP_CACHE_DIR, by default ``map_cache`` next to the database) so
+whichever process renders a map state first serves it to the other, and a
+restart does not start cold.
+
+Files are written to a temporary name and renamed into place, so readers
+never see a partial PNG. The directory is kept under MAP_CACHE_MAX_BYTES by
+deleting the least recently used files. Any filesystem error is logged and
+treated as a cache miss: the cache never breaks a map export.
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Temp files older than this are leftovers of a crashed writer.
+STALE_TEMP_SECONDS = 3600
+
+
+def default_cache_dir():
+    configured = os.environ.get('MAP_CACHE_DIR')
+    if configured:
+        return configured
+    db_path = os.environ.get('DATABASE_PATH', '/app/data/game_database.db')
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'map_cache')
+
+
+class MapDiskCache:
+    """PNG bytes keyed by map state hash, bounded by total size."""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('MAP_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.png')
+
+    def get(self, key):
+        """Return cached PNG bytes for key, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Bump mtime so eviction is least-recently-used, not oldest-written.
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Map cache read failed for %s: %s", key[:8], e)
+            return None
+        return data
+
+    def put(self, key, data):
+        """Atomically store data under key, then evict down to max_bytes."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f'.{key[:8]}-', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self._path(key))
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            logger.warning("Map cache write failed for %s: %s", key[:8], e)
+            return
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """Delete least recently used PNGs until the cache fits in max_bytes."""
+        try:
+            entries = []
+            now = time.time()
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                    if entry.name.endswith('.tmp'):
+                        if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                            os.unlink(entry.path)
+                        continue
+                    if entry.name.endswith('.png'):
+                        entries.append((stat.st_mtime, stat.st_size, entry.name, entry.path))
+        except OSError as e:
+            logger.warning("Map cache scan failed: %s", e)
+            return
+
+        total = sum(size for _, size, _, _ in entries)
+        keep_name = f'{keep}.png' if keep else None
+        for _, size, name, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep_name:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("Map cache eviction failed for %s: %s", name, e)
+                continue
+            total -= size
@@ -1,14 +1,15 @@
 """Shared service for generating planet map export PNG bytes."""
 
 import asyncio
-import functools
 import hashlib
 import logging
-from typing import Optional
+from typing import Container, NamedTuple, Optional
 
 if __package__:
     from . import config
+    from . import map_cache
     from . import map_exporter
+    from . import map_render_pool
 
     # Automatically switch to mock DB helper in test mode.
     if config.TEST_MODE:
@@ -17,7 +18,9 @@ if __package__:
         from . import sqllite_helper
 else:
     import config
+    import map_cache
     import map_exporter
+    import map_render_pool
 
     if config.TEST_MODE:
         import mock_sqlite_helper as sqllite_helper
@@ -30,31 +33,51 @@ logger = logging.getLogger(__name__)
 _cache_hash: Optional[str] = None
 _cache_png: Optional[bytes] = None
 
+# Shared with the other process (bot <-> Flask views) and across restarts.
+_disk_cache = map_cache.MapDiskCache()
+
+# Renders run in worker processes; concurrent requests for one state share a job.
+_render_pool = map_render_pool.MapRenderPool()
+
+MapRenderBusyError = map_render_pool.MapRenderBusyError
+
 
 class EmptyMapExportError(Exception):
     """Raised when map export is requested but map has no cells."""
 
 
-def _compute_map_hash(map_cells: list, alliances: list) -> str:
-    """Return a quick MD5 fingerprint of the parts that affect map visuals."""
-    # Include id, patron, has_warehouse for each cell; alliance ids only.
-    state = str([(r[0], r[2], r[3]) for r in map_cells])
-    state += str([r[0] for r in alliances])
-    return hashlib.md5(state.encode()).hexdigest()
+class MapExport(NamedTuple):
+    """Result of export_map: png is None when the caller's ETag is current."""
 
+    etag: str
+    png: Optional[bytes]
 
-async def generate_realistic_map_png() -> bytes:
+
+def _compute_map_hash(map_cells: list, alliances: list, terrain_colors: Optional[dict]) -> str:
+    """Return a SHA-256 fingerprint of everything that affects the rendered PNG."""
+    state = repr((
+        map_exporter.RENDER_VERSION,
+        [tuple(r) for r in map_cells],
+        [tuple(r) for r in alliances],
+        sorted((terrain_colors or {}).items()),
+    ))
+    return hashlib.sha256(state.encode()).hexdigest()
+
+
+async def export_map(known_etags: Container[str] = ()) -> MapExport:
     """Build realistic map PNG bytes using shared DB + renderer flow.
 
-    The CPU-heavy matplotlib render runs in a thread-pool executor so it
-    never blocks the async event loop.  Identical map state is served from
-    an in-memory cache without re-rendering.
+    The map state hash doubles as the ETag: if it is in known_etags the PNG
+    is not loaded or rendered at all. Otherwise the PNG comes from the
+    in-memory cache, then the disk cache, and only then from a render in
+    the render worker pool. Raises MapRenderBusyError when that pool is
+    saturated.
     """
     global _cache_hash, _cache_png
 
     map_cells_raw = await sqllite_helper.get_map_cells_for_export()
     map_cells = [
-        (int(row[0]), row[1], row[2], int(row[3]))
+        (int(row[0]), row[1], row[2], int(row[3]), *row[4:6])
         for row in map_cells_raw
     ]
 
@@ -69,21 +92,40 @@ async def generate_realistic_map_png() -> bytes:
 
     terrain_colors_raw = await sqllite_helper.get_terrain_colors()
 
-    current_hash = _compute_map_hash(map_cells, alliances)
+    current_hash = _compute_map_hash(map_cells, alliances, terrain_colors_raw)
+    if current_hash in known_etags:
+        logger.info("Map export: client copy is current (hash=%s)", current_hash[:8])
+        return MapExport(current_hash, None)
+
     if current_hash == _cache_hash and _cache_png is not None:
         logger.info("Map export: returning cached PNG (hash=%s)", current_hash[:8])
-        return _cache_png
+        return MapExport(current_hash, _cache_png)
 
-    logger.info("Map export: rendering new PNG (hash=%s)", current_hash[:8])
     loop = asyncio.get_event_loop()
-    render_func = functools.partial(
-        map_exporter.render_realistic_map_png,
-        map_cells,
-        alliances,
-        terrain_colors_raw,
-    )
-    png_bytes = await loop.run_in_executor(None, render_func)
+    png_bytes = await loop.run_in_executor(None, _disk_cache.get, current_hash)
+    if png_bytes is not None:
+        logger.info("Map export: returning PNG from disk cache (hash=%s)", current_hash[:8])
+    else:
+        logger.info("Map export: rendering new PNG (hash=%s)", current_hash[:8])
+        png_bytes = await _render_pool.render(
+            current_hash, map_cells, alliances, terrain_colors_raw)
+        await loop.run_in_executor(None, _disk_cache.put, current_hash, png_bytes)
 
     _cache_hash = current_hash
     _cache_png = png_bytes
-    return png_bytes
+    return MapExport(current_hash, png_bytes)
+
+
+async def generate_realistic_map_png() -> bytes:
+    """Return the current map as PNG bytes (see export_map)."""
+    return (await export_map()).png
+
+
+def render_metrics() -> dict:
+    """Counters and timings of the render worker pool."""
+    return _render_pool.metrics()
+
+
+def shutdown() -> None:
+    """Stop render worker processes."""
+    _render_pool.shutdown()
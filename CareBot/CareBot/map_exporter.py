@@ -2,14 +2,21 @@
 
 from io import BytesIO
 import math
+import threading
 from typing import Dict, Iterable, List, Optional, Tuple
 
 import matplotlib.patches as patches
 import matplotlib.pyplot as plt
-from matplotlib.collections import LineCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PathCollection, PolyCollection
+from matplotlib.figure import Figure
 import numpy as np
 
 
+# Bump when the PNG for the same map state changes (styles, layout) so
+# cached exports are not served after an upgrade.
+RENDER_VERSION = 1
+
 TERRAIN_STYLES: Dict[str, Dict[str, str]] = {
     "Леса": {"fill": "#2E7D32"},
     "Тундра/снег": {"fill": "#E3F2FD"},
@@ -73,48 +80,56 @@ _DIRECTION_EDGE_VERTICES: Dict[Tuple[int, int], Tuple[int, int]] = {
 }
 
 
-def _hex_ring(center_q: int, center_r: int, radius: int) -> List[Tuple[int, int]]:
-    directions = [(1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)]
-    if radius == 0:
-        return [(center_q, center_r)]
+# Cumulative axial offset of the corner where a ring walk starts side s.
+_RING_CORNERS = np.cumsum([(0, 0)] + _HEX_DIRECTIONS[:-1], axis=0)
 
-    ring_coords: List[Tuple[int, int]] = []
-    q, r = center_q + directions[4][0] * radius, center_r + directions[4][1] * radius
-    for i in range(6):
-        for _ in range(radius):
-            ring_coords.append((q, r))
-            dq, dr = directions[i]
-            q += dq
-            r += dr
-    return ring_coords
+# Unit hex corners (pointy-top), vertex k at angle pi/6 + k*pi/3.
+_HEX_CORNER_ANGLES = np.pi / 6 + np.arange(6) * np.pi / 3
+_UNIT_HEX_CORNERS = np.column_stack((np.cos(_HEX_CORNER_ANGLES), np.sin(_HEX_CORNER_ANGLES)))
 
 
-def _reconstruct_coordinates(hex_count: int) -> Dict[int, Tuple[int, int]]:
-    coordinates: Dict[int, Tuple[int, int]] = {1: (0, 0)}
-    current_pos = 2
-    radius = 1
+def _axial_coordinates(hex_count: int) -> np.ndarray:
+    """Axial (q, r) of hexes 1..hex_count laid out in spiral rings around (0, 0).
 
-    while current_pos <= hex_count:
-        for coord in _hex_ring(0, 0, radius):
-            if current_pos > hex_count:
-                break
-            coordinates[current_pos] = coord
-            current_pos += 1
-        radius += 1
+    Row i holds hex i+1. Ring k starts at SW*k and walks the six directions
+    k steps each, so every position is computed directly from its index.
+    """
+    positions = np.arange(hex_count)
+    # Ring k holds positions [1 + 3k(k-1), 1 + 3k(k+1)).
+    radius = np.ceil((np.sqrt(12 * positions + 9) - 3) / 6).astype(int)
+    radius[positions == 0] = 0
+    safe_radius = np.maximum(radius, 1)
+    offset = positions - (1 + 3 * radius * (radius - 1))
+    side = offset // safe_radius
+    step = offset % safe_radius
+
+    directions = np.asarray(_HEX_DIRECTIONS)
+    coords = (
+        directions[4] * radius[:, None]
+        + _RING_CORNERS[side % 6] * radius[:, None]
+        + directions[side % 6] * step[:, None]
+    )
+    coords[positions == 0] = 0
+    return coords
 
-        if radius > 100:
-            break
 
-    return coordinates
+def _reconstruct_coordinates(hex_count: int) -> Dict[int, Tuple[int, int]]:
+    coords = _axial_coordinates(hex_count)
+    return {idx: (int(q), int(r)) for idx, (q, r) in enumerate(coords, start=1)}
 
 
-def _hex_to_pixel(q: int, r: int, size: float) -> Tuple[float, float]:
-    # Pointy-top hexagon axial coordinates (matches the rotation in render_realistic_map_png)
+def _hex_to_pixel(q, r, size: float):
+    # Pointy-top hexagon axial coordinates; works on scalars and arrays alike.
     x = size * math.sqrt(3) * (q + r / 2.0)
     y = size * 3.0 / 2.0 * r
     return x, y
 
 
+def _hex_vertices(centers: np.ndarray, size: float) -> np.ndarray:
+    """(n, 6, 2) corner coordinates for hexes centred at centers (n, 2)."""
+    return centers[:, None, :] + size * _UNIT_HEX_CORNERS[None, :, :]
+
+
 def _alliance_color(alliance_id: Optional[int], color_from_db: Optional[str]) -> str:
     if color_from_db:
         return color_from_db
@@ -503,181 +518,239 @@ def _draw_sprite_warehouse(ax, x: float, y: float, size: float) -> None:
                 color="#37474F", linewidth=0.3, zorder=9)
 
 
-def render_realistic_map_png(
-    map_cells: Iterable[Tuple[int, str, Optional[int], int]],
-    alliances: Iterable[Tuple[int, str, Optional[str]]],
-    terrain_colors: Optional[Dict[str, str]] = None,
-) -> bytes:
-    """Render full planet hex map to PNG bytes.
+# Alliance borders sit at this zorder; everything above it (grid, warehouses,
+# tall terrain sprites) is composited on top of the cached base layer.
+BORDER_ZORDER = 5
+BORDER_ALPHA = 0.65
+BORDER_INSET = 0.91
 
-    map_cells rows: (id, state, patron, has_warehouse)
-    alliances rows: (id, name, color)
-    terrain_colors: optional dict name->hex_color from DB (overrides built-in TERRAIN_STYLES)
+
+class _SpriteBatch:
+    """Collects sprite patches/lines and adds them as one collection per zorder.
+
+    Sprite functions draw through ``ax.add_patch`` / ``ax.plot``; passing a
+    batch instead of the axes records those calls so a whole map of sprites
+    becomes a handful of collections instead of thousands of artists.
+    Matplotlib draws by zorder anyway, so grouping by zorder keeps the
+    original stacking.
     """
-    ordered_cells = sorted(list(map_cells), key=lambda row: row[0])
-    if not ordered_cells:
-        raise ValueError("No map data available for export")
 
-    alliance_by_id = {
-        row[0]: {"name": row[1], "color": _alliance_color(row[0], row[2])}
-        for row in alliances
-    }
+    def __init__(self) -> None:
+        self._paths: Dict[float, List] = {}
+        self._lines: Dict[float, List] = {}
+
+    def add_patch(self, patch) -> None:
+        path = patch.get_patch_transform().transform_path(patch.get_path())
+        group = self._paths.setdefault(patch.get_zorder(), [])
+        group.append((path, patch.get_facecolor(), patch.get_edgecolor(), patch.get_linewidth()))
+
+    def plot(self, xs, ys, color, linewidth, zorder) -> None:
+        group = self._lines.setdefault(zorder, [])
+        group.append((np.column_stack((xs, ys)), color, linewidth))
+
+    def flush(self, ax) -> None:
+        for zorder, items in sorted(self._paths.items()):
+            paths, facecolors, edgecolors, linewidths = zip(*items)
+            ax.add_collection(PathCollection(
+                paths,
+                facecolors=facecolors,
+                edgecolors=edgecolors,
+                linewidths=linewidths,
+                zorder=zorder,
+            ), autolim=False)
+        for zorder, items in sorted(self._lines.items()):
+            segments, colors, linewidths = zip(*items)
+            ax.add_collection(LineCollection(
+                segments,
+                colors=colors,
+                linewidths=linewidths,
+                capstyle="projecting",
+                zorder=zorder,
+            ), autolim=False)
+        self._paths.clear()
+        self._lines.clear()
+
+
+_TERRAIN_SPRITES = {
+    "Леса": _draw_sprite_trees,
+    "Город": _draw_sprite_city,
+    "Разрушенный город": _draw_sprite_ruined_city,
+    "Завод": _draw_sprite_factory,
+    "Изменённое варпом пространство": _draw_sprite_warp_tooth,
+    "Останки корабля": _draw_sprite_ship_wreck,
+    "Отравленные земли": _draw_sprite_toxic_bubble,
+    "Свалка": _draw_sprite_junkyard,
+    "Храмовый квартал": _draw_sprite_imperial_temple,
+}
 
-    # Merge terrain colors: DB values override built-in defaults
-    effective_styles: Dict[str, Dict] = {n: dict(v) for n, v in TERRAIN_STYLES.items()}
-    if terrain_colors:
-        for name, color in terrain_colors.items():
-            normalized_name = _normalize_terrain_name(name)
-            if normalized_name in effective_styles:
-                effective_styles[normalized_name]["fill"] = color
-            else:
-                effective_styles[normalized_name] = {"fill": color}
-
-    coordinates = _reconstruct_coordinates(len(ordered_cells))
-
-    hex_count = len(ordered_cells)
-    # Scale figure size based on number of hexes (min 10, max 24)
-    fig_side = max(10, min(24, int(math.sqrt(hex_count) * 2.5)))
-    fig, ax = plt.subplots(1, 1, figsize=(fig_side, fig_side))
-    hex_size = 1.0
-
-    # --- Pass 1: build coord -> patron/color lookup tables ---
-    coord_to_patron: Dict[Tuple[int, int], int] = {}
-    coord_to_color: Dict[Tuple[int, int], str] = {}
-    for idx, row in enumerate(ordered_cells, start=1):
-        _, _, patron, _ = row
-        if idx in coordinates:
-            q, r = coordinates[idx]
-            owner_id = int(patron) if patron is not None else 0
-            coord_to_patron[(q, r)] = owner_id
-            if owner_id and owner_id in alliance_by_id:
-                coord_to_color[(q, r)] = alliance_by_id[owner_id]["color"]
-            else:
-                coord_to_color[(q, r)] = NEUTRAL_BORDER_COLOR
-
-    terrain_seen: set = set()
-    alliances_seen: set = set()
-
-    # --- Pass 2: draw hex fills, pseudo-3D shadows, and terrain sprites ---
-    for idx, row in enumerate(ordered_cells, start=1):
-        _, state, patron, has_warehouse = row
-        q, r = coordinates[idx]
-        x, y = _hex_to_pixel(q, r, hex_size)
-        normalized_state = _normalize_terrain_name(state)
-
-        style = effective_styles.get(normalized_state, DEFAULT_TERRAIN_STYLE)
-        terrain_seen.add(normalized_state)
-
-        angles = np.linspace(0, 2 * np.pi, 7)
-        x_coords = x + hex_size * np.cos(angles + np.pi / 6)
-        y_coords = y + hex_size * np.sin(angles + np.pi / 6)
-        points = list(zip(x_coords, y_coords))
-
-        # Pseudo-3D drop shadow (dark polygon shifted south-east)
-        sd = hex_size * 0.055
-        shadow_pts = [(px + sd, py - sd) for px, py in points]
-        ax.add_patch(patches.Polygon(shadow_pts, facecolor="#111111", alpha=0.20, zorder=1))
-
-        # Terrain fill (clean, no hatch)
-        ax.add_patch(patches.Polygon(
-            points,
-            facecolor=style["fill"],
-            edgecolor="#1a1a1a",
-            linewidth=0.35,
-            zorder=2,
-        ))
 
-        # Terrain sprites
-        if normalized_state == "Леса":
-            _draw_sprite_trees(ax, x, y, hex_size)
-        elif normalized_state == "Город":
-            _draw_sprite_city(ax, x, y, hex_size, ruined=False)
-        elif normalized_state == "Разрушенный город":
-            _draw_sprite_ruined_city(ax, x, y, hex_size)
-        elif normalized_state == "Завод":
-            _draw_sprite_factory(ax, x, y, hex_size)
-        elif normalized_state == "Изменённое варпом пространство":
-            _draw_sprite_warp_tooth(ax, x, y, hex_size)
-        elif normalized_state == "Останки корабля":
-            _draw_sprite_ship_wreck(ax, x, y, hex_size)
-        elif normalized_state == "Отравленные земли":
-            _draw_sprite_toxic_bubble(ax, x, y, hex_size)
-        elif normalized_state == "Свалка":
-            _draw_sprite_junkyard(ax, x, y, hex_size)
-        elif normalized_state == "Храмовый квартал":
-            _draw_sprite_imperial_temple(ax, x, y, hex_size)
-
-        owner_id = coord_to_patron.get((q, r), 0)
-        if owner_id:
-            alliances_seen.add(owner_id)
-
-        if has_warehouse:
-            _draw_sprite_warehouse(ax, x, y, hex_size)
-
-    # --- Pass 3: alliance borders (inset inside each hex) ---
-    # Batch all border segments per (color, linewidth) into LineCollections to
-    # avoid creating thousands of individual matplotlib Artists.
-    BORDER_ALPHA = 0.65
-    BORDER_INSET = 0.91
-
-    # Collect segments grouped by (color, linewidth)
-    border_segments: Dict[Tuple[str, float], List] = {}
-
-    for idx, row in enumerate(ordered_cells, start=1):
-        q, r = coordinates[idx]
-        x, y = _hex_to_pixel(q, r, hex_size)
-        this_patron = coord_to_patron.get((q, r), 0)
-        edge_color = coord_to_color.get((q, r), NEUTRAL_BORDER_COLOR)
-
-        # Inset vertices are pulled slightly toward hex center.
-        verts = [
-            (
-                x + (hex_size * BORDER_INSET) * math.cos(math.pi / 6 + k * math.pi / 3),
-                y + (hex_size * BORDER_INSET) * math.sin(math.pi / 6 + k * math.pi / 3),
-            )
-            for k in range(6)
-        ]
-
-        for (dq, dr), (vi, vj) in _DIRECTION_EDGE_VERTICES.items():
-            neighbor_patron = coord_to_patron.get((q + dq, r + dr))  # None = outside map
-            if neighbor_patron == this_patron:
-                continue
-
-            lw = 2.1 if this_patron else 0.7
-            key = (edge_color, lw)
-            if key not in border_segments:
-                border_segments[key] = []
-            x1, y1 = verts[vi]
-            x2, y2 = verts[vj]
-            border_segments[key].append([(x1, y1), (x2, y2)])
-
-    for (color, lw), segs in border_segments.items():
-        lc = LineCollection(segs, colors=color, linewidths=lw, alpha=BORDER_ALPHA, zorder=5)
-        ax.add_collection(lc)
-
-    # --- Pass 4: redraw hex grid above alliance borders ---
-    # Batch all hex outlines into a single LineCollection.
-    grid_segments = []
-    for idx, _row in enumerate(ordered_cells, start=1):
-        q, r = coordinates[idx]
-        x, y = _hex_to_pixel(q, r, hex_size)
-        angles = np.linspace(0, 2 * np.pi, 7)
-        x_coords = x + hex_size * np.cos(angles + np.pi / 6)
-        y_coords = y + hex_size * np.sin(angles + np.pi / 6)
-        # Each hex outline is 6 edges (7 points forming a closed polygon)
-        pts = list(zip(x_coords.tolist(), y_coords.tolist()))
-        for i in range(6):
-            grid_segments.append([pts[i], pts[i + 1]])
-
-    grid_lc = LineCollection(grid_segments, colors="#1a1a1a", linewidths=0.35, alpha=0.85, zorder=6)
-    ax.add_collection(grid_lc)
-
-    # Explicitly set axis limits based on actual hex positions (add_patch doesn't autoscale)
-    all_x = [_hex_to_pixel(q, r, hex_size)[0] for q, r in coordinates.values()]
-    all_y = [_hex_to_pixel(q, r, hex_size)[1] for q, r in coordinates.values()]
+class _MapScene:
+    """Geometry and lookups shared by the render passes, as per-hex arrays."""
+
+    def __init__(
+        self,
+        map_cells: Iterable[Tuple[int, str, Optional[int], int]],
+        alliances: Iterable[Tuple[int, str, Optional[str]]],
+        terrain_colors: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.ordered_cells = sorted(list(map_cells), key=lambda row: row[0])
+        if not self.ordered_cells:
+            raise ValueError("No map data available for export")
+
+        self.alliance_by_id = {
+            row[0]: {"name": row[1], "color": _alliance_color(row[0], row[2])}
+            for row in alliances
+        }
+
+        # Merge terrain colors: DB values override built-in defaults
+        self.effective_styles: Dict[str, Dict] = {n: dict(v) for n, v in TERRAIN_STYLES.items()}
+        if terrain_colors:
+            for name, color in terrain_colors.items():
+                normalized_name = _normalize_terrain_name(name)
+                if normalized_name in self.effective_styles:
+                    self.effective_styles[normalized_name]["fill"] = color
+                else:
+                    self.effective_styles[normalized_name] = {"fill": color}
+
+        hex_count = len(self.ordered_cells)
+        # Scale figure size based on number of hexes (min 10, max 24)
+        self.fig_side = max(10, min(24, int(math.sqrt(hex_count) * 2.5)))
+        # Telegram photo limit: width + height <= 10000 (max ~5000px per side for square).
+        # Raspberry Pi: cap at 100 dpi to reduce CPU/RAM load while keeping
+        # the image readable in Telegram (max ~2400 px/side at fig_side=24).
+        self.dpi = min(100, int(3000 / self.fig_side))
+        self.hex_size = 1.0
+
+        # Hex i (in id order) sits at axial[i]; everything below is indexed the same way.
+        # Stored q/r are used when every row has them, else the ring layout is rebuilt.
+        if all(len(row) >= 6 and row[4] is not None and row[5] is not None
+               for row in self.ordered_cells):
+            self.axial = np.array([(row[4], row[5]) for row in self.ordered_cells], dtype=np.int64)
+        else:
+            self.axial = _axial_coordinates(hex_count)
+        x, y = _hex_to_pixel(self.axial[:, 0], self.axial[:, 1], self.hex_size)
+        self.centers = np.column_stack((x, y))
+        self.vertices = _hex_vertices(self.centers, self.hex_size)
+
+        self.terrain = [_normalize_terrain_name(row[1]) for row in self.ordered_cells]
+        self.owner = np.array(
+            [int(row[2]) if row[2] is not None else 0 for row in self.ordered_cells], dtype=np.int64
+        )
+        self.warehouse = np.array([bool(row[3]) for row in self.ordered_cells], dtype=bool)
+
+        self.terrain_seen = set(self.terrain)
+        self.alliances_seen = {int(owner) for owner in np.unique(self.owner) if owner}
+
+    def neighbour_index(self) -> np.ndarray:
+        """(n, 6) position of the neighbour in each _DIRECTION_EDGE_VERTICES direction, -1 off-map."""
+        q = self.axial[:, 0]
+        r = self.axial[:, 1]
+        q_min, r_min = q.min() - 1, r.min() - 1
+        grid = np.full((q.max() - q_min + 2, r.max() - r_min + 2), -1, dtype=np.int64)
+        grid[q - q_min, r - r_min] = np.arange(len(q))
+        return np.column_stack([
+            grid[q + dq - q_min, r + dr - r_min] for dq, dr in _DIRECTION_EDGE_VERTICES
+        ])
+
+    def base_layer_key(self) -> tuple:
+        """Everything the terrain layer and legends depend on (not patrons/warehouses)."""
+        legend_alliances = tuple(
+            (alliance_id, self.alliance_by_id[alliance_id]["name"], self.alliance_by_id[alliance_id]["color"])
+            for alliance_id in sorted(self.alliances_seen)
+            if alliance_id in self.alliance_by_id
+        )
+        return (
+            tuple((row[0], row[1], *row[4:6]) for row in self.ordered_cells),
+            tuple(sorted((name, style["fill"]) for name, style in self.effective_styles.items())),
+            legend_alliances,
+        )
+
+
+def _draw_terrain_layer(ax, scene: _MapScene) -> None:
+    """Pass 1: hex fills, pseudo-3D shadows and terrain sprites."""
+    hex_size = scene.hex_size
+
+    # Pseudo-3D drop shadow (dark polygons shifted south-east)
+    sd = hex_size * 0.055
+    ax.add_collection(PolyCollection(
+        scene.vertices + np.array([sd, -sd]),
+        facecolors="#111111", edgecolors="none", alpha=0.20, zorder=1,
+    ), autolim=False)
+
+    # Terrain fill (clean, no hatch)
+    fills = [
+        scene.effective_styles.get(terrain, DEFAULT_TERRAIN_STYLE)["fill"]
+        for terrain in scene.terrain
+    ]
+    ax.add_collection(PolyCollection(
+        scene.vertices,
+        facecolors=fills, edgecolors="#1a1a1a", linewidths=0.35, zorder=2,
+    ), autolim=False)
+
+    # Terrain sprites
+    batch = _SpriteBatch()
+    for (x, y), terrain in zip(scene.centers.tolist(), scene.terrain):
+        draw_sprite = _TERRAIN_SPRITES.get(terrain)
+        if draw_sprite is not None:
+            draw_sprite(batch, x, y, hex_size)
+    batch.flush(ax)
+
+
+def _draw_ownership_layer(ax, scene: _MapScene) -> None:
+    """Pass 2: warehouses, alliance borders and the hex grid on top of them."""
+    hex_size = scene.hex_size
+    batch = _SpriteBatch()
+    for x, y in scene.centers[scene.warehouse].tolist():
+        _draw_sprite_warehouse(batch, x, y, hex_size)
+    batch.flush(ax)
+
+    neighbours = scene.neighbour_index()
+    on_map = neighbours >= 0
+    edge_pairs = np.array(list(_DIRECTION_EDGE_VERTICES.values()))
+
+    # Alliance borders (inset inside each hex) on every edge whose neighbour
+    # has another patron or is off the map, drawn as one LineCollection.
+    neighbour_owner = np.where(on_map, scene.owner[np.maximum(neighbours, 0)], -1)
+    border_hex, border_dir = np.nonzero(neighbour_owner != scene.owner[:, None])
+    inset = scene.centers[:, None, :] + (hex_size * BORDER_INSET) * _UNIT_HEX_CORNERS[None, :, :]
+    border_segments = np.stack((
+        inset[border_hex, edge_pairs[border_dir, 0]],
+        inset[border_hex, edge_pairs[border_dir, 1]],
+    ), axis=1)
+
+    owner_colors = {
+        alliance_id: data["color"] for alliance_id, data in scene.alliance_by_id.items()
+    }
+    border_owner = scene.owner[border_hex].tolist()
+    border_colors = [owner_colors.get(owner, NEUTRAL_BORDER_COLOR) if owner else NEUTRAL_BORDER_COLOR
+                     for owner in border_owner]
+    border_widths = np.where(scene.owner[border_hex] != 0, 2.1, 0.7)
+    ax.add_collection(LineCollection(
+        border_segments, colors=border_colors, linewidths=border_widths,
+        alpha=BORDER_ALPHA, zorder=BORDER_ZORDER,
+    ), autolim=False)
+
+    # Redraw hex grid above alliance borders. A shared edge is emitted once,
+    # by the hex with the lower position; map-edge sides are always kept.
+    grid_hex, grid_dir = np.nonzero(~on_map | (neighbours > np.arange(len(scene.owner))[:, None]))
+    grid_segments = np.stack((
+        scene.vertices[grid_hex, edge_pairs[grid_dir, 0]],
+        scene.vertices[grid_hex, edge_pairs[grid_dir, 1]],
+    ), axis=1)
+    ax.add_collection(LineCollection(
+        grid_segments, colors="#1a1a1a", linewidths=0.35, alpha=0.85, zorder=6,
+    ), autolim=False)
+
+
+def _decorate_axes(ax, scene: _MapScene) -> None:
+    """Axis limits, title and the terrain/alliance legends."""
+    hex_size = scene.hex_size
+    # Explicitly set axis limits based on actual hex positions (collections don't autoscale here)
     margin = hex_size * 2.0
-    ax.set_xlim(min(all_x) - margin, max(all_x) + margin)
-    ax.set_ylim(min(all_y) - margin, max(all_y) + margin)
+    x_min, y_min = scene.centers.min(axis=0)
+    x_max, y_max = scene.centers.max(axis=0)
+    ax.set_xlim(x_min - margin, x_max + margin)
+    ax.set_ylim(y_min - margin, y_max + margin)
 
     ax.set_aspect("equal")
     ax.set_title("Planet Control Map", fontsize=20, fontweight="bold")
@@ -687,8 +760,8 @@ def render_realistic_map_png(
         spine.set_visible(False)
 
     terrain_handles = []
-    for terrain_name in sorted(terrain_seen):
-        style = effective_styles.get(terrain_name, DEFAULT_TERRAIN_STYLE)
+    for terrain_name in sorted(scene.terrain_seen):
+        style = scene.effective_styles.get(terrain_name, DEFAULT_TERRAIN_STYLE)
         terrain_handles.append(
             patches.Patch(
                 facecolor=style["fill"],
@@ -698,8 +771,8 @@ def render_realistic_map_png(
         )
 
     alliance_handles = []
-    for alliance_id in sorted(alliances_seen):
-        data = alliance_by_id.get(alliance_id)
+    for alliance_id in sorted(scene.alliances_seen):
+        data = scene.alliance_by_id.get(alliance_id)
         if not data:
             continue
         alliance_handles.append(
@@ -728,13 +801,119 @@ def render_realistic_map_png(
             bbox_to_anchor=(1.02, 0.0),
         )
 
+
+def render_realistic_map_png(
+    map_cells: Iterable[Tuple[int, str, Optional[int], int]],
+    alliances: Iterable[Tuple[int, str, Optional[str]]],
+    terrain_colors: Optional[Dict[str, str]] = None,
+) -> bytes:
+    """Render full planet hex map to PNG bytes.
+
+    map_cells rows: (id, state, patron, has_warehouse) or (..., q, r)
+    alliances rows: (id, name, color)
+    terrain_colors: optional dict name->hex_color from DB (overrides built-in TERRAIN_STYLES)
+    """
+    scene = _MapScene(map_cells, alliances, terrain_colors)
+
+    fig, ax = plt.subplots(1, 1, figsize=(scene.fig_side, scene.fig_side))
+    _draw_terrain_layer(ax, scene)
+    _draw_ownership_layer(ax, scene)
+    _decorate_axes(ax, scene)
+
     plt.tight_layout()
     output = BytesIO()
-    # Telegram photo limit: width + height <= 10000 (max ~5000px per side for square).
-    # At fig_side=24in, dpi=150 → 3600px/side → sum=7200 — safe.
-    # Raspberry Pi: cap at 100 dpi to reduce CPU/RAM load while keeping
-    # the image readable in Telegram (max ~2400 px/side at fig_side=24).
-    dpi = min(100, int(3000 / fig_side))
-    fig.savefig(output, format="png", dpi=dpi, bbox_inches="tight", facecolor="white")
+    fig.savefig(output, format="png", dpi=scene.dpi, bbox_inches="tight", facecolor="white")
     plt.close(fig)
-    return output.getvalue()
\ No newline at end of file
+    return output.getvalue()
+
+
+class IncrementalMapRenderer:
+    """Re-renders only ownership overlays on top of a cached terrain raster.
+
+    The terrain layer (fills, shadows, sprites) and legends are drawn once per
+    base_layer_key and kept as an Agg background. Each render restores that
+    background and draws warehouses, alliance borders, the grid and any
+    terrain sprites that sit above the borders, so a patron or warehouse
+    change costs a fraction of a full render.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._key = None
+        self._figure = None
+        self._canvas = None
+        self._ax = None
+        self._background = None
+        self._overlay_artists: List = []
+        self._crop = None
+        self.base_renders = 0
+        self.overlay_renders = 0
+
+    def render(
+        self,
+        map_cells: Iterable[Tuple[int, str, Optional[int], int]],
+        alliances: Iterable[Tuple[int, str, Optional[str]]],
+        terrain_colors: Optional[Dict[str, str]] = None,
+    ) -> bytes:
+        """Same contract as render_realistic_map_png."""
+        scene = _MapScene(map_cells, alliances, terrain_colors)
+        key = scene.base_layer_key()
+        with self._lock:
+            if key != self._key:
+                self._build_base_layer(scene, key)
+            return self._composite(scene)
+
+    def _build_base_layer(self, scene: _MapScene, key: tuple) -> None:
+        fig = Figure(figsize=(scene.fig_side, scene.fig_side), dpi=scene.dpi, facecolor="white")
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1, 1, 1)
+
+        _draw_terrain_layer(ax, scene)
+        # Sprites drawn above the borders must be re-composited over them.
+        overlay = [a for a in ax.get_children() if a.get_zorder() > BORDER_ZORDER]
+        for artist in overlay:
+            artist.set_animated(True)
+        _decorate_axes(ax, scene)
+        fig.tight_layout()
+        canvas.draw()
+
+        # Same crop as savefig(bbox_inches="tight") with the default padding.
+        pad = 0.1
+        tight = fig.get_tightbbox(canvas.get_renderer())
+        width, height = canvas.get_width_height()
+        x0 = max(0, int((tight.x0 - pad) * scene.dpi))
+        x1 = min(width, int(math.ceil((tight.x1 + pad) * scene.dpi)))
+        top = max(0, height - int(math.ceil((tight.y1 + pad) * scene.dpi)))
+        bottom = min(height, height - int((tight.y0 - pad) * scene.dpi))
+
+        self._key = key
+        self._figure = fig
+        self._canvas = canvas
+        self._ax = ax
+        self._background = canvas.copy_from_bbox(fig.bbox)
+        self._overlay_artists = overlay
+        self._crop = (slice(top, bottom), slice(x0, x1))
+        self.base_renders += 1
+
+    def _composite(self, scene: _MapScene) -> bytes:
+        ax = self._ax
+        before = set(ax.get_children())
+        _draw_ownership_layer(ax, scene)
+        added = [a for a in ax.get_children() if a not in before]
+        for artist in added:
+            artist.set_animated(True)
+
+        try:
+            self._canvas.restore_region(self._background)
+            # Stable sort keeps the original insertion order within a zorder.
+            for artist in sorted(self._overlay_artists + added, key=lambda a: a.get_zorder()):
+                ax.draw_artist(artist)
+            pixels = np.asarray(self._canvas.buffer_rgba())[self._crop].copy()
+        finally:
+            for artist in added:
+                artist.remove()
+
+        output = BytesIO()
+        plt.imsave(output, pixels, format="png", dpi=scene.dpi)
+        self.overlay_renders += 1
+        return output.getvalue()
@@ -0,0 +1,170 @@
+"""Render worker processes for map exports.
+
+Matplotlib rendering is CPU-bound and holds the GIL, so rendering on the
+bot's thread executor slows down message handling. MapRenderPool runs
+renders in a small pool of worker processes instead:
+
+* Requests for a map state hash that is already being rendered wait for
+  that job instead of starting another one (coalescing).
+* At most max_pending distinct renders may be queued or running; beyond
+  that MapRenderBusyError is raised so callers can ask the user to retry
+  rather than pile up work (backpressure).
+* Each worker keeps its own IncrementalMapRenderer, so a worker that has
+  already drawn the terrain only redraws ownership overlays.
+
+Jobs are concurrent.futures futures, so callers on different event loops
+(the bot and Flask request loops) can wait for the same render.
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+if __package__:
+    from . import map_exporter
+else:
+    import map_exporter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.environ.get('MAP_RENDER_WORKERS', 1))
+DEFAULT_MAX_PENDING = int(os.environ.get('MAP_RENDER_MAX_PENDING', 4))
+
+# Per-process renderer, created by _init_worker in each worker process.
+_worker_renderer = None
+
+
+def _init_worker():
+    global _worker_renderer
+    _worker_renderer = map_exporter.IncrementalMapRenderer()
+
+
+def _render_job(map_cells, alliances, terrain_colors):
+    """Runs in a worker process; returns (png_bytes, render_seconds)."""
+    started = time.perf_counter()
+    png_bytes = _worker_renderer.render(map_cells, alliances, terrain_colors)
+    return png_bytes, time.perf_counter() - started
+
+
+class MapRenderBusyError(Exception):
+    """Raised when too many distinct map renders are already queued."""
+
+
+class RenderStats:
+    """Counters and timings of map render jobs."""
+
+    def __init__(self):
+        self.submitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = None
+
+    def record(self, seconds):
+        self.completed += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_seconds = seconds
+
+    def snapshot(self, pending):
+        mean = self.total_seconds / self.completed if self.completed else None
+        return {
+            'pending': pending,
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'completed': self.completed,
+            'failed': self.failed,
+            'mean_seconds': mean,
+            'max_seconds': self.max_seconds,
+            'last_seconds': self.last_seconds,
+        }
+
+
+class MapRenderPool:
+    """Coalescing, bounded front-end to a process pool of map renderers."""
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or DEFAULT_WORKERS
+        self.max_pending = max_pending or DEFAULT_MAX_PENDING
+        self.stats = RenderStats()
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: forking a process that runs the bot's threads and event
+            # loop is unsafe, and it is the only option on Windows anyway.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def submit(self, key, map_cells, alliances, terrain_colors):
+        """Return the job rendering map state key, starting one if needed."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self.stats.coalesced += 1
+                return job
+            if len(self._jobs) >= self.max_pending:
+                self.stats.rejected += 1
+                raise MapRenderBusyError(
+                    f"{len(self._jobs)} map renders already pending")
+            job = self._get_executor().submit(_render_job, map_cells, alliances, terrain_colors)
+            self._jobs[key] = job
+            self.stats.submitted += 1
+        job.add_done_callback(functools.partial(self._finish, key))
+        return job
+
+    def _finish(self, key, job):
+        with self._lock:
+            if self._jobs.get(key) is job:
+                del self._jobs[key]
+            pending = len(self._jobs)
+            error = job.exception() if not job.cancelled() else None
+            if job.cancelled() or error is not None:
+                self.stats.failed += 1
+                if isinstance(error, BrokenProcessPool):
+                    # A worker died; start a fresh pool on the next submit.
+                    self._executor = None
+            else:
+                self.stats.record(job.result()[1])
+        if error is not None:
+            logger.error("Map render %s failed: %s", key[:8], error)
+        elif not job.cancelled():
+            logger.info("Map render %s took %.2fs (pending=%d)",
+                        key[:8], self.stats.last_seconds, pending)
+
+    async def render(self, key, map_cells, alliances, terrain_colors):
+        """Render (or join the render of) map state key and return PNG bytes.
+
+        Raises MapRenderBusyError when max_pending renders are in flight.
+        Cancelling the awaiting task does not cancel the shared job.
+        """
+        job = self.submit(key, map_cells, alliances, terrain_colors)
+        png_bytes, _seconds = await asyncio.shield(asyncio.wrap_future(job))
+        return png_bytes
+
+    def metrics(self):
+        with self._lock:
+            return self.stats.snapshot(len(self._jobs))
+
+    def shutdown(self):
+        """Stop worker processes, dropping renders that have not started."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
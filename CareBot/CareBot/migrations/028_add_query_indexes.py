@@ -0,0 +1,68 @@
+"""
+Migration 028: Add secondary indexes for the hot sqllite_helper queries.
+
+The schema had no secondary indexes, so schedule/battle/mission lookups
+scanned whole tables that only grow over time. Each index lists the
+filter columns first and, where cheap, the selected columns after them so
+the query is answered from the index alone.
+
+Checked with scripts/check_query_plans.py.
+"""
+from yoyo import step
+
+
+# (index name, table, columns); the comment above each names the queries it serves.
+INDEXES = [
+    # rules+date counts, players of a game, event participants, opponents by date
+    ("idx_schedule_date_rules", "schedule", "date, rules, user_telegram"),
+    # a user's bookings (optionally for given dates)
+    ("idx_schedule_user_date", "schedule", "user_telegram, date, rules"),
+    # weekly participant counts and old-week cleanup
+    ("idx_schedule_week_rules", "schedule", "date_week, rules, user_telegram"),
+    # opponents / participants of a battle
+    ("idx_battle_attenders_battle", "battle_attenders", "battle_id, attender_id"),
+    # latest battle of a mission (rowid id comes with the index)
+    ("idx_battles_mission", "battles", "mission_id"),
+    # free mission of a ruleset, ordered by id
+    ("idx_mission_stack_status_rules", "mission_stack", "status, rules"),
+    # expired/pending/completed missions by creation date
+    ("idx_mission_stack_status_created", "mission_stack", "status, created_date"),
+    ("idx_pending_results_battle", "pending_results", "battle_id"),
+    # hexes, warehouses and territory counts of an alliance
+    ("idx_map_patron", "map", "patron, has_warehouse"),
+    # players of an alliance
+    ("idx_warmasters_alliance", "warmasters", "alliance"),
+    # neighbours of a hex in either direction
+    ("idx_edges_left", "edges", "left_hexagon, right_hexagon"),
+    ("idx_edges_right", "edges", "right_hexagon, left_hexagon"),
+]
+
+
+def _table_exists(cursor, table):
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    )
+    return cursor.fetchone() is not None
+
+
+def add_query_indexes(conn):
+    cursor = conn.cursor()
+
+    created = 0
+    for name, table, columns in INDEXES:
+        if not _table_exists(cursor, table):
+            print(f"⚠️ Migration 028: table {table} not found, skipping {name}")
+            continue
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        created += 1
+
+    print(f"✅ Migration 028: {created} query indexes ensured")
+
+
+def drop_query_indexes(conn):
+    cursor = conn.cursor()
+    for name, _table, _columns in INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+steps = [step(add_query_indexes, drop_query_indexes)]
@@ -0,0 +1,45 @@
+"""
+Migration 029: Add schedule_history for archived schedule rows.
+
+insert_to_schedule used to delete every row more than one ISO week away
+from the new booking. Old rows are now moved here by the retention job in
+background_jobs.py instead, so past sign-ups stay available for stats.
+SQLite has no table partitioning; the (date, rules) index gives date-range
+queries the same pruning.
+"""
+from yoyo import step
+
+
+def add_schedule_history(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schedule_history (
+            id INTEGER PRIMARY KEY NOT NULL,
+            date TEXT,
+            rules TEXT,
+            user_telegram TEXT NOT NULL,
+            date_week INTEGER,
+            archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_schedule_history_date_rules "
+        "ON schedule_history (date, rules)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_schedule_history_user "
+        "ON schedule_history (user_telegram, date)"
+    )
+
+    print("✅ Migration 029: schedule_history table ensured")
+
+
+def drop_schedule_history(conn):
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS schedule_history")
+
+
+steps = [step(add_schedule_history, drop_schedule_history)]
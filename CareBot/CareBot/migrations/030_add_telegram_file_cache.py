@@ -0,0 +1,33 @@
+"""
+Migration 030: Add telegram_file_cache for reusing uploaded files.
+
+Telegram returns a file_id for every uploaded photo; sending that id again
+costs no upload. upload_cache.py stores one row per content key (map state
+hash, deploy image name + mtime).
+"""
+from yoyo import step
+
+
+def add_telegram_file_cache(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS telegram_file_cache (
+            cache_key TEXT PRIMARY KEY NOT NULL,
+            kind TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+    print("✅ Migration 030: telegram_file_cache table ensured")
+
+
+def drop_telegram_file_cache(conn):
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS telegram_file_cache")
+
+
+steps = [step(add_telegram_file_cache, drop_telegram_file_cache)]
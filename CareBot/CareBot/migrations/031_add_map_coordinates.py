@@ -0,0 +1,87 @@
+"""
+Migration 031: Add axial hex coordinates (q, r) to the map table.
+
+generate_planet.py assigns ids ring by ring, starting at (0, 0), and the map
+export used to rebuild (q, r) from that order on every render. The
+coordinates are now stored with an index, so neighbours can be computed
+from them (see hex_graph.coordinate_edges) instead of joining edges.
+
+Existing maps are backfilled from the same ring order, but only when that
+layout reproduces the edges table exactly; otherwise q/r stay NULL and the
+bot keeps using edges for that map.
+"""
+from yoyo import step
+
+# Axial directions in the order generate_planet walks a ring.
+HEX_DIRECTIONS = [(1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)]
+
+
+def spiral_coordinates(count):
+    """(q, r) of the first count hexes in generate_planet's ring order."""
+    coords = [(0, 0)]
+    radius = 1
+    while len(coords) < count:
+        q, r = HEX_DIRECTIONS[4][0] * radius, HEX_DIRECTIONS[4][1] * radius
+        for dq, dr in HEX_DIRECTIONS:
+            for _ in range(radius):
+                coords.append((q, r))
+                q, r = q + dq, r + dr
+        radius += 1
+    return coords[:count]
+
+
+def add_map_coordinates(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("PRAGMA table_info(map)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if 'q' not in columns:
+        cursor.execute("ALTER TABLE map ADD COLUMN q INTEGER")
+    if 'r' not in columns:
+        cursor.execute("ALTER TABLE map ADD COLUMN r INTEGER")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_map_coordinates ON map (q, r)")
+
+    cursor.execute("SELECT id FROM map WHERE q IS NULL OR r IS NULL ORDER BY id")
+    missing = [row[0] for row in cursor.fetchall()]
+    if not missing:
+        print("✅ Migration 031: map coordinates columns ensured")
+        return
+
+    cursor.execute("SELECT id FROM map ORDER BY id")
+    ids = [row[0] for row in cursor.fetchall()]
+    coords = dict(zip(ids, spiral_coordinates(len(ids))))
+
+    position = {coord: hex_id for hex_id, coord in coords.items()}
+    expected = set()
+    for hex_id, (q, r) in coords.items():
+        for dq, dr in HEX_DIRECTIONS:
+            neighbour = position.get((q + dq, r + dr))
+            if neighbour is not None:
+                expected.add((min(hex_id, neighbour), max(hex_id, neighbour)))
+
+    cursor.execute(
+        "SELECT DISTINCT MIN(left_hexagon, right_hexagon), MAX(left_hexagon, right_hexagon) "
+        "FROM edges WHERE left_hexagon != right_hexagon"
+    )
+    stored = set(cursor.fetchall())
+    if stored and stored != expected:
+        print(
+            "⚠️ Migration 031: map ids do not follow the ring layout "
+            f"({len(stored ^ expected)} edges differ); coordinates left empty"
+        )
+        return
+
+    cursor.executemany(
+        "UPDATE map SET q = ?, r = ? WHERE id = ?",
+        [(coords[hex_id][0], coords[hex_id][1], hex_id) for hex_id in missing],
+    )
+    print(f"✅ Migration 031: coordinates backfilled for {len(missing)} hexes")
+
+
+def drop_map_coordinates(conn):
+    cursor = conn.cursor()
+    cursor.execute("DROP INDEX IF EXISTS idx_map_coordinates")
+    # Columns are left in place; SQLite before 3.35.0 cannot drop them.
+
+
+steps = [step(add_map_coordinates, drop_map_coordinates)]
@@ -0,0 +1,137 @@
+"""
+Migration 032: Add the alliance_stats summary table.
+
+Player, territory and warehouse counts of every alliance used to be counted
+from warmasters and map on each request (once per alliance when building
+the admin keyboards). alliance_stats keeps one row per alliance with the
+counts, maintained by triggers on alliances, warmasters and map, so the
+helpers read a single row and the keyboards render from one join.
+"""
+from yoyo import step
+
+_STATS_ROW = '''
+    SELECT {id},
+           (SELECT COUNT(*) FROM warmasters WHERE alliance = {id}),
+           (SELECT COUNT(*) FROM map WHERE patron = {id}),
+           (SELECT COUNT(*) FROM map WHERE patron = {id} AND has_warehouse = 1)
+'''
+
+TRIGGERS = {
+    # An alliance starts with whatever already points at its id.
+    'trg_alliance_stats_alliance_insert': '''
+        AFTER INSERT ON alliances
+        BEGIN
+            INSERT OR REPLACE INTO alliance_stats
+                (alliance_id, player_count, territory_count, warehouse_count)
+            ''' + _STATS_ROW.format(id='NEW.id') + ''';
+        END
+    ''',
+    'trg_alliance_stats_alliance_delete': '''
+        AFTER DELETE ON alliances
+        BEGIN
+            DELETE FROM alliance_stats WHERE alliance_id = OLD.id;
+        END
+    ''',
+    'trg_alliance_stats_warmaster_insert': '''
+        AFTER INSERT ON warmasters
+        BEGIN
+            UPDATE alliance_stats SET player_count = player_count + 1
+            WHERE alliance_id = NEW.alliance;
+        END
+    ''',
+    'trg_alliance_stats_warmaster_delete': '''
+        AFTER DELETE ON warmasters
+        BEGIN
+            UPDATE alliance_stats SET player_count = player_count - 1
+            WHERE alliance_id = OLD.alliance;
+        END
+    ''',
+    'trg_alliance_stats_warmaster_update': '''
+        AFTER UPDATE OF alliance ON warmasters
+        WHEN OLD.alliance IS NOT NEW.alliance
+        BEGIN
+            UPDATE alliance_stats SET player_count = player_count - 1
+            WHERE alliance_id = OLD.alliance;
+            UPDATE alliance_stats SET player_count = player_count + 1
+            WHERE alliance_id = NEW.alliance;
+        END
+    ''',
+    'trg_alliance_stats_map_insert': '''
+        AFTER INSERT ON map
+        BEGIN
+            UPDATE alliance_stats
+            SET territory_count = territory_count + 1,
+                warehouse_count = warehouse_count + (NEW.has_warehouse IS 1)
+            WHERE alliance_id = NEW.patron;
+        END
+    ''',
+    'trg_alliance_stats_map_delete': '''
+        AFTER DELETE ON map
+        BEGIN
+            UPDATE alliance_stats
+            SET territory_count = territory_count - 1,
+                warehouse_count = warehouse_count - (OLD.has_warehouse IS 1)
+            WHERE alliance_id = OLD.patron;
+        END
+    ''',
+    'trg_alliance_stats_map_update': '''
+        AFTER UPDATE OF patron, has_warehouse ON map
+        WHEN OLD.patron IS NOT NEW.patron OR OLD.has_warehouse IS NOT NEW.has_warehouse
+        BEGIN
+            UPDATE alliance_stats
+            SET territory_count = territory_count - 1,
+                warehouse_count = warehouse_count - (OLD.has_warehouse IS 1)
+            WHERE alliance_id = OLD.patron;
+            UPDATE alliance_stats
+            SET territory_count = territory_count + 1,
+                warehouse_count = warehouse_count + (NEW.has_warehouse IS 1)
+            WHERE alliance_id = NEW.patron;
+        END
+    ''',
+}
+
+
+def add_alliance_stats(conn):
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS alliance_stats (
+            alliance_id INTEGER PRIMARY KEY,
+            player_count INTEGER NOT NULL DEFAULT 0,
+            territory_count INTEGER NOT NULL DEFAULT 0,
+            warehouse_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # get_dominant_alliance: the alliance with the most hexes
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_alliance_stats_territory
+        ON alliance_stats (territory_count DESC, alliance_id)
+    ''')
+
+    for name, body in TRIGGERS.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"CREATE TRIGGER {name} {body}")
+
+    # Rebuild the counts from scratch, so re-applying repairs any drift.
+    cursor.execute("DELETE FROM alliance_stats")
+    cursor.execute('''
+        INSERT INTO alliance_stats
+            (alliance_id, player_count, territory_count, warehouse_count)
+        SELECT a.id,
+               (SELECT COUNT(*) FROM warmasters w WHERE w.alliance = a.id),
+               (SELECT COUNT(*) FROM map m WHERE m.patron = a.id),
+               (SELECT COUNT(*) FROM map m WHERE m.patron = a.id AND m.has_warehouse = 1)
+        FROM alliances a
+    ''')
+    print(f"✅ Migration 032: alliance_stats filled for {cursor.rowcount} alliances")
+
+
+def drop_alliance_stats(conn):
+    cursor = conn.cursor()
+    for name in TRIGGERS:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    cursor.execute("DROP INDEX IF EXISTS idx_alliance_stats_territory")
+    cursor.execute("DROP TABLE IF EXISTS alliance_stats")
+
+
+steps = [step(add_alliance_stats, drop_alliance_stats)]
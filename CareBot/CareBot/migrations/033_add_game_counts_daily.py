@@ -0,0 +1,60 @@
+"""
+Migration 033: Add the game_counts_daily rollup table.
+
+The admin game statistics used to find the latest battle of every completed
+mission in the window on each request. game_counts_daily keeps one row per
+(day, player, alliance, rules) with the number of games; the mission's
+creation day is used, as before. Rows are added when a result is confirmed
+(sqllite_helper.complete_mission), so a window is a sum over its days.
+
+The table is filled from the existing history here; scripts/
+backfill_game_counts.py rebuilds it the same way. Backfilled games count
+for the alliance the player is in now, since the history does not keep it.
+"""
+from yoyo import step
+
+BACKFILL_SQL = '''
+    INSERT INTO game_counts_daily (day, telegram_id, alliance_id, rules, games)
+    WITH mission_battles AS (
+        SELECT substr(m.created_date, 1, 10) AS day,
+               COALESCE(m.rules, '') AS rules,
+               MAX(b.id) AS battle_id
+        FROM mission_stack m
+        JOIN battles b ON b.mission_id = m.id
+        WHERE m.status = 3
+          AND m.created_date IS NOT NULL
+        GROUP BY m.id
+    )
+    SELECT mb.day, ba.attender_id, COALESCE(w.alliance, 0), mb.rules, COUNT(*)
+    FROM mission_battles mb
+    JOIN battle_attenders ba ON ba.battle_id = mb.battle_id
+    LEFT JOIN warmasters w ON w.telegram_id = ba.attender_id
+    GROUP BY mb.day, ba.attender_id, COALESCE(w.alliance, 0), mb.rules
+'''
+
+
+def add_game_counts_daily(conn):
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS game_counts_daily (
+            day TEXT NOT NULL,
+            telegram_id INTEGER NOT NULL,
+            alliance_id INTEGER NOT NULL DEFAULT 0,
+            rules TEXT NOT NULL DEFAULT '',
+            games INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, telegram_id, alliance_id, rules)
+        )
+    ''')
+
+    cursor.execute("DELETE FROM game_counts_daily")
+    cursor.execute(BACKFILL_SQL)
+    print(f"✅ Migration 033: game_counts_daily filled with {cursor.rowcount} rows")
+
+
+def drop_game_counts_daily(conn):
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS game_counts_daily")
+
+
+steps = [step(add_game_counts_daily, drop_game_counts_daily)]
@@ -0,0 +1,26 @@
+"""
+Migration 034: Index missions by status and sort date for the battles page.
+
+The web UI and /api/battles page missions newest first with a keyset on
+(COALESCE(created_date, ''), id), so legacy missions without a date come
+last. An index on that expression lets each page seek straight to its
+cursor instead of walking every newer mission.
+"""
+from yoyo import step
+
+
+def add_mission_sort_index(conn):
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_mission_stack_status_sort
+        ON mission_stack (status, COALESCE(created_date, ''))
+    ''')
+    print("✅ Migration 034: idx_mission_stack_status_sort ensured")
+
+
+def drop_mission_sort_index(conn):
+    cursor = conn.cursor()
+    cursor.execute("DROP INDEX IF EXISTS idx_mission_stack_status_sort")
+
+
+steps = [step(add_mission_sort_index, drop_mission_sort_index)]
@@ -0,0 +1,84 @@
+"""
+Migration 035: Give schedule_history its own key.
+
+schedule_history (migration 029) reused the schedule row id as its primary
+key and was filled with INSERT OR REPLACE. schedule ids are reused once the
+newest rows are archived, so a later archive run overwrote an older history
+row. Rows now get their own history_id; the original id is kept in
+schedule_id.
+"""
+from yoyo import step
+
+HISTORY_COLUMNS = 'date, rules, user_telegram, date_week, archived_at'
+
+
+def _create_indexes(cursor):
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_schedule_history_date_rules "
+        "ON schedule_history (date, rules)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_schedule_history_user "
+        "ON schedule_history (user_telegram, date)"
+    )
+
+
+def rekey_schedule_history(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("PRAGMA table_info(schedule_history)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if 'history_id' in columns:
+        print("✅ Migration 035: schedule_history already keyed by history_id")
+        return
+
+    cursor.execute(
+        """
+        CREATE TABLE schedule_history_new (
+            history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            schedule_id INTEGER NOT NULL,
+            date TEXT,
+            rules TEXT,
+            user_telegram TEXT NOT NULL,
+            date_week INTEGER,
+            archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    cursor.execute(f"""
+        INSERT INTO schedule_history_new (schedule_id, {HISTORY_COLUMNS})
+        SELECT id, {HISTORY_COLUMNS} FROM schedule_history ORDER BY archived_at, id
+    """)
+    cursor.execute("DROP TABLE schedule_history")
+    cursor.execute("ALTER TABLE schedule_history_new RENAME TO schedule_history")
+    _create_indexes(cursor)
+
+    print("✅ Migration 035: schedule_history keyed by history_id")
+
+
+def restore_schedule_id_key(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE schedule_history_old (
+            id INTEGER PRIMARY KEY NOT NULL,
+            date TEXT,
+            rules TEXT,
+            user_telegram TEXT NOT NULL,
+            date_week INTEGER,
+            archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    # Only one row per schedule id fits the old key; keep the latest.
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO schedule_history_old (id, {HISTORY_COLUMNS})
+        SELECT schedule_id, {HISTORY_COLUMNS} FROM schedule_history ORDER BY history_id
+    """)
+    cursor.execute("DROP TABLE schedule_history")
+    cursor.execute("ALTER TABLE schedule_history_old RENAME TO schedule_history")
+    _create_indexes(cursor)
+
+
+steps = [step(rekey_schedule_history, restore_schedule_id_key)]
@@ -0,0 +1,43 @@
+"""
+Migration 036: Track which battles game_counts_daily already counts.
+
+Confirming a result added its games to game_counts_daily in a transaction of
+its own, so the same result confirmed twice was counted twice.
+game_counts_battles holds one row per counted battle;
+sqllite_helper.complete_mission adds to both tables in the transaction that
+completes the mission and skips battles already listed.
+
+Filled here with the battles migration 033's backfill counted. Counts that
+were doubled before this migration are corrected by running
+scripts/backfill_game_counts.py.
+"""
+from yoyo import step
+
+
+def add_game_counts_battles(conn):
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS game_counts_battles (
+            battle_id INTEGER PRIMARY KEY
+        )
+    ''')
+
+    cursor.execute('''
+        INSERT OR IGNORE INTO game_counts_battles (battle_id)
+        SELECT MAX(b.id)
+        FROM mission_stack m
+        JOIN battles b ON b.mission_id = m.id
+        WHERE m.status = 3
+          AND m.created_date IS NOT NULL
+        GROUP BY m.id
+    ''')
+    print(f"✅ Migration 036: game_counts_battles filled with {cursor.rowcount} battles")
+
+
+def drop_game_counts_battles(conn):
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS game_counts_battles")
+
+
+steps = [step(add_game_counts_battles, drop_game_counts_battles)]
@@ -15,6 +15,7 @@ else:
     print("✅ Mission Helper using REAL SQLite helper")
 
 import map_helper
+import mission_pool
 import notification_service
 from features import feature_registry
 import register_features  # Ensure features are registered
@@ -27,17 +28,29 @@ ASSETS_DIR = Path(__file__).resolve().parent / "assets" / "deploys"
 WH40K_DEPLOY_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
 
 
+# (directory mtime_ns, image names); re-listed only when the directory changes.
+_wh40k_deploy_images = None
+
+
 def _get_wh40k_deploy_images():
     """Return sorted deploy image filenames for WH40K missions."""
-    if not ASSETS_DIR.exists():
+    global _wh40k_deploy_images
+    try:
+        mtime = ASSETS_DIR.stat().st_mtime_ns
+    except OSError:
         logger.warning("WH40K deploy assets directory not found: %s", ASSETS_DIR)
         return []
 
+    cached = _wh40k_deploy_images
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
     images = [
         item.name for item in ASSETS_DIR.iterdir()
         if item.is_file() and item.suffix.lower() in WH40K_DEPLOY_EXTENSIONS
     ]
     images.sort()
+    _wh40k_deploy_images = (mtime, images)
     return images
 
 # Reinforcement restriction message
@@ -269,6 +282,10 @@ def generate_new_one(rules):
         return ('Only War', rules, None, f'Generic mission for {rules}', None, None)
 
 
+# Ready-made missions per ruleset, refilled in the background.
+pool = mission_pool.MissionPool(generate_new_one)
+
+
 async def ensure_mission_cell(mission_id: int, attacker_id: Optional[str], defender_id: Optional[str]):
     """Assign a mission cell using attacker/defender alliances if it is still missing."""
     mission = await sqllite_helper.get_mission_details(mission_id)
@@ -338,15 +355,8 @@ async def get_mission(rules: Optional[str], attacker_id: Optional[str] = None, d
     Battle cell is determined by finding hexes adjacent to attacker's territory 
     that belong to defender and randomly selecting one of them.
     """
-    # Get mission from database (returns Mission object or None)
-    mission = await sqllite_helper.get_mission(rules)
-    
-    if not mission:
-        # Generate new mission (returns tuple)
-        mission_tuple = generate_new_one(rules)
-        await sqllite_helper.save_mission(mission_tuple)
-        # Re-fetch from DB to get Mission object with ID
-        mission = await sqllite_helper.get_mission(rules)
+    # Claim a pre-generated mission (returns Mission object or None)
+    mission = await pool.claim(rules)
         
     if not mission:
         raise ValueError(f"Failed to get or create mission for rules: {rules}")
@@ -557,19 +567,28 @@ async def confirm_pending_battle_result(
     if not mission_id:
         raise ValueError("Mission for battle not found")
 
-    await ensure_mission_cell(mission_id, fstplayer_id, sndplayer_id)
+    # Take the result before applying it: when it is confirmed twice at once
+    # (Telegram, the admin menu and the web UI) only one caller gets it.
+    pending_result = await sqllite_helper.claim_pending_result(battle_id)
+    if not pending_result:
+        raise ValueError("Pending result not found")
 
-    user_reply = f"{pending_result.fstplayer_score} {pending_result.sndplayer_score}"
+    try:
+        await ensure_mission_cell(mission_id, fstplayer_id, sndplayer_id)
 
-    await write_battle_result(battle_id, user_reply)
-    await apply_mission_rewards(battle_id, user_reply, pending_result.submitter_id)
+        user_reply = f"{pending_result.fstplayer_score} {pending_result.sndplayer_score}"
 
-    mission_details = await sqllite_helper.get_mission_details(mission_id)
-    scenario = mission_details.rules if mission_details else None
-    await map_helper.update_map(battle_id, user_reply, pending_result.submitter_id, scenario)
+        await write_battle_result(battle_id, user_reply)
+        await apply_mission_rewards(battle_id, user_reply, pending_result.submitter_id)
 
-    await sqllite_helper.update_mission_status(mission_id, 3)
-    await sqllite_helper.delete_pending_result(battle_id)
+        mission_details = await sqllite_helper.get_mission_details(mission_id)
+        scenario = mission_details.rules if mission_details else None
+        await map_helper.update_map(battle_id, user_reply, pending_result.submitter_id, scenario)
+
+        await sqllite_helper.complete_mission(mission_id, battle_id)
+    except BaseException:
+        await sqllite_helper.restore_pending_result(pending_result)
+        raise
 
     return {
         "mission_id": mission_id,
@@ -610,7 +629,10 @@ async def reject_pending_battle_result(
     if not mission_id:
         raise ValueError("Mission for battle not found")
 
-    await sqllite_helper.delete_pending_result(battle_id)
+    # A result being confirmed at the same time is no longer pending.
+    pending_result = await sqllite_helper.claim_pending_result(battle_id)
+    if not pending_result:
+        raise ValueError("Pending result not found")
     await sqllite_helper.update_mission_status(mission_id, 1)
 
     return {
@@ -843,50 +865,35 @@ async def apply_mission_rewards(battle_id, user_reply, user_telegram_id):
     }
 
 
-async def handle_alliance_elimination(eliminated_alliance_id, context=None):
-    """Handle alliance elimination by redistributing resources as missions."""
+async def handle_alliance_elimination(eliminated_alliance_id, context=None, dry_run=False):
+    """Handle alliance elimination by redistributing resources as missions.
+
+    Members are released (alliance 0) and the resources become resource
+    collection missions, all in one transaction. Returns the
+    EliminationPlan, or None if the alliance cannot be eliminated.
+    """
     logger.info("Processing elimination of alliance %s", eliminated_alliance_id)
-    
-    # Get eliminated alliance resources
-    alliance_resources = await sqllite_helper.get_alliance_resources(
-        eliminated_alliance_id)
-    
-    # Get count of remaining active alliances (excluding the eliminated one)
-    active_alliances_count = await sqllite_helper.get_active_alliances_count()
-    remaining_alliances = active_alliances_count - 1
-    
-    total_missions = 0
-    if remaining_alliances > 0 and alliance_resources > 0:
-        # Calculate missions to create (integer division, remainder ignored)
-        missions_per_alliance = alliance_resources // remaining_alliances
-        total_missions = missions_per_alliance * remaining_alliances
-        
-        logger.info(
-            "Creating %s resource collection missions "
-            "from %s resources", total_missions, alliance_resources)
-        
-        # Create resource collection missions
-        for i in range(total_missions):
-            mission_data = (
-                "Resource Collection",  # deploy
-                "resource_collection",  # rules
-                None,  # cell (NULL)
-                "Collect resources from eliminated alliance reserves.",
-                None,  # winner_bonus
-                None,  # map_description
-            )
-            await sqllite_helper.save_mission(mission_data)
-    
+
+    try:
+        plan = await sqllite_helper.eliminate_alliance(
+            eliminated_alliance_id, release_players=True,
+            resource_missions=True, dry_run=dry_run)
+    except ValueError as e:
+        logger.warning("Alliance %s not eliminated: %s", eliminated_alliance_id, e)
+        return None
+
+    if dry_run:
+        return plan
+
     # Send notifications if context is provided
     if context:
         await notification_service.notify_alliance_elimination(
-            context, eliminated_alliance_id)
-    
-    # Clear alliance members and delete alliance
-    await sqllite_helper.clear_alliance_members(eliminated_alliance_id)
-    await sqllite_helper.delete_alliance(eliminated_alliance_id)
-    
-    logger.info("Alliance %s eliminated and cleaned up", eliminated_alliance_id)
+            context, eliminated_alliance_id,
+            alliance_name=plan.alliance_name, member_ids=plan.player_ids)
+
+    logger.info("Alliance %s eliminated and cleaned up: %s",
+                eliminated_alliance_id, plan.summary())
+    return plan
 
 
 async def start_battle(mission_id, player1_id, player2_id, forced_battle_id=None):
@@ -0,0 +1,118 @@
+"""Pool of pre-generated missions kept ready in mission_stack.
+
+Claiming a mission used to fall back to generate + save + re-query when a
+ruleset had no free mission, all inside the player's request. MissionPool
+keeps up to `target` unclaimed missions per ruleset instead: after every
+claim a background task tops the ruleset up once it drops below
+`low_water`, and background_jobs refills every known ruleset periodically
+so the first claim after a restart is a hit as well.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+
+import config
+
+# Автоматическое переключение на mock версию в тестовом режиме
+if config.TEST_MODE:
+    import mock_sqlite_helper as sqllite_helper
+else:
+    import sqllite_helper
+
+logger = logging.getLogger(__name__)
+
+POOL_TARGET = int(os.environ.get('MISSION_POOL_TARGET', '5'))
+POOL_LOW_WATER = int(os.environ.get('MISSION_POOL_LOW_WATER', '2'))
+# Rule keys players sign up with (keyboard_constructor) are pooled from the
+# start; any other ruleset is added the first time it is claimed.
+POOL_RULES = tuple(
+    rules.strip()
+    for rules in os.environ.get(
+        'MISSION_POOL_RULES', 'killteam,boardingaction,wh40k,combatpatrol,battlefleet'
+    ).split(',')
+    if rules.strip()
+)
+
+
+class MissionPool:
+    """Keeps `target` unclaimed missions per ruleset in mission_stack.
+
+    Args:
+        generate: callable(rules) returning a mission tuple for save_mission
+        rules: rulesets to keep filled from the start
+    """
+
+    def __init__(self, generate, rules=POOL_RULES, target=POOL_TARGET, low_water=POOL_LOW_WATER):
+        self._generate = generate
+        self._rules = list(rules)
+        self.target = target
+        self.low_water = low_water
+        self._locks = {}
+        self._refills = {}
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+
+    @property
+    def rules(self):
+        return tuple(self._rules)
+
+    async def claim(self, rules):
+        """Lock and return a free mission of rules (a Mission), or None."""
+        mission = await sqllite_helper.get_mission(rules)
+        if mission is None:
+            # Cold pool: first claim of a new ruleset, or drained faster than
+            # the background refill could keep up.
+            self.misses += 1
+            await self.refill(rules)
+            mission = await sqllite_helper.get_mission(rules)
+        else:
+            self.hits += 1
+        self.request_refill(rules)
+        return mission
+
+    def request_refill(self, rules):
+        """Top rules up in the background if it is below the low-water mark."""
+        if rules not in self._rules:
+            self._rules.append(rules)
+        task = self._refills.get(rules)
+        if task is not None and not task.done():
+            return
+        task = asyncio.create_task(self._refill_if_low(rules))
+        self._refills[rules] = task
+        task.add_done_callback(functools.partial(self._forget_refill, rules))
+
+    def _forget_refill(self, rules, task):
+        if self._refills.get(rules) is task:
+            del self._refills[rules]
+
+    async def _refill_if_low(self, rules):
+        try:
+            available = await sqllite_helper.count_available_missions(rules)
+            if available < self.low_water:
+                await self.refill(rules)
+        except Exception as e:
+            logger.error(f"Mission pool refill for {rules} failed: {e}")
+
+    async def refill(self, rules):
+        """Generate missions until rules has `target` free ones; return how many."""
+        lock = self._locks.setdefault(rules, asyncio.Lock())
+        async with lock:
+            available = await sqllite_helper.count_available_missions(rules)
+            missing = self.target - available
+            if missing <= 0:
+                return 0
+            missions = [self._generate(rules) for _ in range(missing)]
+            await sqllite_helper.save_missions(missions)
+        self.generated += missing
+        logger.info(f"Mission pool {rules}: generated {missing} missions ({available} were free)")
+        return missing
+
+    async def refill_all(self):
+        """Refill every known ruleset; return the number of missions generated."""
+        generated = 0
+        for rules in self.rules:
+            generated += await self.refill(rules)
+        return generated
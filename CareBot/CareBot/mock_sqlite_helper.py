@@ -11,7 +11,8 @@ import asyncio
 import random
 import os
 from typing import List, Tuple, Optional, Dict, Any
-from models import Mission, PendingResult
+from models import Mission, PendingResult, UserContext
+import alliance_elimination
 
 # Критическая защита от использования в production
 if os.getenv('CAREBOT_TEST_MODE', 'false').lower() != 'true':
@@ -185,6 +186,26 @@ async def delete_pending_result(battle_id):
     MOCK_PENDING_RESULTS.pop(int(battle_id), None)
     return True
 
+
+async def claim_pending_result(battle_id):
+    print(f"🧪 Mock: claim_pending_result({battle_id})")
+    row = MOCK_PENDING_RESULTS.pop(int(battle_id), None)
+    if not row:
+        return None
+    return PendingResult(**row)
+
+
+async def restore_pending_result(pending_result):
+    print(f"🧪 Mock: restore_pending_result({pending_result.battle_id})")
+    MOCK_PENDING_RESULTS.setdefault(int(pending_result.battle_id), {
+        'id': pending_result.id,
+        'battle_id': pending_result.battle_id,
+        'submitter_id': pending_result.submitter_id,
+        'fstplayer_score': pending_result.fstplayer_score,
+        'sndplayer_score': pending_result.sndplayer_score,
+        'created_at': pending_result.created_at,
+    })
+
 # Map story functions
 async def add_to_story(cell_id, text):
     print(f"🧪 Mock: add_to_story({cell_id}, {text[:50]}...)")
@@ -220,6 +241,28 @@ async def get_all_alliances_with_resources():
     ]
 
 
+def _mock_alliance_stats(alliance_id):
+    players = sum(1 for w in MOCK_WARMASTERS.values() if w['alliance'] == alliance_id)
+    cells = [cell for cell in MOCK_MAP_CELLS if cell[2] == alliance_id]
+    return players, len(cells), sum(1 for cell in cells if cell[3])
+
+
+async def get_alliance_stats(alliance_id):
+    print(f"🧪 Mock: get_alliance_stats({alliance_id})")
+    if not alliance_id:
+        return (0, 0, 0)
+    return _mock_alliance_stats(alliance_id)
+
+
+async def get_alliance_overview():
+    print("🧪 Mock: get_alliance_overview()")
+    return [
+        (alliance['id'], alliance['name'], alliance.get('common_resource', 0),
+         *_mock_alliance_stats(alliance['id']))
+        for alliance in MOCK_ALLIANCES.values()
+    ]
+
+
 async def get_map_cells_for_export():
     """Get map cells for export (mock version)."""
     print("🧪 Mock: get_map_cells_for_export()")
@@ -319,106 +362,83 @@ async def update_alliance_name(alliance_id, new_name):
     return True
 
 
-async def redistribute_players_from_alliance(alliance_id):
-    """Redistribute players from alliance (mock version)."""
-    print(f"🧪 Mock: redistribute_players_from_alliance({alliance_id})")
-    import random
-    
-    # Get players from the alliance to delete
-    players_to_move = []
-    for user in MOCK_WARMASTERS.values():
-        if user['alliance'] == alliance_id:
-            players_to_move.append(user['telegram_id'])
-    
-    if not players_to_move:
-        return 0
-    
-    # Get remaining alliances with their player counts
-    remaining_alliances = []
-    for aid, alliance in MOCK_ALLIANCES.items():
-        if aid != alliance_id:
-            player_count = len([u for u in MOCK_WARMASTERS.values() if u['alliance'] == aid])
-            remaining_alliances.append((aid, player_count))
-    
-    if not remaining_alliances:
-        # No other alliances, set players to no alliance (0)
-        for user in MOCK_WARMASTERS.values():
-            if user['alliance'] == alliance_id:
-                user['alliance'] = 0
-        return len(players_to_move)
-    
-    # Redistribute players one by one to alliances with least players
-    remaining_alliances.sort(key=lambda x: (x[1], x[0]))  # Sort by player count, then ID
-    
-    for player_id in players_to_move:
-        # Find alliance with minimum players (random choice if tie)
-        min_count = remaining_alliances[0][1]
-        min_alliances = [alliance for alliance in remaining_alliances if alliance[1] == min_count]
-        target_alliance = random.choice(min_alliances)
-        
-        # Assign player to target alliance
+async def eliminate_alliance(alliance_id, release_players=False,
+                             resource_missions=False, dry_run=False):
+    """Delete an alliance, handing out its territories and players (mock version)."""
+    print(f"🧪 Mock: eliminate_alliance({alliance_id}, release_players={release_players}, "
+          f"resource_missions={resource_missions}, dry_run={dry_run})")
+    if alliance_id not in MOCK_ALLIANCES:
+        raise ValueError('Alliance not found')
+    recipients = [aid for aid in MOCK_ALLIANCES if aid != alliance_id]
+    if not recipients:
+        raise ValueError('Cannot delete the last alliance')
+
+    territory_counts = dict.fromkeys(recipients, 0)
+    for cell in MOCK_MAP_CELLS:
+        if cell[2] in territory_counts:
+            territory_counts[cell[2]] += 1
+    hexes = [cell[0] for cell in MOCK_MAP_CELLS if cell[2] == alliance_id]
+
+    players = [user['telegram_id'] for user in MOCK_WARMASTERS.values()
+               if user['alliance'] == alliance_id]
+    if release_players:
+        player_assignments = [(0, player) for player in players]
+    else:
+        player_counts = dict.fromkeys(recipients, 0)
         for user in MOCK_WARMASTERS.values():
-            if user['telegram_id'] == player_id:
-                user['alliance'] = target_alliance[0]
-                break
-        
-        # Update counts in our tracking list
-        for i, alliance in enumerate(remaining_alliances):
-            if alliance[0] == target_alliance[0]:
-                remaining_alliances[i] = (alliance[0], alliance[1] + 1)
-                break
-        
-        # Re-sort by player count
-        remaining_alliances.sort(key=lambda x: (x[1], x[0]))
-    
-    return len(players_to_move)
-
+            if user['alliance'] in player_counts:
+                player_counts[user['alliance']] += 1
+        player_assignments = alliance_elimination.plan_players(players, player_counts)
+
+    resources = MOCK_ALLIANCES[alliance_id].get('common_resource', 0) or 0
+    missions = (resources // len(recipients)) * len(recipients) if resource_missions else 0
+    plan = alliance_elimination.EliminationPlan(
+        alliance_id=alliance_id,
+        alliance_name=MOCK_ALLIANCES[alliance_id]['name'],
+        territories=alliance_elimination.plan_territories(hexes, {}, {}, territory_counts),
+        players=player_assignments,
+        resources=resources,
+        resource_missions=missions,
+    )
+    if dry_run:
+        return plan
 
-async def redistribute_territories_from_alliance(alliance_id):
-    """Redistribute territories from alliance (mock version)."""
-    print(f"🧪 Mock: redistribute_territories_from_alliance({alliance_id})")
-    # In mock, we don't track territories, so just return 0
-    return 0
+    patrons = {hex_id: patron for patron, hex_id in plan.territories}
+    MOCK_MAP_CELLS[:] = [
+        (cell[0], cell[1], patrons[cell[0]], *cell[3:]) if cell[0] in patrons else cell
+        for cell in MOCK_MAP_CELLS
+    ]
+    moves = {telegram_id: alliance for alliance, telegram_id in plan.players}
+    for user in MOCK_WARMASTERS.values():
+        if user['telegram_id'] in moves:
+            user['alliance'] = moves[user['telegram_id']]
+    for _ in range(plan.resource_missions):
+        await save_mission(alliance_elimination.RESOURCE_MISSION)
+    del MOCK_ALLIANCES[alliance_id]
+    plan.executed = True
+    return plan
 
 
 async def delete_alliance(alliance_id):
     """Delete an alliance and redistribute its players and territories (mock version)."""
     print(f"🧪 Mock: delete_alliance({alliance_id})")
-    
-    # Check if alliance exists
-    if alliance_id not in MOCK_ALLIANCES:
-        return {
-            'success': False,
-            'players_redistributed': 0,
-            'territories_redistributed': 0,
-            'message': 'Alliance not found'
-        }
-    
-    alliance_name = MOCK_ALLIANCES[alliance_id]['name']
-    
-    # Check if this is the last alliance
-    if len(MOCK_ALLIANCES) <= 1:
+    try:
+        plan = await eliminate_alliance(alliance_id)
+    except ValueError as e:
         return {
             'success': False,
             'players_redistributed': 0,
             'territories_redistributed': 0,
-            'message': 'Cannot delete the last alliance'
+            'message': str(e)
         }
-    
-    # Redistribute territories (mock returns 0)
-    territories_moved = await redistribute_territories_from_alliance(alliance_id)
-    
-    # Redistribute players
-    players_moved = await redistribute_players_from_alliance(alliance_id)
-    
-    # Delete alliance
-    del MOCK_ALLIANCES[alliance_id]
-    
+
+    players_moved = len(plan.players)
+    territories_moved = len(plan.territories)
     return {
         'success': True,
         'players_redistributed': players_moved,
         'territories_redistributed': territories_moved,
-        'message': f'Alliance "{alliance_name}" deleted, {players_moved} players and {territories_moved} territories redistributed'
+        'message': f'Alliance "{plan.alliance_name}" deleted, {players_moved} players and {territories_moved} territories redistributed'
     }
 
 
@@ -532,6 +552,18 @@ async def save_mission(mission_data):
     }
     return mission_id
 
+async def save_missions(missions):
+    print(f"🧪 Mock: save_missions({len(missions)} missions)")
+    for mission_data in missions:
+        await save_mission(mission_data)
+
+async def count_available_missions(rules):
+    print(f"🧪 Mock: count_available_missions({rules})")
+    return sum(
+        1 for mission in MOCK_MISSIONS.values()
+        if mission.get('rules') == rules and int(mission.get('status', 0)) == 0
+    )
+
 async def get_mission_by_id(mission_id):
     print(f"🧪 Mock: get_mission_by_id({mission_id})")
     return MOCK_MISSIONS.get(mission_id, {
@@ -600,45 +632,49 @@ async def is_user_admin(telegram_id):
     return user and user.get('is_admin') == 1
 
 # Локализация
+MOCK_TEXTS = {
+    'welcome_message': 'Добро пожаловать в тестовый режим CareBot!',
+    'main_menu': 'Главное меню (тест)',
+    'settings_menu': 'Настройки (тест)',
+    'game_notification': 'Игровое уведомление (тест)',
+    'missions_title': 'Миссии (тест)',
+    'language_updated': 'Язык обновлен (тест)',
+    'name_updated': 'Имя обновлено (тест)',
+    'notifications_enabled': 'Уведомления включены (тест)',
+    'notifications_disabled': 'Уведомления отключены (тест)',
+    'back_to_main': 'Назад в главное меню (тест)',
+    'enter_name': 'Введите ваше имя (тест):',
+    'invalid_name': 'Неверное имя (тест)',
+    'admin_menu': 'Админ меню (тест)',
+    'access_denied': 'Доступ запрещен (тест)',
+    'button_alliance_resources': 'Информация об альянсе (тест)',
+    'alliance_resources_message': 'Ресурсы альянса {alliance_name}: {resources}',
+    'alliance_info_message': '📊 Информация об альянсе {alliance_name}\n\n💎 Ресурсы: {resources}\n👥 Игроков: {player_count}\n🗺️ Территорий: {territory_count}',
+    'alliance_no_alliance': 'У вас пока нет альянса (тест)',
+    'button_admin_adjust_resources': 'Ресурсы альянсов (тест)',
+    'admin_adjust_resources_title': 'Выберите альянс для изменения ресурсов (тест)',
+    'admin_adjust_resource_prompt': 'Введите изменение ресурсов для {alliance_name} (текущее: {current})',
+    'admin_adjust_resource_success': 'Ресурсы изменены на {delta}, теперь {new_value}',
+    'admin_adjust_resource_invalid': 'Введите целое число',
+    'button_admin_stats': 'Статистика (тест)',
+    'button_admin_stats_users': 'Список пользователей (тест)',
+    'button_admin_stats_alliances': 'Список альянсов (тест)',
+    'admin_stats_title': 'Статистика (тест)',
+    'admin_stats_users_title': 'Игроки за месяц (тест)',
+    'admin_stats_alliances_title': 'Альянсы за месяц (тест)',
+    'admin_stats_alliance_users_title': 'Игроки альянса {alliance_name} (тест)',
+    'admin_stats_no_data': 'Нет данных за последний месяц (тест)',
+    'admin_stats_games_label': 'игр'
+}
+
+MOCK_TEXT_OVERRIDES = {}
+MOCK_TEXTS_VERSION = 0
+
 async def get_localized_text(key, language='ru'):
     print(f"🧪 Mock: get_localized_text({key}, {language})")
-    
-    mock_texts = {
-        'welcome_message': 'Добро пожаловать в тестовый режим CareBot!',
-        'main_menu': 'Главное меню (тест)',
-        'settings_menu': 'Настройки (тест)',
-        'game_notification': 'Игровое уведомление (тест)',
-        'missions_title': 'Миссии (тест)',
-        'language_updated': 'Язык обновлен (тест)',
-        'name_updated': 'Имя обновлено (тест)',
-        'notifications_enabled': 'Уведомления включены (тест)',
-        'notifications_disabled': 'Уведомления отключены (тест)',
-        'back_to_main': 'Назад в главное меню (тест)',
-        'enter_name': 'Введите ваше имя (тест):',
-        'invalid_name': 'Неверное имя (тест)',
-        'admin_menu': 'Админ меню (тест)',
-        'access_denied': 'Доступ запрещен (тест)',
-        'button_alliance_resources': 'Информация об альянсе (тест)',
-        'alliance_resources_message': 'Ресурсы альянса {alliance_name}: {resources}',
-        'alliance_info_message': '📊 Информация об альянсе {alliance_name}\n\n💎 Ресурсы: {resources}\n👥 Игроков: {player_count}\n🗺️ Территорий: {territory_count}',
-        'alliance_no_alliance': 'У вас пока нет альянса (тест)',
-        'button_admin_adjust_resources': 'Ресурсы альянсов (тест)',
-        'admin_adjust_resources_title': 'Выберите альянс для изменения ресурсов (тест)',
-        'admin_adjust_resource_prompt': 'Введите изменение ресурсов для {alliance_name} (текущее: {current})',
-        'admin_adjust_resource_success': 'Ресурсы изменены на {delta}, теперь {new_value}',
-        'admin_adjust_resource_invalid': 'Введите целое число',
-        'button_admin_stats': 'Статистика (тест)',
-        'button_admin_stats_users': 'Список пользователей (тест)',
-        'button_admin_stats_alliances': 'Список альянсов (тест)',
-        'admin_stats_title': 'Статистика (тест)',
-        'admin_stats_users_title': 'Игроки за месяц (тест)',
-        'admin_stats_alliances_title': 'Альянсы за месяц (тест)',
-        'admin_stats_alliance_users_title': 'Игроки альянса {alliance_name} (тест)',
-        'admin_stats_no_data': 'Нет данных за последний месяц (тест)',
-        'admin_stats_games_label': 'игр'
-    }
-    
-    return mock_texts.get(key, f'[ТЕСТ] {key}')
+    if (key, language) in MOCK_TEXT_OVERRIDES:
+        return MOCK_TEXT_OVERRIDES[(key, language)]
+    return MOCK_TEXTS.get(key, f'[ТЕСТ] {key}')
 
 async def add_localized_text(key, language, text):
     print(f"🧪 Mock: add_localized_text({key}, {language}, {text})")
@@ -729,11 +765,10 @@ async def get_mission(rules):
     """
     print(f"🧪 Mock: get_mission({rules})")
 
-    await unlock_expired_missions()
-
     for mission_id, mission in MOCK_MISSIONS.items():
         if mission.get('rules') == rules and int(mission.get('status', 0)) == 0:
             mission['status'] = 1
+            mission['created_date'] = datetime.date.today().isoformat()
             return Mission(
                 id=mission_id,
                 deploy=mission.get('deploy', f"Mock {rules} Deploy"),
@@ -742,7 +777,7 @@ async def get_mission(rules):
                 mission_description=mission.get('mission_description', f"Тестовая миссия для {rules}"),
                 winner_bonus=mission.get('winner_bonus'),
                 status=1,
-                created_date=mission.get('created_date', datetime.date.today().isoformat()),
+                created_date=mission['created_date'],
                 map_description=mission.get('map_description'),
                 reward_config=mission.get('reward_config'),
             )
@@ -826,6 +861,21 @@ async def get_user_bookings_for_dates(user_telegram, dates):
     return {}
 
 
+async def get_user_context(telegram_user_id):
+    print(f"🧪 Mock: get_user_context({telegram_user_id})")
+    user = await get_user_by_telegram_id(telegram_user_id)
+    if not user:
+        return None
+    return UserContext.from_db_row((
+        user['telegram_id'],
+        user.get('nickname'),
+        user.get('registered_as'),
+        user.get('alliance'),
+        user.get('is_admin'),
+        user.get('language', 'ru'),
+        user.get('notifications_enabled', 1)
+    ))
+
 async def get_settings(telegram_user_id):
     print(f"🧪 Mock: get_settings({telegram_user_id})")
     user = await get_user_by_telegram_id(telegram_user_id)
@@ -845,7 +895,37 @@ async def get_warehouses_of_warmaster(telegram_user_id):
 
 async def get_players_for_game(rule, date):
     print(f"🧪 Mock: get_players_for_game({rule}, {date})")
-    return list(MOCK_WARMASTERS.values())
+    # Same shape as the real query: (telegram_id, nickname, notifications_enabled, language)
+    return [
+        (user['telegram_id'], user.get('nickname'), user.get('notifications_enabled', 1),
+         user.get('language', 'ru'))
+        for user in MOCK_WARMASTERS.values()
+    ]
+
+async def get_players_by_alliance(alliance_id):
+    print(f"🧪 Mock: get_players_by_alliance({alliance_id})")
+    return [
+        (user['telegram_id'], user.get('nickname'), user.get('alliance'))
+        for user in MOCK_WARMASTERS.values()
+        if user.get('alliance') == alliance_id
+    ]
+
+async def get_all_players():
+    print("🧪 Mock: get_all_players()")
+    return [
+        (user['telegram_id'], user.get('nickname'), user.get('alliance'))
+        for user in MOCK_WARMASTERS.values()
+    ]
+
+async def get_recipient_settings(telegram_ids):
+    print(f"🧪 Mock: get_recipient_settings({len(telegram_ids)} ids)")
+    settings = {}
+    for telegram_id in telegram_ids:
+        user = await get_user_by_telegram_id(telegram_id)
+        if user:
+            settings[str(telegram_id)] = (
+                user.get('language') or 'ru', user.get('notifications_enabled', 1))
+    return settings
 
 async def get_weekly_rule_participant_count(rule: str, week_number: int) -> int:
     """Mock implementation for getting weekly participant count"""
@@ -859,6 +939,25 @@ async def get_daily_rule_participant_count(rule: str, date: str) -> int:
     # Return random count between 0-6 for testing
     return random.randint(0, 6)
 
+async def get_daily_participant_counts(rules: List[str], dates: List[str]) -> Dict[str, Dict[str, int]]:
+    """Mock implementation for getting daily participant counts for several rules"""
+    print(f"🧪 Mock: get_daily_participant_counts({rules}, {dates})")
+    if not rules or not dates:
+        raise ValueError("Rules and dates lists cannot be empty")
+    users = {rule: {date: set() for date in dates} for rule in rules}
+    for date in dates:
+        for record in MOCK_SCHEDULES.get(date, []):
+            if record['rules'] in users:
+                users[record['rules']][date].add(record['user_telegram'])
+    return {rule: {date: len(ids) for date, ids in by_date.items()}
+            for rule, by_date in users.items()}
+
+async def get_daily_rule_participant_counts(rule: str, dates: List[str]) -> Dict[str, int]:
+    """Mock implementation for getting daily participant counts for one rule"""
+    print(f"🧪 Mock: get_daily_rule_participant_counts({rule}, {dates})")
+    counts = await get_daily_participant_counts([rule], dates)
+    return counts[rule]
+
 async def get_weekly_rule_participant_counts(rules: List[str], week_number: int) -> Dict[str, int]:
     """Mock implementation for getting weekly participant counts for multiple rules.
     Only counts dates that are today or in the future."""
@@ -916,6 +1015,18 @@ async def insert_to_schedule(date, rules, user_telegram):
     })
     return True
 
+MOCK_SCHEDULE_HISTORY = []
+
+async def archive_expired_schedule(before_date, batch_size=500):
+    print(f"🧪 Mock: archive_expired_schedule({before_date}, {batch_size})")
+    archived = 0
+    for date_key in sorted(MOCK_SCHEDULES):
+        if date_key < before_date:
+            rows = MOCK_SCHEDULES.pop(date_key)
+            MOCK_SCHEDULE_HISTORY.extend(rows)
+            archived += len(rows)
+    return archived
+
 async def has_route_to_warehouse(start_id, patron):
     print(f"🧪 Mock: has_route_to_warehouse({start_id}, {patron})")
     return True
@@ -1049,9 +1160,38 @@ async def get_text_by_key(key, language='ru'):
     return await get_localized_text(key, language)
 
 async def add_or_update_text(key, language, value):
+    global MOCK_TEXTS_VERSION
     print(f"🧪 Mock: add_or_update_text({key}, {language}, {value})")
+    MOCK_TEXT_OVERRIDES[(key, language)] = value
+    MOCK_TEXTS_VERSION += 1
     return True
 
+def get_texts_version():
+    return MOCK_TEXTS_VERSION
+
+MOCK_FILE_CACHE = {}
+
+async def get_cached_file_ids():
+    print("🧪 Mock: get_cached_file_ids()")
+    return [(key, kind, file_id) for key, (kind, file_id) in MOCK_FILE_CACHE.items()]
+
+async def save_cached_file_id(cache_key, kind, file_id, replace_kind=False):
+    print(f"🧪 Mock: save_cached_file_id({cache_key}, {kind}, {file_id})")
+    if replace_kind:
+        for key in [k for k, (entry_kind, _) in MOCK_FILE_CACHE.items() if entry_kind == kind]:
+            del MOCK_FILE_CACHE[key]
+    MOCK_FILE_CACHE[cache_key] = (kind, file_id)
+
+async def delete_cached_file_id(cache_key):
+    print(f"🧪 Mock: delete_cached_file_id({cache_key})")
+    MOCK_FILE_CACHE.pop(cache_key, None)
+
+async def get_all_texts():
+    print("🧪 Mock: get_all_texts()")
+    texts = {(key, 'ru'): value for key, value in MOCK_TEXTS.items()}
+    texts.update(MOCK_TEXT_OVERRIDES)
+    return [(key, language, value) for (key, language), value in texts.items()]
+
 async def get_all_texts_for_language(language='ru'):
     print(f"🧪 Mock: get_all_texts_for_language({language})")
     return {
@@ -1088,8 +1228,20 @@ async def get_alliance_territory_count(alliance_id):
         return 0
     return random.randint(1, 5)  # Mock alliances have some territories
 
-async def get_user_game_counts_last_month(alliance_id: int = None):
-    print(f"🧪 Mock: get_user_game_counts_last_month(alliance_id={alliance_id})")
+async def complete_mission(mission_id, battle_id):
+    print(f"🧪 Mock: complete_mission({mission_id}, {battle_id})")
+    await update_mission_status(mission_id, 3)
+
+
+async def rebuild_game_counts():
+    print("🧪 Mock: rebuild_game_counts()")
+    return 0
+
+
+async def get_user_game_counts(days: int = 30, alliance_id: int = None,
+                               rules: str = None, since=None):
+    print(f"🧪 Mock: get_user_game_counts(days={days}, alliance_id={alliance_id}, "
+          f"rules={rules}, since={since})")
     sample_stats = [
         ('325313837', 'TestUser1', 1, 5),
         ('123456789', 'TestUser2', 2, 3),
@@ -1100,13 +1252,23 @@ async def get_user_game_counts_last_month(alliance_id: int = None):
     return sample_stats
 
 
-async def get_alliance_game_counts_last_month():
-    print("🧪 Mock: get_alliance_game_counts_last_month()")
+async def get_alliance_game_counts(days: int = 30, rules: str = None, since=None):
+    print(f"🧪 Mock: get_alliance_game_counts(days={days}, rules={rules}, since={since})")
     return [
         (aid, alliance['name'], random.randint(1, 5))
         for aid, alliance in MOCK_ALLIANCES.items()
     ]
 
+
+async def get_user_game_counts_last_month(alliance_id: int = None):
+    print(f"🧪 Mock: get_user_game_counts_last_month(alliance_id={alliance_id})")
+    return await get_user_game_counts(days=30, alliance_id=alliance_id)
+
+
+async def get_alliance_game_counts_last_month():
+    print("🧪 Mock: get_alliance_game_counts_last_month()")
+    return await get_alliance_game_counts(days=30)
+
 async def get_dominant_alliance():
     """Mock: Get the alliance with the most territories (cells) on the map."""
     print("🧪 Mock: get_dominant_alliance()")
@@ -1311,8 +1473,7 @@ async def get_pending_battles_for_web():
     return result
 
 
-async def get_completed_battles_for_web():
-    print("🧪 Mock: get_completed_battles_for_web()")
+async def _mock_completed_battles():
     result = []
     for battle_id, battle in MOCK_BATTLES.items():
         mission_id = int(battle.get('mission_id', 0))
@@ -1331,3 +1492,60 @@ async def get_completed_battles_for_web():
         row['winner_nick'] = winner_nick
         result.append(row)
     return result
+
+
+BATTLES_PAGE_SIZE = 50
+BATTLE_STATUS_ACTIVE = 1
+BATTLE_STATUS_PENDING = 2
+BATTLE_STATUS_COMPLETED = 3
+
+
+def encode_battles_cursor(created_date, mission_id):
+    return f"{created_date or ''}|{mission_id}"
+
+
+def decode_battles_cursor(cursor):
+    try:
+        sort_key, mission_id = cursor.rsplit('|', 1)
+        return sort_key, int(mission_id)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}") from None
+
+
+async def get_battles_page(status, limit=BATTLES_PAGE_SIZE, cursor=None, rules=None,
+                           alliance_id=None, date_from=None, date_to=None):
+    print(f"🧪 Mock: get_battles_page({status}, limit={limit}, cursor={cursor})")
+    if status == BATTLE_STATUS_ACTIVE:
+        rows = await get_active_battles_for_web()
+    elif status == BATTLE_STATUS_PENDING:
+        rows = await get_pending_battles_for_web()
+    else:
+        rows = await _mock_completed_battles()
+
+    def sort_key(row):
+        return (row['created_date'] or '', row['mission_id'])
+
+    alliance_name = (MOCK_ALLIANCES.get(alliance_id) or {}).get('name')
+    if cursor is not None:
+        after = decode_battles_cursor(cursor)
+        rows = [row for row in rows if sort_key(row) < after]
+    if rules is not None:
+        rows = [row for row in rows if row['rules'] == rules]
+    if date_from is not None:
+        rows = [row for row in rows if (row['created_date'] or '') >= str(date_from)]
+    if date_to is not None:
+        rows = [row for row in rows if row['created_date'] and row['created_date'] <= str(date_to)]
+    if alliance_id is not None:
+        rows = [row for row in rows if alliance_name in (row['p1_alliance'], row['p2_alliance'])]
+    rows.sort(key=lambda row: (sort_key(row), -row['battle_id']), reverse=True)
+
+    missions = list(dict.fromkeys(sort_key(row) for row in rows))
+    next_cursor = None
+    if limit is not None and len(missions) > limit:
+        missions = missions[:limit]
+        next_cursor = encode_battles_cursor(*missions[-1])
+    kept = set(missions)
+    return {
+        'battles': [row for row in rows if sort_key(row) in kept],
+        'next_cursor': next_cursor,
+    }
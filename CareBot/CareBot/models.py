@@ -211,3 +211,39 @@ class PendingResult:
             sndplayer_score=row[4],
             created_at=row[5]
         )
+
+
+@dataclass
+class UserContext:
+    """Everything the menus need to know about a user, read in one query."""
+    telegram_id: str
+    nickname: Optional[str]
+    registered_as: Optional[str]
+    alliance: Optional[int]
+    is_admin: bool
+    language: str
+    notifications_enabled: int
+
+    @classmethod
+    def from_db_row(cls, row):
+        """Create UserContext from database row.
+
+        Args:
+            row: tuple (telegram_id, nickname, registered_as, alliance,
+                 is_admin, language, notifications_enabled)
+        """
+        if not row:
+            return None
+        return cls(
+            telegram_id=row[0],
+            nickname=row[1],
+            registered_as=row[2],
+            alliance=row[3],
+            is_admin=row[4] == 1,
+            language=row[5] or 'ru',
+            notifications_enabled=row[6] if row[6] is not None else 1
+        )
+
+    @property
+    def has_alliance(self):
+        return self.alliance not in (None, 0)
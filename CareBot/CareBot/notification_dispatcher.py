@@ -0,0 +1,145 @@
+"""Concurrent, rate-limited delivery of bot messages to many chats.
+
+Broadcasts used to await send_message one chat at a time. The dispatcher
+sends a batch of deliveries concurrently (at most NOTIFY_CONCURRENCY in
+flight) while staying under Telegram's limits: about 30 messages per
+second for the whole bot and one message per second per chat. A RetryAfter
+(flood control) pauses every send for the requested time and the delivery
+is retried; network errors are retried too, other errors are not.
+Each batch is summarised in BatchStats, the latest ones in metrics().
+"""
+
+import asyncio
+import collections
+import datetime
+import logging
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RATE = float(os.environ.get('NOTIFY_GLOBAL_RATE', '25'))
+PER_CHAT_INTERVAL = float(os.environ.get('NOTIFY_PER_CHAT_INTERVAL', '1.0'))
+CONCURRENCY = int(os.environ.get('NOTIFY_CONCURRENCY', '8'))
+MAX_ATTEMPTS = int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '3'))
+RECENT_BATCHES = 20
+
+
+class Delivery(NamedTuple):
+    """One message: bot.<method>(chat_id=chat_id, **kwargs)."""
+    chat_id: object
+    method: str
+    kwargs: dict
+
+
+class BatchStats:
+    """Delivery counters of one dispatched batch."""
+
+    def __init__(self, name, total):
+        self.name = name
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.started = datetime.datetime.now()
+        self.seconds = None
+
+    def snapshot(self):
+        return {
+            'name': self.name,
+            'started': self.started.isoformat(timespec='seconds'),
+            'total': self.total,
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries': self.retries,
+            'seconds': self.seconds,
+        }
+
+
+def _seconds(retry_after):
+    if isinstance(retry_after, datetime.timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class NotificationDispatcher:
+    """Sends batches of deliveries concurrently within Telegram's rate limits."""
+
+    def __init__(self, global_rate=GLOBAL_RATE, per_chat_interval=PER_CHAT_INTERVAL,
+                 concurrency=CONCURRENCY, max_attempts=MAX_ATTEMPTS):
+        self.global_interval = 1.0 / global_rate
+        self.per_chat_interval = per_chat_interval
+        self.max_attempts = max_attempts
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._chat_next = {}
+        self._recent_lock = threading.Lock()
+        self._recent = collections.deque(maxlen=RECENT_BATCHES)
+
+    async def _wait_turn(self, chat_id):
+        # Slots are reserved without awaiting, so concurrent senders on the
+        # loop never get the same one.
+        now = time.monotonic()
+        global_slot = max(now, self._next_slot)
+        self._next_slot = global_slot + self.global_interval
+        start = max(global_slot, self._paused_until, self._chat_next.get(chat_id, 0.0))
+        self._chat_next[chat_id] = start + self.per_chat_interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _deliver(self, bot, delivery, stats):
+        async with self._semaphore:
+            for attempt in range(1, self.max_attempts + 1):
+                await self._wait_turn(delivery.chat_id)
+                try:
+                    await getattr(bot, delivery.method)(chat_id=delivery.chat_id, **delivery.kwargs)
+                    stats.sent += 1
+                    return True
+                except RetryAfter as e:
+                    # Flood control applies to the whole bot, not just this chat.
+                    delay = _seconds(e.retry_after)
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    error = e
+                except (Forbidden, BadRequest) as e:
+                    # Blocked the bot, chat not found, ...: retrying will not help.
+                    error = e
+                    break
+                except NetworkError as e:
+                    error = e
+                except Exception as e:
+                    error = e
+                    break
+                if attempt < self.max_attempts:
+                    stats.retries += 1
+            stats.failed += 1
+            logger.warning(f"Failed to deliver {stats.name} to {delivery.chat_id}: {error}")
+            return False
+
+    async def send(self, bot, deliveries, name='notification'):
+        """Deliver every Delivery in deliveries and return the batch's BatchStats."""
+        stats = BatchStats(name, len(deliveries))
+        start = time.perf_counter()
+        await asyncio.gather(*(self._deliver(bot, delivery, stats) for delivery in deliveries))
+        stats.seconds = time.perf_counter() - start
+
+        now = time.monotonic()
+        self._chat_next = {chat: t for chat, t in self._chat_next.items() if t > now}
+        with self._recent_lock:
+            self._recent.append(stats)
+        logger.info(
+            f"Dispatched {name}: {stats.sent}/{stats.total} sent, {stats.failed} failed, "
+            f"{stats.retries} retries in {stats.seconds:.1f}s")
+        return stats
+
+    def metrics(self):
+        """Snapshots of the most recent batches, oldest first."""
+        with self._recent_lock:
+            return [stats.snapshot() for stats in self._recent]
+
+
+dispatcher = NotificationDispatcher()
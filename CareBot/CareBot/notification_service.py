@@ -1,5 +1,8 @@
 """
 Notification service for sending game notifications to players
+
+Recipients' languages come from one query, each text is rendered once per
+language, and messages go out through notification_dispatcher.
 """
 import logging
 from telegram.ext import ContextTypes
@@ -13,17 +16,79 @@ else:
     import sqllite_helper
     print("✅ Notification Service using REAL SQLite helper")
 import localization
+from notification_dispatcher import Delivery, dispatcher
 
 logger = logging.getLogger(__name__)
 
 
-async def notify_players_about_game(context: ContextTypes.DEFAULT_TYPE, 
-                                    organizer_id: int, 
-                                    game_date: str, 
+async def render_per_language(key, languages, **kwargs):
+    """Render text key once for each distinct language: {language: text}."""
+    return {
+        language: await localization.get_text(key, language, **kwargs)
+        for language in set(languages)
+    }
+
+
+async def send_localized(bot, recipients, key, name, **kwargs):
+    """
+    Send text key to every (chat_id, language) in recipients.
+
+    Returns:
+        BatchStats of the dispatched batch
+    """
+    texts = await render_per_language(key, (language for _, language in recipients), **kwargs)
+    deliveries = [
+        Delivery(chat_id, 'send_message', {'text': texts[language]})
+        for chat_id, language in recipients
+    ]
+    return await dispatcher.send(bot, deliveries, name)
+
+
+async def _notify_game_players(context, organizer_id, game_date, game_rules, key):
+    # Get all players signed up for the same game (including organizer)
+    players = await sqllite_helper.get_players_for_game(game_rules, game_date)
+
+    if not players:
+        logger.info(f"No players found for game on {game_date} with rules {game_rules}")
+        return None
+
+    organizer_name = next(
+        (player[1] for player in players if str(player[0]) == str(organizer_id) and player[1]),
+        None)
+    if organizer_name is None:
+        organizer_settings = await sqllite_helper.get_settings(organizer_id)
+        organizer_name = organizer_settings[0] if organizer_settings and organizer_settings[0] else "Unknown Player"
+
+    # Filter out the organizer and players with notifications disabled
+    recipients = []
+    for player in players:
+        player_id = player[0]
+        notifications_enabled = player[2] if len(player) > 2 else 1
+        language = player[3] if len(player) > 3 and player[3] else 'ru'
+
+        if str(player_id) == str(organizer_id):
+            continue
+        if notifications_enabled != 1:
+            logger.info(f"Notifications disabled for player {player_id}, skipping")
+            continue
+        recipients.append((player_id, language))
+
+    logger.info(f"Notifying {len(recipients)} players about {key} by {organizer_name}")
+    return await send_localized(
+        context.bot, recipients, key, key,
+        player_name=organizer_name,
+        game_date=game_date,
+        game_rules=game_rules
+    )
+
+
+async def notify_players_about_game(context: ContextTypes.DEFAULT_TYPE,
+                                    organizer_id: int,
+                                    game_date: str,
                                     game_rules: str):
     """
     Notify all players who signed up for the same game about a new participant
-    
+
     Args:
         context: Telegram bot context
         organizer_id: ID of the player who just signed up
@@ -31,59 +96,7 @@ async def notify_players_about_game(context: ContextTypes.DEFAULT_TYPE,
         game_rules: Game rules/type
     """
     try:
-        # Get all players signed up for the same game (including organizer)
-        players = await sqllite_helper.get_players_for_game(game_rules, game_date)
-        
-        if not players:
-            logger.info(f"No players found for game on {game_date} with rules {game_rules}")
-            return
-            
-        # Get organizer info
-        organizer_settings = await sqllite_helper.get_settings(organizer_id)
-        organizer_name = organizer_settings[0] if organizer_settings and organizer_settings[0] else "Unknown Player"
-        
-        # Filter out the organizer from notification list and check notifications
-        opponents_to_notify = []
-        for player in players:
-            player_id = player[0]
-            player_name = player[1] 
-            notifications_enabled = player[2] if len(player) > 2 else 1
-            
-            # Skip the organizer themselves
-            if player_id == organizer_id:
-                continue
-                
-            # Check if notifications are enabled
-            if notifications_enabled != 1:
-                logger.info(f"Notifications disabled for player {player_id}, skipping")
-                continue
-                
-            opponents_to_notify.append(player_id)
-        
-        logger.info(f"Notifying {len(opponents_to_notify)} players about new participant {organizer_name}")
-        
-        for opponent_id in opponents_to_notify:
-            try:
-                # Get localized notification message
-                notification_text = await localization.get_text_for_user(
-                    opponent_id, 
-                    "game_notification",
-                    player_name=organizer_name,
-                    game_date=game_date,
-                    game_rules=game_rules
-                )
-                
-                # Send notification
-                await context.bot.send_message(
-                    chat_id=opponent_id,
-                    text=notification_text
-                )
-                
-                logger.info(f"Notification sent to player {opponent_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to send notification to player {opponent_id}: {e}")
-                
+        await _notify_game_players(context, organizer_id, game_date, game_rules, "game_notification")
     except Exception as e:
         logger.error(f"Error in notify_players_about_game: {e}")
 
@@ -94,7 +107,7 @@ async def notify_game_cancellation(context: ContextTypes.DEFAULT_TYPE,
                                  game_rules: str):
     """
     Notify players about game cancellation
-    
+
     Args:
         context: Telegram bot context
         organizer_id: ID of the player who cancelled
@@ -102,125 +115,54 @@ async def notify_game_cancellation(context: ContextTypes.DEFAULT_TYPE,
         game_rules: Game rules/type
     """
     try:
-        # Get all players signed up for the same game
-        opponents = await sqllite_helper.get_opponents(organizer_id, f"{game_date},{game_rules}")
-        
-        if not opponents:
-            return
-            
-        # Get organizer info
-        organizer_settings = await sqllite_helper.get_settings(organizer_id)
-        organizer_name = organizer_settings[0] if organizer_settings and organizer_settings[0] else "Unknown Player"
-        
-        logger.info(f"Notifying {len(opponents)} players about game cancellation by {organizer_name}")
-        
-        for opponent in opponents:
-            opponent_id = opponent[0]
-            
-            # Check if opponent has notifications enabled
-            opponent_settings = await sqllite_helper.get_settings(opponent_id)
-            if not opponent_settings or len(opponent_settings) < 4:
-                continue
-                
-            notifications_enabled = opponent_settings[3] if len(opponent_settings) > 3 else 1
-            if notifications_enabled != 1:
-                continue
-            
-            # Get localized cancellation message
-            try:
-                cancellation_text = await localization.get_text_for_user(
-                    opponent_id,
-                    "game_cancellation",
-                    player_name=organizer_name,
-                    game_date=game_date,
-                    game_rules=game_rules
-                )
-                
-                await context.bot.send_message(
-                    chat_id=opponent_id,
-                    text=cancellation_text
-                )
-                
-                logger.info(f"Cancellation notification sent to player {opponent_id}")
-                
-            except Exception as e:
-                logger.error(f"Failed to send cancellation notification to player {opponent_id}: {e}")
-                
+        await _notify_game_players(context, organizer_id, game_date, game_rules, "game_cancellation")
     except Exception as e:
         logger.error(f"Error in notify_game_cancellation: {e}")
 
 
 async def notify_alliance_elimination(context: ContextTypes.DEFAULT_TYPE,
-                                      eliminated_alliance_id: int):
+                                      eliminated_alliance_id: int,
+                                      alliance_name: str = None,
+                                      member_ids=None):
     """
     Notify all players about alliance elimination and resource missions
-    
+
     Args:
         context: Telegram bot context
         eliminated_alliance_id: ID of the eliminated alliance
+        alliance_name: its name, when it is already deleted
+        member_ids: its former members, when they have already been released
     """
     try:
-        # Get all players from eliminated alliance
-        eliminated_players = await sqllite_helper.get_players_by_alliance(
-            eliminated_alliance_id)
-        
-        # Get alliance name
-        alliance_info = await sqllite_helper.get_alliance_by_id(
-            eliminated_alliance_id)
-        alliance_name = (alliance_info[1] if alliance_info
-                         else "Unknown Alliance")
-        
-        # Notify eliminated alliance players
-        for player in eliminated_players:
-            player_id = player[0]
-            try:
-                elimination_text = await localization.get_text_for_user(
-                    player_id, "alliance_eliminated_player")
-                elimination_text = elimination_text.format(
-                    alliance_name=alliance_name)
-                
-                await context.bot.send_message(
-                    chat_id=player_id,
-                    text=elimination_text
-                )
-                
-                logger.info(
-                    "Elimination notification sent to player %s", player_id)
-                
-            except Exception as e:
-                logger.error(
-                    "Failed to send elimination notification to "
-                    "player %s: %s", player_id, e)
-        
-        # Notify all other players about resource missions
+        if alliance_name is None:
+            alliance_info = await sqllite_helper.get_alliance_by_id(
+                eliminated_alliance_id)
+            alliance_name = (alliance_info[1] if alliance_info
+                             else "Unknown Alliance")
+        members = {str(player_id) for player_id in member_ids or ()}
+
         all_players = await sqllite_helper.get_all_players()
+        languages = await sqllite_helper.get_recipient_settings(
+            [player[0] for player in all_players])
+
+        # Players of the eliminated alliance get their own message, everybody
+        # else hears about the resource missions.
+        eliminated, others = [], []
         for player in all_players:
             player_id = player[0]
             player_alliance = player[2] if len(player) > 2 else 0
-            
-            # Skip players from eliminated alliance (already notified)
-            if player_alliance == eliminated_alliance_id:
-                continue
-                
-            try:
-                missions_text = await localization.get_text_for_user(
-                    player_id, "resource_missions_created")
-                missions_text = missions_text.format(
-                    alliance_name=alliance_name)
-                
-                await context.bot.send_message(
-                    chat_id=player_id,
-                    text=missions_text
-                )
-                
-                logger.info(
-                    "Resource missions notification sent to player %s",
-                    player_id)
-                
-            except Exception as e:
-                logger.error(
-                    "Failed to send missions notification to "
-                    "player %s: %s", player_id, e)
-                
+            language = languages.get(str(player_id), ('ru', 1))[0]
+            if player_alliance == eliminated_alliance_id or str(player_id) in members:
+                eliminated.append((player_id, language))
+            else:
+                others.append((player_id, language))
+
+        await send_localized(
+            context.bot, eliminated, "alliance_eliminated_player",
+            "alliance_eliminated_player", alliance_name=alliance_name)
+        await send_localized(
+            context.bot, others, "resource_missions_created",
+            "resource_missions_created", alliance_name=alliance_name)
+
     except Exception as e:
         logger.error("Error in notify_alliance_elimination: %s", e)
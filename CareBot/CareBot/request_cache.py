@@ -0,0 +1,101 @@
+"""Request-scoped cache for warmaster lookups.
+
+A single callback often asks for the same warmaster's settings, alliance
+and language several times (directly, via localization and via the keyboard
+builders). A fresh WarmasterCache is attached to the PTB context at the start
+of every Update and made current for the coroutines handling it, so repeated
+lookups within that Update hit the database once.
+
+Outside of an Update (web views, scripts, tests) no cache is current and the
+memoized helpers behave exactly like the undecorated ones.
+"""
+
+import contextvars
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Name of the attribute holding the cache on the PTB CallbackContext.
+CONTEXT_ATTRIBUTE = 'warmaster_cache'
+
+_current_cache = contextvars.ContextVar('warmaster_cache', default=None)
+
+
+class WarmasterCache:
+    """Memoized warmaster rows for the lifetime of one Update."""
+
+    def __init__(self):
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, kind, telegram_id, loader):
+        key = (kind, str(telegram_id))
+        if key in self._entries:
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        value = await loader(telegram_id)
+        self._entries[key] = value
+        return value
+
+    def invalidate(self, telegram_id=None):
+        """Drop cached rows for one warmaster, or everything if None."""
+        if telegram_id is None:
+            self._entries.clear()
+            return
+        telegram_id = str(telegram_id)
+        for key in [k for k in self._entries if k[1] == telegram_id]:
+            del self._entries[key]
+
+
+def current():
+    """Return the cache of the Update being handled, if any."""
+    return _current_cache.get()
+
+
+def activate(cache=None):
+    """Make cache (or a new one) current for this task and return it."""
+    cache = cache if cache is not None else WarmasterCache()
+    _current_cache.set(cache)
+    return cache
+
+
+def deactivate():
+    _current_cache.set(None)
+
+
+async def begin_update(update, context):
+    """Group -1 handler: start a fresh cache for this Update."""
+    cache = activate()
+    setattr(context, CONTEXT_ATTRIBUTE, cache)
+
+
+async def end_update(update, context):
+    """Last-group handler: drop the cache once the Update is handled."""
+    cache = getattr(context, CONTEXT_ATTRIBUTE, None)
+    if cache is not None and (cache.hits or cache.misses):
+        logger.debug("Warmaster cache for update %s: %s hits, %s misses",
+                     update.update_id, cache.hits, cache.misses)
+    deactivate()
+
+
+def memoize(kind):
+    """Decorate an async lookup taking a telegram_id as its only argument."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(telegram_id):
+            cache = _current_cache.get()
+            if cache is None:
+                return await func(telegram_id)
+            return await cache.get(kind, telegram_id, func)
+        return wrapper
+    return decorator
+
+
+def invalidate(telegram_id=None):
+    """Invalidate cached rows after a write to the warmasters table."""
+    cache = _current_cache.get()
+    if cache is not None:
+        cache.invalidate(telegram_id)
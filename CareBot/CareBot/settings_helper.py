@@ -40,6 +40,24 @@ async def get_user_settings(user_id: int) -> tuple:
         return None
 
 
+async def get_user_context(user_id: int):
+    """
+    Get everything the menus need about a user with a single query.
+    
+    Args:
+        user_id: Telegram user ID
+        
+    Returns:
+        UserContext: nickname, alliance, admin flag, language and
+        notification flag, or None if the user is unknown
+    """
+    try:
+        return await sqllite_helper.get_user_context(user_id)
+    except Exception as e:
+        logger.error(f"Failed to get context for user {user_id}: {e}")
+        return None
+
+
 async def set_user_language(user_id: int, language: str) -> bool:
     """
     Set user language preference.
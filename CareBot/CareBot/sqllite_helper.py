@@ -1,16 +1,21 @@
 ﻿"""Helper functions for interacting with the SQLite database asynchronously
-using aiosqlite.
+through the shared connections in db_pool.
 
 Enhanced with detailed debug logging for alliance/opponent resolution.
 """
 
+import asyncio
 import datetime
-import aiosqlite
 import os
-import random
 import logging
+import time
 from typing import List, Dict, Optional
-from models import Mission, Battle, MissionDetails, Warmaster, Alliance, MapCell, PendingResult
+import alliance_elimination
+import db_pool
+import hex_graph
+import request_cache
+import web_cache
+from models import Mission, Battle, MissionDetails, Warmaster, Alliance, MapCell, PendingResult, UserContext
 
 logger = logging.getLogger(__name__)
 
@@ -18,14 +23,30 @@ logger = logging.getLogger(__name__)
 DATABASE_PATH = os.environ.get('DATABASE_PATH', 
     r"C:\Users\al-gerasimov\source\repos\Care\CareBot\CareBot\db\database")
 
+# Short-lived cache for calendar participant counts, keyed by
+# (rules, dates). Cleared by insert_to_schedule and archive_expired_schedule.
+PARTICIPANT_COUNTS_TTL = 30
+_participant_counts_cache = {}
+
+# Shared in-memory map graph, loaded on first use and kept in sync by the
+# map write helpers. The version guards against installing a graph that was
+# loaded while a write was in flight.
+_hex_graph = None
+_hex_graph_version = 0
+
+# Bumped on every write to the texts table so the localization catalog can
+# tell that its in-memory copy is stale.
+_texts_version = 0
+
 
 async def add_battle_participant(battle_id, participant):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             INSERT INTO battle_attenders(battle_id, attender_id)
             VALUES(?, ?)
         ''', (battle_id, participant))
         await db.commit()
+        web_cache.invalidate_battles()
 
 
 async def add_battle(mission_id):
@@ -37,11 +58,12 @@ async def add_battle(mission_id):
     Returns:
         Tuple with battle ID
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             INSERT INTO battles(mission_id) VALUES(?)
         ''', (mission_id,))
         await db.commit()
+        web_cache.invalidate_battles()
         async with db.execute('SELECT last_insert_rowid()') as cursor:
             return await cursor.fetchone()
 
@@ -56,17 +78,18 @@ async def add_battle_with_id(mission_id, battle_id):
     Returns:
         Tuple with battle ID
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             INSERT INTO battles(id, mission_id) VALUES(?, ?)
         ''', (battle_id, mission_id))
         await db.commit()
+        web_cache.invalidate_battles()
         return (battle_id,)
 
 
 async def battle_exists(battle_id: int) -> bool:
     """Check whether a battle with the specified ID already exists."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT 1 FROM battles WHERE id = ? LIMIT 1
         ''', (battle_id,)) as cursor:
@@ -83,7 +106,7 @@ async def get_mission_id_for_battle(battle_id):
     Returns:
         int: Mission ID if found, None otherwise
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT mission_id FROM battles WHERE id = ?
         ''', (battle_id,)) as cursor:
@@ -92,7 +115,7 @@ async def get_mission_id_for_battle(battle_id):
 
 
 async def add_to_story(cell_id, text):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             INSERT OR IGNORE INTO map_story(hex_id, content)
             VALUES(?,?)
@@ -100,7 +123,7 @@ async def add_to_story(cell_id, text):
         await db.commit()
 
 async def get_cell_history(cell_id):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT content
             FROM map_story
@@ -108,16 +131,58 @@ async def get_cell_history(cell_id):
         ''', (cell_id,)) as cursor:
             return await cursor.fetchall()
 
+
+async def get_hex_graph():
+    """Return the shared HexGraph, loading the map on first use.
+
+    Neighbours are computed from the q/r coordinates; maps without them
+    (see migration 031) still load the edges table.
+    """
+    global _hex_graph
+    if _hex_graph is not None:
+        return _hex_graph
+    version = _hex_graph_version
+    async with db_pool.read(DATABASE_PATH) as db:
+        async with db.execute('SELECT id, patron, has_warehouse, q, r FROM map') as cursor:
+            rows = await cursor.fetchall()
+        if rows and all(row[3] is not None and row[4] is not None for row in rows):
+            edges = hex_graph.coordinate_edges((row[0], row[3], row[4]) for row in rows)
+        else:
+            async with db.execute('SELECT left_hexagon, right_hexagon FROM edges') as cursor:
+                edges = await cursor.fetchall()
+    graph = hex_graph.HexGraph([row[:3] for row in rows], edges)
+    if version == _hex_graph_version:
+        _hex_graph = graph
+        logger.info(f"Loaded hex graph: {len(graph)} hexes, {len(edges)} edges")
+    return graph
+
+
+def invalidate_hex_graph():
+    """Drop the shared HexGraph after bulk map changes; reloaded on next use."""
+    global _hex_graph, _hex_graph_version
+    _hex_graph = None
+    _hex_graph_version += 1
+
+
+def _update_hex_graph(apply):
+    """Apply an incremental change to the loaded HexGraph, if any."""
+    global _hex_graph_version
+    _hex_graph_version += 1
+    if _hex_graph is not None and not apply(_hex_graph):
+        invalidate_hex_graph()
+
+
 async def set_cell_patron(cell_id, winner_alliance_id):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE map SET patron=? WHERE id=?
         ''', (winner_alliance_id, cell_id))
         await db.commit()
+    _update_hex_graph(lambda graph: graph.set_patron(cell_id, winner_alliance_id))
 
 
 async def get_cell_id_by_battle_id(battle_id: int):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT mission_stack.cell
             FROM battles
@@ -128,24 +193,12 @@ async def get_cell_id_by_battle_id(battle_id: int):
             return result[0] if result else None
 
 async def get_next_hexes_filtered_by_patron(cell_id, alliance):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute('''
-            SELECT e.right_hexagon AS neighbor_id
-            FROM edges e
-            JOIN map m ON e.right_hexagon = m.id
-            WHERE e.left_hexagon = ?
-              AND m.patron = ?
-            UNION
-            SELECT e.left_hexagon AS neighbor_id
-            FROM edges e
-            JOIN map m ON e.left_hexagon = m.id
-            WHERE e.right_hexagon = ?
-              AND m.patron = ?
-        ''', (cell_id, alliance, cell_id, alliance)) as cursor:
-            return await cursor.fetchall()
+    graph = await get_hex_graph()
+    return [(neighbor_id,) for neighbor_id in graph.neighbours_with_patron(cell_id, alliance)]
 
+@request_cache.memoize('nickname')
 async def get_nicknamane(telegram_id):
-        async with aiosqlite.connect(DATABASE_PATH) as db:
+        async with db_pool.read(DATABASE_PATH) as db:
             async with db.execute('SELECT nickname FROM warmasters WHERE telegram_id=?', (telegram_id,)) as cursor:
                 result = await cursor.fetchone()
                 return result[0] if result else None
@@ -156,26 +209,14 @@ async def get_nickname_by_telegram_id(telegram_id):
     return await get_nicknamane(telegram_id)
 
 async def get_number_of_safe_next_cells(cell_id):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute('''
-            SELECT COUNT(*) AS same_patron_neighbors
-            FROM edges e
-            JOIN map m1 ON (e.left_hexagon = m1.id OR e.right_hexagon = m1.id)
-            JOIN map m2 ON (
-                (e.left_hexagon = m2.id OR e.right_hexagon = m2.id)
-                AND m2.id != m1.id
-            )
-            WHERE m1.id = ?
-              AND m2.patron = m1.patron;
-        ''', (cell_id,)) as cursor:
-            result = await cursor.fetchone()
-            return result[0] if result else 0
+    graph = await get_hex_graph()
+    return graph.safe_neighbour_count(cell_id)
 
 async def get_opponent_telegram_id(battle_id, current_user_telegram_id):
     logger.info(
         "get_opponent_telegram_id(battle_id=%s, current_user=%s [type=%s])",
         battle_id, current_user_telegram_id, type(current_user_telegram_id))
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         # First try the new battle_attenders table
         async with db.execute('''
             SELECT attender_id
@@ -226,7 +267,7 @@ async def get_active_battle_id_for_mission(mission_id, user_telegram_id):
     Returns:
         int: Battle ID if found, None otherwise
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         # First try to find battle with participants in battle_attenders
         async with db.execute('''
             SELECT b.id FROM battles b
@@ -251,7 +292,7 @@ async def get_active_battle_id_for_mission(mission_id, user_telegram_id):
 
 
 async def get_rules_of_mission(number_of_mission):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT rules
             FROM schedule
@@ -262,7 +303,7 @@ async def get_rules_of_mission(number_of_mission):
 
 
 async def get_state(cell_id):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT state
             FROM map
@@ -282,32 +323,35 @@ async def add_battle_result(mission_id, counts1, counts2):
         counts1: First player score (fstplayer score)
         counts2: Second player score (sndplayer score)
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE battles
             SET fstplayer = ?, sndplayer = ?
             WHERE mission_id = ?
         ''', (counts1, counts2, mission_id))
         await db.commit()
+        web_cache.invalidate_battles()
 
 
 async def add_warmaster(telegram_id):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             INSERT OR IGNORE INTO warmasters(telegram_id) VALUES(?)
         ''', (telegram_id,))
         await db.commit()
+    request_cache.invalidate(telegram_id)
 
 
 async def destroy_warehouse(cell_id):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE map SET has_warehouse=0 WHERE id=?
         ''', (cell_id,))
         await db.commit()
+    _update_hex_graph(lambda graph: graph.set_warehouse(cell_id, False))
 
 async def get_event_participants(eventId):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT user_telegram 
             FROM schedule 
@@ -326,7 +370,7 @@ async def get_user_telegram_by_schedule_id(schedule_id):
     Returns:
         str: The user_telegram ID from the schedule entry, or None if not found
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT user_telegram 
             FROM schedule 
@@ -345,7 +389,7 @@ async def get_telegram_id_by_warmaster_id(warmaster_id):
     Returns:
         str: The telegram_id of the warmaster, or None if not found
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT telegram_id 
             FROM warmasters 
@@ -356,7 +400,7 @@ async def get_telegram_id_by_warmaster_id(warmaster_id):
 
 
 async def get_faction_of_warmaster(user_telegram_id):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
          async with db.execute('''
             SELECT faction
             FROM warmasters
@@ -367,7 +411,7 @@ async def get_faction_of_warmaster(user_telegram_id):
 async def unlock_expired_missions():
     """Unlock all missions with past dates that are still locked.
     
-    This function updates all missions where:
+    Run by the mission_expiry job in background_jobs. Updates all missions where:
     - status = 1 (mission is active/locked)
     - created_date is before today (mission is from a past date)
     - created_date is NULL (old missions without date - also unlocked for safety)
@@ -375,7 +419,7 @@ async def unlock_expired_missions():
     Returns:
         int: Number of missions unlocked
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         today = datetime.date.today().isoformat()
         cursor = await db.execute('''
             UPDATE mission_stack 
@@ -383,6 +427,7 @@ async def unlock_expired_missions():
             WHERE status=1 AND (created_date < ? OR created_date IS NULL)
         ''', (today,))
         await db.commit()
+        web_cache.invalidate_battles()
         return cursor.rowcount
 
 
@@ -441,11 +486,12 @@ async def get_mission(rules) -> Optional[Mission]:
 
     Note:
         Missions with NULL id will have a new id generated and updated in the database.
+        Missions locked on earlier days are released by the mission_expiry job
+        in background_jobs, not here. Pooled missions may have been generated
+        on an earlier day, so created_date is set to the claim day.
     """
-    # Unlock any expired missions before fetching
-    await unlock_expired_missions()
-
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
+        today = datetime.date.today().isoformat()
         await db.execute("BEGIN IMMEDIATE")
 
         async with db.execute('''
@@ -474,9 +520,9 @@ async def get_mission(rules) -> Optional[Mission]:
         mission_id = row[0]
         cursor = await db.execute('''
             UPDATE mission_stack
-            SET status=1
+            SET status=1, created_date=?
             WHERE id=? AND status=0
-        ''', (mission_id,))
+        ''', (today, mission_id))
 
         # Defensive guard: if row wasn't updated, mission was already claimed.
         if cursor.rowcount != 1:
@@ -484,12 +530,13 @@ async def get_mission(rules) -> Optional[Mission]:
             return None
 
         await db.commit()
+        web_cache.invalidate_battles()
         return Mission.from_db_row((
-            row[0], row[1], row[2], row[3], row[4], row[5], 1, row[7], row[8], row[9]
+            row[0], row[1], row[2], row[3], row[4], row[5], 1, today, row[8], row[9]
         ))
 
 async def get_schedule_by_user(user_telegram, date=None):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         query = 'SELECT * FROM schedule WHERE user_telegram=?'
         params = [user_telegram]
         if date:
@@ -504,7 +551,7 @@ async def get_schedule_with_warmasters(user_telegram, date=None):
     Returns: List of tuples (schedule_id, rules, opponent_nickname, warmaster_id)
     Uses warmaster.id instead of telegram_id for security.
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             WITH current_user_alliance AS (
                 SELECT alliance FROM warmasters WHERE telegram_id=?
@@ -544,7 +591,7 @@ async def get_user_bookings_for_dates(user_telegram, dates: List[str]) -> Dict[s
     if not dates:
         return {}
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         # Create placeholders for the IN clause
         placeholders = ','.join('?' * len(dates))
         async with db.execute(f'''
@@ -556,8 +603,9 @@ async def get_user_bookings_for_dates(user_telegram, dates: List[str]) -> Dict[s
             return {date: rule for date, rule in results}
 
 
+@request_cache.memoize('settings')
 async def get_settings(telegram_user_id):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT nickname, registered_as, language, notifications_enabled FROM warmasters 
             WHERE telegram_id=?
@@ -565,8 +613,24 @@ async def get_settings(telegram_user_id):
             return await cursor.fetchone()
 
 
+async def get_user_context(telegram_user_id):
+    """Nickname, alliance, admin flag, language and notification flag in one read.
+
+    Returns:
+        UserContext, or None if the user is not registered
+    """
+    async with db_pool.read(DATABASE_PATH) as db:
+        async with db.execute('''
+            SELECT telegram_id, nickname, registered_as, alliance, is_admin,
+                   language, notifications_enabled
+            FROM warmasters
+            WHERE telegram_id=?
+        ''', (telegram_user_id,)) as cursor:
+            return UserContext.from_db_row(await cursor.fetchone())
+
+
 async def get_warehouses_of_warmaster(telegram_user_id):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT id
             FROM map
@@ -579,10 +643,15 @@ async def get_warehouses_of_warmaster(telegram_user_id):
 
 
 async def get_players_for_game(rule, date):
-    """Get all players registered for a specific game by rule and date"""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    """Get all players registered for a specific game by rule and date.
+
+    Returns:
+        List of (telegram_id, nickname, notifications_enabled, language)
+    """
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
-            SELECT DISTINCT warmasters.telegram_id, warmasters.nickname, warmasters.notifications_enabled
+            SELECT DISTINCT warmasters.telegram_id, warmasters.nickname, warmasters.notifications_enabled,
+                            warmasters.language
             FROM warmasters
             JOIN schedule ON warmasters.telegram_id = schedule.user_telegram
             WHERE schedule.rules=?
@@ -602,7 +671,7 @@ async def get_weekly_rule_participant_count(rule: str, week_number: int) -> int:
     Returns:
         Count of distinct users registered for the rule in that week
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT COUNT(DISTINCT user_telegram)
             FROM schedule
@@ -622,7 +691,7 @@ async def get_daily_rule_participant_count(rule: str, date: str) -> int:
     Returns:
         Count of distinct users registered for the rule on that date
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT COUNT(DISTINCT user_telegram)
             FROM schedule
@@ -632,6 +701,62 @@ async def get_daily_rule_participant_count(rule: str, date: str) -> int:
             return result[0] if result else 0
 
 
+async def get_daily_participant_counts(rules: List[str], dates: List[str]) -> Dict[str, Dict[str, int]]:
+    """Get counts of unique participants per rule and date in one query.
+    
+    Results are cached for PARTICIPANT_COUNTS_TTL seconds; the cache is
+    cleared whenever someone signs up via insert_to_schedule.
+    
+    Args:
+        rules: List of rule names (e.g., ['killteam', 'wh40k'])
+        dates: List of date strings in format YYYY-MM-DD
+        
+    Returns:
+        Dictionary mapping rule -> {date: count}, with 0 for dates without signups
+        
+    Raises:
+        ValueError: If rules or dates list is empty
+    """
+    if not rules or not dates:
+        raise ValueError("Rules and dates lists cannot be empty")
+    
+    cache_key = (tuple(rules), tuple(dates))
+    cached = _participant_counts_cache.get(cache_key)
+    if cached and cached[0] > time.monotonic():
+        return {rule: dict(counts) for rule, counts in cached[1].items()}
+    
+    async with db_pool.read(DATABASE_PATH) as db:
+        async with db.execute('''
+            SELECT rules, date, COUNT(DISTINCT user_telegram)
+            FROM schedule
+            WHERE rules IN ({}) AND date IN ({})
+            GROUP BY rules, date
+        '''.format(','.join('?' * len(rules)), ','.join('?' * len(dates))),
+                (*rules, *dates)) as cursor:
+            results = await cursor.fetchall()
+    
+    counts = {rule: {date: 0 for date in dates} for rule in rules}
+    for rule, date, count in results:
+        counts[rule][date] = count
+    
+    _participant_counts_cache[cache_key] = (time.monotonic() + PARTICIPANT_COUNTS_TTL, counts)
+    return {rule: dict(day_counts) for rule, day_counts in counts.items()}
+
+
+async def get_daily_rule_participant_counts(rule: str, dates: List[str]) -> Dict[str, int]:
+    """Get counts of unique participants for one rule on several dates.
+    
+    Args:
+        rule: Rule name (e.g., 'killteam', 'wh40k')
+        dates: List of date strings in format YYYY-MM-DD
+        
+    Returns:
+        Dictionary mapping date strings to participant counts
+    """
+    counts = await get_daily_participant_counts([rule], dates)
+    return counts[rule]
+
+
 async def get_weekly_rule_participant_counts(rules: List[str], week_number: int) -> Dict[str, int]:
     """Get counts of unique participants for multiple rules in a specific week.
     
@@ -653,7 +778,7 @@ async def get_weekly_rule_participant_counts(rules: List[str], week_number: int)
     
     today = datetime.datetime.now().strftime('%Y-%m-%d')
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT rules, COUNT(DISTINCT user_telegram) as count
             FROM schedule
@@ -670,7 +795,7 @@ async def get_weekly_rule_participant_counts(rules: List[str], week_number: int)
 
 
 async def get_warmasters_opponents(against_alliance, rule, date):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT DISTINCT warmasters.nickname, warmasters.registered_as
             FROM warmasters
@@ -687,7 +812,7 @@ async def get_warmasters_opponents(against_alliance, rule, date):
 async def get_other_rule_opponents(against_alliance, rule, date):
     """Get opponents registered for other rules on the same date."""
     date_str = str(datetime.datetime.strptime(date, "%c").strftime("%Y-%m-%d"))
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT DISTINCT warmasters.nickname, warmasters.registered_as, schedule.rules
             FROM warmasters
@@ -700,11 +825,12 @@ async def get_other_rule_opponents(against_alliance, rule, date):
             return await cursor.fetchall()
 
 
+@request_cache.memoize('alliance')
 async def get_alliance_of_warmaster(telegram_user_id):
     logger.info(
         "get_alliance_of_warmaster(telegram_id=%s [type=%s])",
         telegram_user_id, type(telegram_user_id))
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT alliance FROM warmasters WHERE telegram_id=?
         ''', (telegram_user_id,)) as cursor:
@@ -716,53 +842,71 @@ async def get_alliance_of_warmaster(telegram_user_id):
 
 
 async def insert_to_schedule(date, rules, user_telegram):
+    # Old weeks are moved to schedule_history by archive_expired_schedule.
     weekNumber = date.isocalendar()[1]
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Удаляем записи всех пользователей, где разница в неделях больше 1
-        await db.execute(
-            'DELETE FROM schedule WHERE ABS(date_week - ?) > 1',
-            (weekNumber,))
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('INSERT INTO schedule (date, rules, user_telegram, date_week) VALUES (?, ?, ?, ?)', (str(date.date()), rules, user_telegram, weekNumber))
         await db.commit()
+    _participant_counts_cache.clear()
+
+
+async def archive_expired_schedule(before_date: str, batch_size: int = 500) -> int:
+    """Move schedule rows dated before before_date into schedule_history.
+
+    Works in batches of batch_size rows, each in its own transaction, so
+    the writer is released between batches and sign-ups are not held up.
+
+    Args:
+        before_date: Date string in format YYYY-MM-DD (exclusive)
+        batch_size: Rows moved per transaction
+
+    Returns:
+        Number of rows archived
+    """
+    archived = 0
+    while True:
+        async with db_pool.write(DATABASE_PATH) as db:
+            async with db.execute(
+                'SELECT id FROM schedule WHERE date < ? ORDER BY date LIMIT ?',
+                (before_date, batch_size)
+            ) as cursor:
+                ids = [row[0] for row in await cursor.fetchall()]
+            if not ids:
+                break
+            placeholders = ','.join('?' * len(ids))
+            await db.execute(f'''
+                INSERT INTO schedule_history (schedule_id, date, rules, user_telegram, date_week)
+                SELECT id, date, rules, user_telegram, date_week
+                FROM schedule
+                WHERE id IN ({placeholders})
+            ''', ids)
+            await db.execute(f'DELETE FROM schedule WHERE id IN ({placeholders})', ids)
+            await db.commit()
+        archived += len(ids)
+        if len(ids) < batch_size:
+            break
+        await asyncio.sleep(0)
+    if archived:
+        _participant_counts_cache.clear()
+    return archived
 
 async def has_route_to_warehouse(start_id, patron):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute("""
-            WITH RECURSIVE connected_hexes(id) AS (
-                SELECT id FROM map WHERE id = ? AND patron = ?
-
-                UNION
-
-                SELECT
-                    CASE
-                        WHEN e.left_hexagon = c.id THEN e.right_hexagon
-                        ELSE e.left_hexagon
-                    END
-                FROM edges e
-                JOIN connected_hexes c ON e.left_hexagon = c.id
-                    OR e.right_hexagon = c.id
-                JOIN map m_next ON (
-                    (e.left_hexagon = m_next.id OR e.right_hexagon = m_next.id)
-                    AND m_next.id != c.id
-                )
-                WHERE m_next.patron = ?
-            )
-            SELECT EXISTS (
-                SELECT 1
-                FROM connected_hexes ch
-                JOIN map m ON ch.id = m.id
-                WHERE m.has_warehouse = 1
-                  AND m.patron = ?
-            )
-        """, (start_id, patron, patron, patron)) as cursor:
-            return await cursor.fetchone()
+    """Check whether start_id connects to one of patron's warehouses.
+
+    Walks patron's hexes outward from start_id in the shared HexGraph.
+
+    Returns:
+        One-element tuple (1,) or (0,), as the former EXISTS query did
+    """
+    graph = await get_hex_graph()
+    return (1 if graph.has_route_to_warehouse(start_id, patron) else 0,)
 
 
 async def is_warmaster_registered(user_telegram_id):
     return True
 
 async def is_hex_patroned_by(cell_id, participant_telegram):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute(
             '''
             SELECT 1
@@ -777,11 +921,12 @@ async def is_hex_patroned_by(cell_id, participant_telegram):
 
 async def lock_mission(mission_id):
     """Lock a mission by setting its status to 1 (active/locked)."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE mission_stack SET status=1 WHERE id=?
         ''', (mission_id,))
         await db.commit()
+        web_cache.invalidate_battles()
 
 
 async def set_mission_score_submitted(mission_id):
@@ -793,47 +938,78 @@ async def set_mission_score_submitted(mission_id):
     Returns:
         bool: True if the update was successful, False otherwise
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         cursor = await db.execute('''
             UPDATE mission_stack SET status=2 WHERE id=?
         ''', (mission_id,))
         await db.commit()
+        web_cache.invalidate_battles()
         return cursor.rowcount > 0
 
 
 async def register_warmaster(user_telegram_id, phone):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE warmasters SET registered_as=? WHERE telegram_id=?
         ''', (phone, user_telegram_id))
         await db.commit()
+    request_cache.invalidate(user_telegram_id)
+
+
+def _mission_params(mission, today):
+    return (mission[0], mission[1], mission[2], mission[3],
+            mission[4] if len(mission) > 4 else None,
+            today,
+            mission[5] if len(mission) > 5 else None,
+            mission[6] if len(mission) > 6 else None)
+
+
+_INSERT_MISSION_SQL = '''
+    INSERT INTO mission_stack(deploy, rules, cell,
+                             mission_description, winner_bonus, status, created_date, map_description, reward_config)
+    VALUES(?, ?, ?, ?, ?, 0, ?, ?, ?)
+'''
 
 
 async def save_mission(mission):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         today = datetime.date.today().isoformat()
-        await db.execute('''
-            INSERT INTO mission_stack(deploy, rules, cell,
-                                     mission_description, winner_bonus, status, created_date, map_description, reward_config)
-            VALUES(?, ?, ?, ?, ?, 0, ?, ?, ?)
-        ''', (mission[0], mission[1], mission[2], mission[3], 
-              mission[4] if len(mission) > 4 else None, 
-              today,
-              mission[5] if len(mission) > 5 else None,
-              mission[6] if len(mission) > 6 else None))
+        await db.execute(_INSERT_MISSION_SQL, _mission_params(mission, today))
         await db.commit()
 
 
+async def save_missions(missions):
+    """Insert several generated missions (see save_mission) in one transaction."""
+    if not missions:
+        return
+    async with db_pool.write(DATABASE_PATH) as db:
+        today = datetime.date.today().isoformat()
+        await db.executemany(
+            _INSERT_MISSION_SQL, [_mission_params(mission, today) for mission in missions])
+        await db.commit()
+
+
+async def count_available_missions(rules) -> int:
+    """Number of unclaimed (status=0) missions for a ruleset."""
+    async with db_pool.read(DATABASE_PATH) as db:
+        async with db.execute(
+            'SELECT COUNT(*) FROM mission_stack WHERE status=0 AND rules=?', (rules,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else 0
+
+
 async def set_nickname(user_telegram_id, nickname):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE warmasters SET nickname=? WHERE telegram_id=?
         ''', (nickname, user_telegram_id))
         await db.commit()
+    request_cache.invalidate(user_telegram_id)
 
 
 async def set_language(user_telegram_id, language):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         # First, try to update existing record
         cursor = await db.execute('''
             UPDATE warmasters SET language=? WHERE telegram_id=?
@@ -847,10 +1023,11 @@ async def set_language(user_telegram_id, language):
             ''', (user_telegram_id, language))
         
         await db.commit()
+    request_cache.invalidate(user_telegram_id)
 
 
 async def toggle_notifications(user_telegram_id):
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT notifications_enabled FROM warmasters WHERE telegram_id=?
         ''', (user_telegram_id,)) as cursor:
@@ -862,7 +1039,8 @@ async def toggle_notifications(user_telegram_id):
             UPDATE warmasters SET notifications_enabled=? WHERE telegram_id=?
         ''', (new_value, user_telegram_id))
         await db.commit()
-        return new_value
+    request_cache.invalidate(user_telegram_id)
+    return new_value
 
 async def _update_alliance_resource(alliance_id, change_amount):
     """Helper function to update alliance resources.
@@ -874,7 +1052,7 @@ async def _update_alliance_resource(alliance_id, change_amount):
     Returns:
         The new resource value
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         # Get the current resource value
         async with db.execute('''
             SELECT common_resource FROM alliances WHERE id = ?
@@ -919,16 +1097,17 @@ async def decrease_common_resource(alliance_id, amount=1):
 
 async def create_warehouse(cell_id):
     """Создает склад в указанном гексе."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE map SET has_warehouse=1 WHERE id=?
         ''', (cell_id,))
         await db.commit()
+    _update_hex_graph(lambda graph: graph.set_warehouse(cell_id, True))
 
 
 async def has_warehouse_in_hex(cell_id):
     """Проверяет, есть ли склад в указанном гексе."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT has_warehouse FROM map WHERE id=?
         ''', (cell_id,)) as cursor:
@@ -938,7 +1117,7 @@ async def has_warehouse_in_hex(cell_id):
 
 async def get_hexes_by_alliance(alliance_id):
     """Получает все гексы, контролируемые указанным альянсом."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT id FROM map WHERE patron=?
         ''', (alliance_id,)) as cursor:
@@ -957,26 +1136,18 @@ async def get_adjacent_hexes_between_alliances(alliance1_id, alliance2_id):
     Returns:
         List of tuples containing defender hex IDs adjacent to attacker hexes
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute('''
-            SELECT DISTINCT m2.id
-            FROM edges e
-            JOIN map m1 ON (m1.id = e.left_hexagon OR m1.id = e.right_hexagon)
-            JOIN map m2 ON (m2.id = e.left_hexagon OR m2.id = e.right_hexagon)
-            WHERE m1.patron = ? 
-              AND m2.patron = ? 
-              AND m1.id != m2.id
-        ''', (alliance1_id, alliance2_id)) as cursor:
-            return await cursor.fetchall()
+    graph = await get_hex_graph()
+    return [(cell_id,) for cell_id in graph.adjacent_between(alliance1_id, alliance2_id)]
 
 
 async def update_mission_cell(mission_id, cell_id):
     """Update the cell field for a mission."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE mission_stack SET cell=? WHERE id=?
         ''', (cell_id, mission_id))
         await db.commit()
+        web_cache.invalidate_battles()
 
 
 async def has_adjacent_cell_to_hex(alliance_id, cell_id):
@@ -989,49 +1160,13 @@ async def has_adjacent_cell_to_hex(alliance_id, cell_id):
     Returns:
         bool: True if alliance has at least one cell adjacent to the target cell
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute('''
-            SELECT COUNT(*) FROM (
-                SELECT e.right_hexagon AS neighbor_id
-                FROM edges e
-                JOIN map m ON e.right_hexagon = m.id
-                WHERE e.left_hexagon = ?
-                  AND m.patron = ?
-                UNION
-                SELECT e.left_hexagon AS neighbor_id
-                FROM edges e
-                JOIN map m ON e.left_hexagon = m.id
-                WHERE e.right_hexagon = ?
-                  AND m.patron = ?
-            )
-        ''', (cell_id, alliance_id, cell_id, alliance_id)) as cursor:
-            result = await cursor.fetchone()
-            return result[0] > 0 if result else False
-
-
-async def get_warehouse_count_by_alliance(alliance_id):
-    """Get the number of warehouses owned by an alliance.
-
-    Uses warehouses table if present; falls back to map.has_warehouse.
-    """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        try:
-            async with db.execute('''
-                SELECT COUNT(*) FROM warehouses WHERE alliance_id = ?
-            ''', (alliance_id,)) as cursor:
-                result = await cursor.fetchone()
-                return result[0] if result else 0
-        except Exception:
-            async with db.execute('''
-                SELECT COUNT(*) FROM map WHERE patron=? AND has_warehouse=1
-            ''', (alliance_id,)) as cursor:
-                result = await cursor.fetchone()
-                return result[0] if result else 0
+    graph = await get_hex_graph()
+    return bool(graph.neighbours_with_patron(cell_id, alliance_id))
 
 
 async def get_mission_id_by_battle_id(battle_id):
     """Get the mission ID associated with a battle."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT mission_id FROM battles WHERE id = ?
         ''', (battle_id,)) as cursor:
@@ -1058,7 +1193,7 @@ async def get_mission_details(mission_id) -> Optional[Mission]:
         logger.warning("get_mission_details called with None mission_id")
         return None
 
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT id, deploy, rules, cell, mission_description, winner_bonus, status, created_date, map_description, reward_config
             FROM mission_stack WHERE id = ?
@@ -1071,7 +1206,7 @@ async def get_mission_details(mission_id) -> Optional[Mission]:
 
 async def get_winner_bonus(mission_id):
     """Get winner bonus for a mission by mission ID (secret until battle ends)."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT winner_bonus FROM mission_stack WHERE id = ?
         ''', (mission_id,)) as cursor:
@@ -1088,7 +1223,7 @@ async def get_alliance_resources(alliance_id):
     Returns:
         The current resource amount (integer)
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT common_resource FROM alliances WHERE id = ?
         ''', (alliance_id,)) as cursor:
@@ -1105,7 +1240,7 @@ async def destroy_warehouse_by_alliance(alliance_id):
     Returns:
         True if a warehouse was destroyed, False if no warehouse was found
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         # Find and delete one warehouse owned by the alliance
         # Assuming there's a warehouses table with cell_id and alliance_id
         async with db.execute('''
@@ -1135,17 +1270,13 @@ async def get_warehouse_count_by_alliance(alliance_id):
     Returns:
         The number of warehouses owned by the alliance
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute('''
-            SELECT COUNT(*) FROM warehouses WHERE alliance_id = ?
-        ''', (alliance_id,)) as cursor:
-            result = await cursor.fetchone()
-            return result[0] if result else 0
+    stats = await get_alliance_stats(alliance_id)
+    return stats[2]
 
 
 async def get_text_by_key(key, language='ru'):
     """Get localized text by key and language."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT value FROM texts WHERE key = ? AND language = ?
         ''', (key, language)) as cursor:
@@ -1155,17 +1286,74 @@ async def get_text_by_key(key, language='ru'):
 
 async def add_or_update_text(key, language, value):
     """Add or update a text entry."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    global _texts_version
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             INSERT OR REPLACE INTO texts (key, language, value)
             VALUES (?, ?, ?)
         ''', (key, language, value))
         await db.commit()
+    _texts_version += 1
+
+
+def get_texts_version():
+    """Return the current texts version (see add_or_update_text)."""
+    return _texts_version
+
+
+async def get_cached_file_ids():
+    """Every stored Telegram file_id.
+
+    Returns:
+        List of tuples: [(cache_key, kind, file_id), ...]
+    """
+    async with db_pool.read(DATABASE_PATH) as db:
+        async with db.execute(
+            'SELECT cache_key, kind, file_id FROM telegram_file_cache'
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+async def save_cached_file_id(cache_key, kind, file_id, replace_kind=False):
+    """Store the file_id Telegram returned for cache_key.
+
+    Args:
+        replace_kind: drop every other entry of the same kind first (for
+            content where only the latest version is ever sent again)
+    """
+    async with db_pool.write(DATABASE_PATH) as db:
+        if replace_kind:
+            await db.execute('DELETE FROM telegram_file_cache WHERE kind = ?', (kind,))
+        await db.execute('''
+            INSERT OR REPLACE INTO telegram_file_cache (cache_key, kind, file_id)
+            VALUES (?, ?, ?)
+        ''', (cache_key, kind, file_id))
+        await db.commit()
+
+
+async def delete_cached_file_id(cache_key):
+    """Forget a file_id Telegram no longer accepts."""
+    async with db_pool.write(DATABASE_PATH) as db:
+        await db.execute('DELETE FROM telegram_file_cache WHERE cache_key = ?', (cache_key,))
+        await db.commit()
+
+
+async def get_all_texts():
+    """Get every text entry for all languages.
+
+    Returns:
+        List of tuples: [(key, language, value), ...]
+    """
+    async with db_pool.read(DATABASE_PATH) as db:
+        async with db.execute('''
+            SELECT key, language, value FROM texts
+        ''') as cursor:
+            return await cursor.fetchall()
 
 
 async def get_all_texts_for_language(language='ru'):
     """Get all texts for a specific language."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT key, value FROM texts WHERE language = ?
         ''', (language,)) as cursor:
@@ -1181,7 +1369,7 @@ async def is_user_admin(user_telegram_id):
     Returns:
         bool: True if user is admin, False otherwise
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT is_admin FROM warmasters WHERE telegram_id = ?
         ''', (user_telegram_id,)) as cursor:
@@ -1195,11 +1383,12 @@ async def make_user_admin(user_telegram_id):
     Args:
         user_telegram_id: Telegram user ID
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE warmasters SET is_admin = 1 WHERE telegram_id = ?
         ''', (user_telegram_id,))
         await db.commit()
+    request_cache.invalidate(user_telegram_id)
 
 
 async def get_warmasters_with_nicknames():
@@ -1208,7 +1397,7 @@ async def get_warmasters_with_nicknames():
     Returns:
         List of tuples: [(telegram_id, nickname, alliance), ...]
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT telegram_id, nickname, alliance FROM warmasters 
             WHERE nickname IS NOT NULL AND nickname != ''
@@ -1223,7 +1412,7 @@ async def get_all_alliances():
     Returns:
         List of tuples: [(id, name), ...]
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT id, name FROM alliances ORDER BY id
         ''') as cursor:
@@ -1232,7 +1421,7 @@ async def get_all_alliances():
 
 async def get_all_alliances_with_resources():
     """Get all alliances with current resource amounts."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT id, name, common_resource
             FROM alliances
@@ -1241,15 +1430,38 @@ async def get_all_alliances_with_resources():
             return await cursor.fetchall()
 
 
+async def get_alliance_overview():
+    """Get all alliances with their resources and counts in one query.
+
+    The counts come from alliance_stats, kept current by triggers
+    (migration 032).
+
+    Returns:
+        List of tuples: [(id, name, common_resource, player_count,
+        territory_count, warehouse_count), ...]
+    """
+    async with db_pool.read(DATABASE_PATH) as db:
+        async with db.execute('''
+            SELECT a.id, a.name, a.common_resource,
+                   COALESCE(s.player_count, 0),
+                   COALESCE(s.territory_count, 0),
+                   COALESCE(s.warehouse_count, 0)
+            FROM alliances a
+            LEFT JOIN alliance_stats s ON s.alliance_id = a.id
+            ORDER BY a.id
+        ''') as cursor:
+            return await cursor.fetchall()
+
+
 async def get_map_cells_for_export():
     """Get full map dataset for rendering export.
 
     Returns:
-        List of tuples: [(id, state, patron, has_warehouse), ...]
+        List of tuples: [(id, state, patron, has_warehouse, q, r), ...]
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
-            SELECT id, state, patron, COALESCE(has_warehouse, 0)
+            SELECT id, state, patron, COALESCE(has_warehouse, 0), q, r
             FROM map
             ORDER BY id
         ''') as cursor:
@@ -1262,7 +1474,7 @@ async def get_alliances_for_map_export():
     Returns:
         List of tuples: [(id, name, color), ...]
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute("PRAGMA table_info(alliances)") as cursor:
             columns = [row[1] for row in await cursor.fetchall()]
 
@@ -1288,7 +1500,7 @@ async def get_terrain_colors():
     Returns:
         Dict mapping terrain name -> hex color string, or {} on error.
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         try:
             async with db.execute("SELECT name, color FROM terrain_colors") as cursor:
                 rows = await cursor.fetchall()
@@ -1297,21 +1509,39 @@ async def get_terrain_colors():
             return {}
 
 
-async def get_alliance_player_count(alliance_id):
-    """Get the number of players in an alliance.
+async def get_alliance_stats(alliance_id):
+    """Get the player, territory and warehouse counts of an alliance.
+    
+    Reads the alliance's alliance_stats row, kept current by triggers on
+    warmasters and map (migration 032).
     
     Args:
         alliance_id: Alliance ID
         
     Returns:
-        int: Number of players in the alliance
+        tuple: (player_count, territory_count, warehouse_count); zeros for
+        an unknown alliance or alliance 0
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
-            SELECT COUNT(*) FROM warmasters WHERE alliance = ?
+            SELECT player_count, territory_count, warehouse_count
+            FROM alliance_stats WHERE alliance_id = ?
         ''', (alliance_id,)) as cursor:
             result = await cursor.fetchone()
-            return result[0] if result else 0
+            return tuple(result) if result else (0, 0, 0)
+
+
+async def get_alliance_player_count(alliance_id):
+    """Get the number of players in an alliance.
+    
+    Args:
+        alliance_id: Alliance ID
+        
+    Returns:
+        int: Number of players in the alliance
+    """
+    stats = await get_alliance_stats(alliance_id)
+    return stats[0]
 
 
 async def get_alliance_territory_count(alliance_id):
@@ -1323,12 +1553,8 @@ async def get_alliance_territory_count(alliance_id):
     Returns:
         int: Number of territories controlled by the alliance
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute('''
-            SELECT COUNT(*) FROM map WHERE patron = ?
-        ''', (alliance_id,)) as cursor:
-            result = await cursor.fetchone()
-            return result[0] if result else 0
+    stats = await get_alliance_stats(alliance_id)
+    return stats[1]
 
 
 async def get_dominant_alliance():
@@ -1337,13 +1563,12 @@ async def get_dominant_alliance():
     Returns:
         int or None: Alliance ID with most territories, or None if no alliances have territories
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
-            SELECT patron, COUNT(*) as cell_count
-            FROM map
-            WHERE patron != 0
-            GROUP BY patron
-            ORDER BY cell_count DESC
+            SELECT alliance_id
+            FROM alliance_stats
+            WHERE territory_count > 0
+            ORDER BY territory_count DESC, alliance_id
             LIMIT 1
         ''') as cursor:
             result = await cursor.fetchone()
@@ -1357,11 +1582,12 @@ async def set_warmaster_alliance(user_telegram_id, alliance_id):
         user_telegram_id: Telegram user ID
         alliance_id: Alliance ID to assign
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE warmasters SET alliance = ? WHERE telegram_id = ?
         ''', (alliance_id, user_telegram_id))
         await db.commit()
+    request_cache.invalidate(user_telegram_id)
 
 
 async def create_alliance(name, initial_resources=0):
@@ -1393,7 +1619,7 @@ async def create_alliance(name, initial_resources=0):
     if not re.match(r'^[a-zA-Zа-яА-Я0-9\s\-_\.\!\?]+$', name):
         raise ValueError("Alliance name contains invalid characters")
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         # Check if name already exists
         async with db.execute('''
             SELECT id FROM alliances WHERE name = ?
@@ -1422,7 +1648,7 @@ async def get_alliance_by_name(name):
     Returns:
         tuple: (id, name, common_resource) or None if not found
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT id, name, common_resource FROM alliances WHERE name = ?
         ''', (name,)) as cursor:
@@ -1438,7 +1664,7 @@ async def get_alliance_by_id(alliance_id):
     Returns:
         tuple: (id, name, common_resource) or None if not found
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT id, name, common_resource FROM alliances WHERE id = ?
         ''', (alliance_id,)) as cursor:
@@ -1474,7 +1700,7 @@ async def update_alliance_name(alliance_id, new_name):
     if not re.match(r'^[a-zA-Zа-яА-Я0-9\s\-_\.\!\?]+$', new_name):
         raise ValueError("Alliance name contains invalid characters")
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         # Check if new name already exists (excluding current alliance)
         async with db.execute('''
             SELECT id FROM alliances WHERE name = ? AND id != ?
@@ -1497,142 +1723,153 @@ async def update_alliance_name(alliance_id, new_name):
         return True
 
 
-async def redistribute_territories_from_alliance(alliance_id):
-    """Redistribute territories (map hexes) from alliance to remaining alliances evenly.
-    
-    Args:
-        alliance_id: Alliance ID to redistribute territories from
-        
-    Returns:
-        int: Number of territories redistributed
-    """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Get territories from the alliance to delete
-        async with db.execute('''
-            SELECT id FROM map WHERE patron = ?
-        ''', (alliance_id,)) as cursor:
-            territory_rows = await cursor.fetchall()
-            territories_to_redistribute = [row[0] for row in territory_rows]
-        
-        if not territories_to_redistribute:
-            return 0
-        
-        # Get remaining alliances with their territory counts
-        async with db.execute('''
-            SELECT a.id, COUNT(m.id) as territory_count
-            FROM alliances a
-            LEFT JOIN map m ON a.id = m.patron
-            WHERE a.id != ?
-            GROUP BY a.id
-            ORDER BY territory_count ASC, a.id ASC
-        ''', (alliance_id,)) as cursor:
-            alliance_rows = await cursor.fetchall()
-            # Convert to list of tuples for manipulation
-            remaining_alliances = [(row[0], row[1]) for row in alliance_rows]
-        
-        if not remaining_alliances:
-            # No other alliances, set territories to no patron (NULL)
-            await db.execute('''
-                UPDATE map SET patron = NULL WHERE patron = ?
-            ''', (alliance_id,))
-            await db.commit()
-            return len(territories_to_redistribute)
-        
-        # Build assignment map for batch update
-        territory_assignments = []
-        for territory_id in territories_to_redistribute:
-            # Find alliance with minimum territories (random choice if tie)
-            min_count = remaining_alliances[0][1]
-            min_alliances = [alliance for alliance in remaining_alliances if alliance[1] == min_count]
-            target_alliance = random.choice(min_alliances)
-            
-            territory_assignments.append((target_alliance[0], territory_id))
-            
-            # Update counts in tracking list
-            for i, alliance in enumerate(remaining_alliances):
-                if alliance[0] == target_alliance[0]:
-                    remaining_alliances[i] = (alliance[0], alliance[1] + 1)
-                    break
-            
-            # Re-sort by territory count
-            remaining_alliances.sort(key=lambda x: (x[1], x[0]))
-        
-        # Batch update all territories
-        await db.executemany('''
-            UPDATE map SET patron = ? WHERE id = ?
-        ''', territory_assignments)
-        
-        await db.commit()
-        return len(territories_to_redistribute)
+async def _load_elimination_plan(db, alliance_id, release_players, resource_missions):
+    """Read everything eliminate_alliance needs and plan it (no writes)."""
+    async with db.execute('''
+        SELECT name, common_resource FROM alliances WHERE id = ?
+    ''', (alliance_id,)) as cursor:
+        alliance = await cursor.fetchone()
+    if not alliance:
+        raise ValueError('Alliance not found')
+
+    async with db.execute('''
+        SELECT a.id, COALESCE(s.territory_count, 0), COALESCE(s.player_count, 0)
+        FROM alliances a
+        LEFT JOIN alliance_stats s ON s.alliance_id = a.id
+        WHERE a.id != ?
+        ORDER BY a.id
+    ''', (alliance_id,)) as cursor:
+        rows = await cursor.fetchall()
+    if not rows:
+        raise ValueError('Cannot delete the last alliance')
+    recipients = [row[0] for row in rows]
+    territory_counts = {row[0]: row[1] for row in rows}
+    player_counts = {row[0]: row[2] for row in rows}
+
+    async with db.execute('''
+        SELECT id, q, r FROM map WHERE patron = ? ORDER BY id
+    ''', (alliance_id,)) as cursor:
+        hex_rows = await cursor.fetchall()
+    hexes = [row[0] for row in hex_rows]
+
+    # Only the neighbours of the eliminated hexes, with their patron: from
+    # the coordinates if stored, else from edges.
+    neighbours = {}
+    owner = {}
+    if all(row[1] is not None and row[2] is not None for row in hex_rows):
+        neighbour_sql = '''
+            WITH direction(dq, dr) AS (
+                VALUES (1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)
+            )
+            SELECT m.id, n.id, n.patron
+            FROM map m
+            CROSS JOIN direction d
+            JOIN map n ON n.q = m.q + d.dq AND n.r = m.r + d.dr
+            WHERE m.patron = ?
+        '''
+        params = (alliance_id,)
+    else:
+        neighbour_sql = '''
+            SELECT e.left_hexagon, e.right_hexagon, n.patron
+            FROM map m
+            JOIN edges e ON e.left_hexagon = m.id
+            JOIN map n ON n.id = e.right_hexagon
+            WHERE m.patron = ?
+            UNION ALL
+            SELECT e.right_hexagon, e.left_hexagon, n.patron
+            FROM map m
+            JOIN edges e ON e.right_hexagon = m.id
+            JOIN map n ON n.id = e.left_hexagon
+            WHERE m.patron = ?
+        '''
+        params = (alliance_id, alliance_id)
+    async with db.execute(neighbour_sql, params) as cursor:
+        async for hex_id, neighbour, patron in cursor:
+            neighbours.setdefault(hex_id, []).append(neighbour)
+            owner[neighbour] = patron
+
+    async with db.execute('''
+        SELECT telegram_id FROM warmasters WHERE alliance = ? ORDER BY telegram_id
+    ''', (alliance_id,)) as cursor:
+        players = [row[0] for row in await cursor.fetchall()]
+
+    if release_players:
+        player_assignments = [(0, player) for player in players]
+    else:
+        player_assignments = alliance_elimination.plan_players(players, player_counts)
+
+    resources = alliance[1] or 0
+    missions = (resources // len(recipients)) * len(recipients) if resource_missions else 0
+
+    return alliance_elimination.EliminationPlan(
+        alliance_id=alliance_id,
+        alliance_name=alliance[0],
+        territories=alliance_elimination.plan_territories(
+            hexes, neighbours, owner, territory_counts),
+        players=player_assignments,
+        resources=resources,
+        resource_missions=max(missions, 0),
+    )
 
 
-async def redistribute_players_from_alliance(alliance_id):
-    """Redistribute players from alliance to remaining alliances evenly.
-    
+async def eliminate_alliance(alliance_id, release_players=False,
+                             resource_missions=False, dry_run=False):
+    """Delete an alliance, handing its territories and players to the others.
+
+    Everything is planned and written in one transaction: hexes go to the
+    alliance with the fewest (preferring a neighbouring one), players either
+    to the alliance with the fewest players or, with release_players, to no
+    alliance at all. With resource_missions the alliance's resources become
+    resource collection missions, an equal share per remaining alliance.
+
     Args:
-        alliance_id: Alliance ID to redistribute players from
-        
+        alliance_id: Alliance ID to eliminate
+        release_players: set players' alliance to 0 instead of moving them
+        resource_missions: turn the alliance's resources into missions
+        dry_run: only return the plan
+
     Returns:
-        int: Number of players redistributed
+        EliminationPlan
+
+    Raises:
+        ValueError: the alliance does not exist or is the last one
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Get players from the alliance to delete
-        async with db.execute('''
-            SELECT telegram_id FROM warmasters WHERE alliance = ?
-        ''', (alliance_id,)) as cursor:
-            player_rows = await cursor.fetchall()
-            players_to_move = [row[0] for row in player_rows]
-        
-        if not players_to_move:
-            return 0
-        
-        # Get remaining alliances with their player counts
-        async with db.execute('''
-            SELECT a.id, COUNT(w.telegram_id) as player_count
-            FROM alliances a
-            LEFT JOIN warmasters w ON a.id = w.alliance
-            WHERE a.id != ?
-            GROUP BY a.id
-            ORDER BY player_count ASC, a.id ASC
-        ''', (alliance_id,)) as cursor:
-            alliance_rows = await cursor.fetchall()
-            # Convert to list of tuples for manipulation
-            remaining_alliances = [(row[0], row[1]) for row in alliance_rows]
-        
-        if not remaining_alliances:
-            # No other alliances, set players to no alliance (0)
+    if dry_run:
+        async with db_pool.read(DATABASE_PATH) as db:
+            return await _load_elimination_plan(
+                db, alliance_id, release_players, resource_missions)
+
+    async with db_pool.write(DATABASE_PATH) as db:
+        # Take the write lock before reading so the plan cannot go stale.
+        await db.execute('BEGIN IMMEDIATE')
+        try:
+            plan = await _load_elimination_plan(
+                db, alliance_id, release_players, resource_missions)
+            await db.executemany('''
+                UPDATE map SET patron = ? WHERE id = ?
+            ''', plan.territories)
+            await db.executemany('''
+                UPDATE warmasters SET alliance = ? WHERE telegram_id = ?
+            ''', plan.players)
+            if plan.resource_missions:
+                today = datetime.date.today().isoformat()
+                params = _mission_params(alliance_elimination.RESOURCE_MISSION, today)
+                await db.executemany(
+                    _INSERT_MISSION_SQL, [params] * plan.resource_missions)
             await db.execute('''
-                UPDATE warmasters SET alliance = 0 WHERE alliance = ?
+                DELETE FROM alliances WHERE id = ?
             ''', (alliance_id,))
             await db.commit()
-            return len(players_to_move)
-        
-        # Build assignment map for batch update
-        player_assignments = []
-        for player_id in players_to_move:
-            # Find alliance with minimum players (random choice if tie)
-            min_count = remaining_alliances[0][1]
-            min_alliances = [alliance for alliance in remaining_alliances if alliance[1] == min_count]
-            target_alliance = random.choice(min_alliances)
-            
-            player_assignments.append((target_alliance[0], player_id))
-            
-            # Update counts in tracking list
-            for i, alliance in enumerate(remaining_alliances):
-                if alliance[0] == target_alliance[0]:
-                    remaining_alliances[i] = (alliance[0], alliance[1] + 1)
-                    break
-            
-            # Re-sort by player count
-            remaining_alliances.sort(key=lambda x: (x[1], x[0]))
-        
-        # Batch update all players
-        await db.executemany('''
-            UPDATE warmasters SET alliance = ? WHERE telegram_id = ?
-        ''', player_assignments)
-        
-        await db.commit()
-        return len(players_to_move)
+        except BaseException:
+            await db.rollback()
+            raise
+
+    plan.executed = True
+    if plan.territories:
+        invalidate_hex_graph()
+    request_cache.invalidate()
+    logger.info("Eliminated alliance %s: %s", alliance_id, plan.summary())
+    return plan
 
 
 async def delete_alliance(alliance_id):
@@ -1649,56 +1886,25 @@ async def delete_alliance(alliance_id):
             'message': str
         }
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        # Check if alliance exists
-        async with db.execute('''
-            SELECT name FROM alliances WHERE id = ?
-        ''', (alliance_id,)) as cursor:
-            alliance = await cursor.fetchone()
-        
-        if not alliance:
-            return {
-                'success': False,
-                'players_redistributed': 0,
-                'territories_redistributed': 0,
-                'message': 'Alliance not found'
-            }
-        
-        alliance_name = alliance[0]
-        
-        # Check if this is the last alliance
-        async with db.execute('SELECT COUNT(*) FROM alliances') as cursor:
-            count_result = await cursor.fetchone()
-            total_alliances = count_result[0] if count_result else 0
-        
-        if total_alliances <= 1:
-            return {
-                'success': False,
-                'players_redistributed': 0,
-                'territories_redistributed': 0,
-                'message': 'Cannot delete the last alliance'
-            }
-        
-        # Redistribute territories first to ensure they go to alliances that currently exist
-        territories_moved = await redistribute_territories_from_alliance(alliance_id)
-        
-        # Redistribute players
-        players_moved = await redistribute_players_from_alliance(alliance_id)
-        
-        # Delete alliance
-        await db.execute('''
-            DELETE FROM alliances WHERE id = ?
-        ''', (alliance_id,))
-        
-        await db.commit()
-        
+    try:
+        plan = await eliminate_alliance(alliance_id)
+    except ValueError as e:
         return {
-            'success': True,
-            'players_redistributed': players_moved,
-            'territories_redistributed': territories_moved,
-            'message': f'Alliance "{alliance_name}" deleted, {players_moved} players and {territories_moved} territories redistributed'
+            'success': False,
+            'players_redistributed': 0,
+            'territories_redistributed': 0,
+            'message': str(e)
         }
 
+    players_moved = len(plan.players)
+    territories_moved = len(plan.territories)
+    return {
+        'success': True,
+        'players_redistributed': players_moved,
+        'territories_redistributed': territories_moved,
+        'message': f'Alliance "{plan.alliance_name}" deleted, {players_moved} players and {territories_moved} territories redistributed'
+    }
+
 
 async def check_and_clean_empty_alliances():
     """Check for alliances with 0 members and automatically delete them.
@@ -1709,19 +1915,18 @@ async def check_and_clean_empty_alliances():
     Returns:
         list: List of deletion results for each empty alliance deleted
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         # Find alliances with 0 members
         async with db.execute('''
-            SELECT a.id, a.name, COUNT(w.telegram_id) as member_count
+            SELECT a.id, a.name
             FROM alliances a
-            LEFT JOIN warmasters w ON a.id = w.alliance
-            GROUP BY a.id, a.name
-            HAVING member_count = 0
+            JOIN alliance_stats s ON s.alliance_id = a.id
+            WHERE s.player_count = 0
         ''') as cursor:
             empty_alliances = await cursor.fetchall()
     
     results = []
-    for alliance_id, alliance_name, _ in empty_alliances:
+    for alliance_id, alliance_name in empty_alliances:
         result = await delete_alliance(alliance_id)
         results.append({
             'alliance_id': alliance_id,
@@ -1734,7 +1939,7 @@ async def check_and_clean_empty_alliances():
 
 async def get_active_alliances_count():
     """Get the count of active alliances."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT COUNT(*) FROM alliances
         ''') as cursor:
@@ -1744,16 +1949,17 @@ async def get_active_alliances_count():
 
 async def clear_alliance_members(alliance_id):
     """Clear alliance membership for all players in the alliance."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE warmasters SET alliance = 0 WHERE alliance = ?
         ''', (alliance_id,))
         await db.commit()
+    request_cache.invalidate()
 
 
 async def get_players_by_alliance(alliance_id):
     """Get all players in a specific alliance."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT telegram_id, nickname, alliance FROM warmasters 
             WHERE alliance = ?
@@ -1761,9 +1967,34 @@ async def get_players_by_alliance(alliance_id):
             return await cursor.fetchall()
 
 
+async def get_recipient_settings(telegram_ids) -> Dict[str, tuple]:
+    """Language and notification flag of many users in one query per 500 ids.
+
+    Returns:
+        Dictionary mapping str(telegram_id) -> (language, notifications_enabled);
+        unknown users are missing from it
+    """
+    ids = list(dict.fromkeys(str(telegram_id) for telegram_id in telegram_ids))
+    settings = {}
+    async with db_pool.read(DATABASE_PATH) as db:
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            async with db.execute('''
+                SELECT telegram_id, language, notifications_enabled
+                FROM warmasters
+                WHERE telegram_id IN ({})
+            '''.format(','.join('?' * len(chunk))), chunk) as cursor:
+                for telegram_id, language, notifications_enabled in await cursor.fetchall():
+                    settings[str(telegram_id)] = (
+                        language or 'ru',
+                        notifications_enabled if notifications_enabled is not None else 1,
+                    )
+    return settings
+
+
 async def get_all_players():
     """Get all registered players."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT telegram_id, nickname, alliance FROM warmasters
         ''') as cursor:
@@ -1789,12 +2020,13 @@ async def create_pending_result(battle_id: int, submitter_id: str,
     """
     created_at = datetime.datetime.now().isoformat()
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             INSERT INTO pending_results(battle_id, submitter_id, fstplayer_score, sndplayer_score, created_at)
             VALUES(?, ?, ?, ?, ?)
         ''', (battle_id, submitter_id, fstplayer_score, sndplayer_score, created_at))
         await db.commit()
+        web_cache.invalidate_battles()
         
         async with db.execute('SELECT last_insert_rowid()') as cursor:
             result = await cursor.fetchone()
@@ -1811,7 +2043,7 @@ async def get_pending_result_by_battle_id(battle_id: int):
         PendingResult or None
     """
     
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT id, battle_id, submitter_id, fstplayer_score, sndplayer_score, created_at
             FROM pending_results
@@ -1827,11 +2059,54 @@ async def delete_pending_result(battle_id: int):
     Args:
         battle_id: The battle ID
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             DELETE FROM pending_results WHERE battle_id = ?
         ''', (battle_id,))
         await db.commit()
+        web_cache.invalidate_battles()
+
+
+async def claim_pending_result(battle_id: int):
+    """Take a pending result out of pending_results in one statement.
+
+    Of two concurrent confirmations (or a confirmation and a rejection) of
+    the same battle only one gets the row, so a result is applied once.
+
+    Args:
+        battle_id: The battle ID
+
+    Returns:
+        PendingResult, or None if there was none or it was already claimed
+    """
+    async with db_pool.write(DATABASE_PATH) as db:
+        async with db.execute('''
+            DELETE FROM pending_results WHERE battle_id = ?
+            RETURNING id, battle_id, submitter_id, fstplayer_score, sndplayer_score, created_at
+        ''', (battle_id,)) as cursor:
+            rows = await cursor.fetchall()
+        await db.commit()
+    if not rows:
+        return None
+    web_cache.invalidate_battles()
+    return PendingResult.from_db_row(rows[0])
+
+
+async def restore_pending_result(pending_result):
+    """Put back a result taken by claim_pending_result that could not be applied.
+
+    Args:
+        pending_result: PendingResult returned by claim_pending_result
+    """
+    async with db_pool.write(DATABASE_PATH) as db:
+        await db.execute('''
+            INSERT OR IGNORE INTO pending_results(id, battle_id, submitter_id, fstplayer_score, sndplayer_score, created_at)
+            VALUES(?, ?, ?, ?, ?, ?)
+        ''', (pending_result.id, pending_result.battle_id, pending_result.submitter_id,
+              pending_result.fstplayer_score, pending_result.sndplayer_score,
+              pending_result.created_at))
+        await db.commit()
+        web_cache.invalidate_battles()
 
 
 async def get_all_pending_missions():
@@ -1840,7 +2115,7 @@ async def get_all_pending_missions():
     Returns:
         List of tuples: (mission_id, deploy, rules, cell, description, created_date)
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT id, deploy, rules, cell, mission_description, created_date
             FROM mission_stack
@@ -1860,11 +2135,12 @@ async def update_mission_status(mission_id: int, status: int):
     Returns:
         bool: True if update was successful
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         await db.execute('''
             UPDATE mission_stack SET status = ? WHERE id = ?
         ''', (status, mission_id))
         await db.commit()
+        web_cache.invalidate_battles()
         return True
 
 
@@ -1878,7 +2154,7 @@ async def get_battle_participants(battle_id: int):
         Tuple of (player1_id, player2_id) where player1 is the first attender (attacker)
         and player2 is the second attender (defender), or None if not found
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT attender_id FROM battle_attenders 
             WHERE battle_id = ? 
@@ -1896,7 +2172,7 @@ async def get_pending_missions_count():
     Returns:
         int: Number of missions pending confirmation
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT COUNT(*) FROM mission_stack WHERE status = 2
         ''') as cursor:
@@ -1904,101 +2180,223 @@ async def get_pending_missions_count():
             return result[0] if result else 0
 
 
-async def get_user_game_counts_last_month(alliance_id: int = None):
-    """Get game counts per user for the last 30 days.
+# Daily game rollup (migration 033), rebuilt from the battle history by
+# rebuild_game_counts: one game per attender of the latest battle of every
+# completed mission, on the mission's creation day.
+_GAME_COUNTS_BACKFILL_SQL = '''
+    INSERT INTO game_counts_daily (day, telegram_id, alliance_id, rules, games)
+    WITH mission_battles AS (
+        SELECT substr(m.created_date, 1, 10) AS day,
+               COALESCE(m.rules, '') AS rules,
+               MAX(b.id) AS battle_id
+        FROM mission_stack m
+        JOIN battles b ON b.mission_id = m.id
+        WHERE m.status = 3
+          AND m.created_date IS NOT NULL
+        GROUP BY m.id
+    )
+    SELECT mb.day, ba.attender_id, COALESCE(w.alliance, 0), mb.rules, COUNT(*)
+    FROM mission_battles mb
+    JOIN battle_attenders ba ON ba.battle_id = mb.battle_id
+    LEFT JOIN warmasters w ON w.telegram_id = ba.attender_id
+    GROUP BY mb.day, ba.attender_id, COALESCE(w.alliance, 0), mb.rules
+'''
+
+# The battles _GAME_COUNTS_BACKFILL_SQL counts, so they are not counted again.
+_COUNTED_BATTLES_BACKFILL_SQL = '''
+    INSERT INTO game_counts_battles (battle_id)
+    SELECT MAX(b.id)
+    FROM mission_stack m
+    JOIN battles b ON b.mission_id = m.id
+    WHERE m.status = 3
+      AND m.created_date IS NOT NULL
+    GROUP BY m.id
+'''
+
+
+def _game_counts_since(days, since):
+    """First day (ISO text) of a game count window."""
+    if since is None:
+        since = datetime.date.today() - datetime.timedelta(days=days)
+    return since.isoformat() if isinstance(since, datetime.date) else str(since)
+
+
+async def _record_game_counts(db, battle_id):
+    """Add a confirmed battle to the daily game counts, once per battle.
+
+    Each attender gets one game on the mission's creation day, under their
+    current alliance and the mission's rules. Runs inside the caller's
+    transaction; a battle already in game_counts_battles is skipped.
+    """
+    cursor = await db.execute(
+        'INSERT OR IGNORE INTO game_counts_battles (battle_id) VALUES (?)', (battle_id,))
+    if cursor.rowcount == 0:
+        return
+    await db.execute('''
+        INSERT INTO game_counts_daily (day, telegram_id, alliance_id, rules, games)
+        SELECT substr(m.created_date, 1, 10), ba.attender_id,
+               COALESCE(w.alliance, 0), COALESCE(m.rules, ''), 1
+        FROM battle_attenders ba
+        JOIN battles b ON b.id = ba.battle_id
+        JOIN mission_stack m ON m.id = b.mission_id
+        LEFT JOIN warmasters w ON w.telegram_id = ba.attender_id
+        WHERE ba.battle_id = ?
+          AND m.created_date IS NOT NULL
+        ON CONFLICT (day, telegram_id, alliance_id, rules)
+        DO UPDATE SET games = games + 1
+    ''', (battle_id,))
+
+
+async def complete_mission(mission_id: int, battle_id: int):
+    """Mark a mission completed (status=3) and count its confirmed battle.
+
+    Both happen in one transaction, so a completed mission is always in the
+    daily game counts and confirming the same battle again does not count
+    it twice.
+
+    Args:
+        mission_id: The mission ID
+        battle_id: The confirmed battle
+    """
+    async with db_pool.write(DATABASE_PATH) as db:
+        await db.execute('BEGIN IMMEDIATE')
+        try:
+            await db.execute(
+                'UPDATE mission_stack SET status = 3 WHERE id = ?', (mission_id,))
+            await _record_game_counts(db, battle_id)
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+    web_cache.invalidate_battles()
+
+
+async def rebuild_game_counts():
+    """Rebuild the daily game counts from the whole battle history.
+
+    Backfilled games count for the alliance each player is in now.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    async with db_pool.write(DATABASE_PATH) as db:
+        await db.execute('BEGIN IMMEDIATE')
+        try:
+            await db.execute('DELETE FROM game_counts_daily')
+            await db.execute('DELETE FROM game_counts_battles')
+            cursor = await db.execute(_GAME_COUNTS_BACKFILL_SQL)
+            rows = cursor.rowcount
+            await db.execute(_COUNTED_BATTLES_BACKFILL_SQL)
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+    logger.info("Rebuilt game_counts_daily: %s rows", rows)
+    return rows
+
+
+async def get_user_game_counts(days: int = 30, alliance_id: int = None,
+                               rules: str = None, since=None):
+    """Get game counts per user over a window of days.
+    
+    Sums the daily rollup, so the cost depends on the window, not on the
+    battle history.
     
     Args:
+        days: Window length, ending today
         alliance_id: Optional alliance filter. If provided, only users from
             this alliance are included.
+        rules: Optional mission rules filter
+        since: First day of the window (date or ISO text), overrides days
     
     Returns:
         List of tuples: (telegram_id, nickname, alliance_id, games_count)
     """
-    cutoff_date = (datetime.date.today() - datetime.timedelta(days=30)).isoformat()
     query = """
-        WITH recent_missions AS (
-            SELECT id
-            FROM mission_stack
-            WHERE status = 3
-              AND created_date IS NOT NULL
-              AND created_date >= ?
-        ),
-        mission_battles AS (
-            SELECT rm.id AS mission_id,
-                   (
-                       SELECT id FROM battles b
-                       WHERE b.mission_id = rm.id
-                       ORDER BY id DESC
-                       LIMIT 1
-                   ) AS battle_id
-            FROM recent_missions rm
-        )
-        SELECT ba.attender_id,
+        SELECT g.telegram_id,
                w.nickname,
                w.alliance,
-               COUNT(*) AS games_count
-        FROM mission_battles mb
-        JOIN battle_attenders ba ON ba.battle_id = mb.battle_id
-        LEFT JOIN warmasters w ON w.telegram_id = ba.attender_id
-        WHERE mb.battle_id IS NOT NULL
+               SUM(g.games) AS games_count
+        FROM game_counts_daily g
+        LEFT JOIN warmasters w ON w.telegram_id = g.telegram_id
+        WHERE g.day >= ?
     """
-    params = [cutoff_date]
+    params = [_game_counts_since(days, since)]
     if alliance_id is not None:
         query += " AND w.alliance = ?"
         params.append(alliance_id)
+    if rules is not None:
+        query += " AND g.rules = ?"
+        params.append(rules)
     query += """
-        GROUP BY ba.attender_id, w.nickname, w.alliance
+        GROUP BY g.telegram_id, w.nickname, w.alliance
         ORDER BY games_count DESC,
                  w.nickname IS NULL,
-                 COALESCE(w.nickname, CAST(ba.attender_id AS TEXT)),
-                 ba.attender_id
+                 COALESCE(w.nickname, CAST(g.telegram_id AS TEXT)),
+                 g.telegram_id
     """
 
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute(query, params) as cursor:
             return await cursor.fetchall()
 
 
+async def get_alliance_game_counts(days: int = 30, rules: str = None, since=None):
+    """Get game counts per alliance over a window of days.
+    
+    A game counts for the alliance the player was in when the result was
+    confirmed.
+    
+    Args:
+        days: Window length, ending today
+        rules: Optional mission rules filter
+        since: First day of the window (date or ISO text), overrides days
+    
+    Returns:
+        List of tuples: (alliance_id, alliance_name, games_count)
+    """
+    query = """
+        SELECT g.alliance_id,
+               a.name,
+               SUM(g.games) AS games_count
+        FROM game_counts_daily g
+        JOIN alliances a ON a.id = g.alliance_id
+        WHERE g.day >= ?
+    """
+    params = [_game_counts_since(days, since)]
+    if rules is not None:
+        query += " AND g.rules = ?"
+        params.append(rules)
+    query += """
+        GROUP BY g.alliance_id, a.name
+        ORDER BY games_count DESC, a.name
+    """
+
+    async with db_pool.read(DATABASE_PATH) as db:
+        async with db.execute(query, params) as cursor:
+            return await cursor.fetchall()
+
+
+async def get_user_game_counts_last_month(alliance_id: int = None):
+    """Get game counts per user for the last 30 days.
+    
+    Args:
+        alliance_id: Optional alliance filter. If provided, only users from
+            this alliance are included.
+    
+    Returns:
+        List of tuples: (telegram_id, nickname, alliance_id, games_count)
+    """
+    return await get_user_game_counts(days=30, alliance_id=alliance_id)
+
+
 async def get_alliance_game_counts_last_month():
     """Get game counts per alliance for the last 30 days.
     
     Returns:
         List of tuples: (alliance_id, alliance_name, games_count)
     """
-    cutoff_date = (datetime.date.today() - datetime.timedelta(days=30)).isoformat()
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute("""
-            WITH recent_missions AS (
-                SELECT id
-                FROM mission_stack
-                WHERE status = 3
-                  AND created_date IS NOT NULL
-                  AND created_date >= ?
-            ),
-            mission_battles AS (
-                SELECT rm.id AS mission_id,
-                       (
-                           SELECT id FROM battles b
-                           WHERE b.mission_id = rm.id
-                           ORDER BY id DESC
-                           LIMIT 1
-                       ) AS battle_id
-                FROM recent_missions rm
-            )
-            SELECT w.alliance,
-                   a.name,
-                   COUNT(*) AS games_count
-            FROM mission_battles mb
-            JOIN battle_attenders ba ON ba.battle_id = mb.battle_id
-            JOIN warmasters w ON w.telegram_id = ba.attender_id
-            JOIN alliances a ON a.id = w.alliance
-            WHERE mb.battle_id IS NOT NULL
-              AND w.alliance IS NOT NULL
-              AND w.alliance != 0
-            GROUP BY w.alliance, a.name
-            ORDER BY games_count DESC, a.name
-        """, (cutoff_date,)) as cursor:
-            return await cursor.fetchall()
+    return await get_alliance_game_counts(days=30)
 
 
 async def get_battle_id_by_mission_id(mission_id: int):
@@ -2010,7 +2408,7 @@ async def get_battle_id_by_mission_id(mission_id: int):
     Returns:
         int: The battle ID or None if not found
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT id FROM battles 
             WHERE mission_id = ? 
@@ -2034,7 +2432,7 @@ async def is_feature_enabled(flag_name: str) -> bool:
         True if feature is enabled, False otherwise.
         Returns True by default if flag doesn't exist (fail-safe).
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT enabled FROM feature_flags WHERE flag_name = ?
         ''', (flag_name,)) as cursor:
@@ -2053,7 +2451,7 @@ async def toggle_feature_flag(flag_name: str) -> bool:
     Returns:
         New state of the flag (True=enabled, False=disabled)
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.write(DATABASE_PATH) as db:
         # Get current state
         async with db.execute('''
             SELECT enabled FROM feature_flags WHERE flag_name = ?
@@ -2085,7 +2483,7 @@ async def get_all_feature_flags() -> list:
     Returns:
         List of tuples: [(flag_name, enabled, description), ...]
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with db_pool.read(DATABASE_PATH) as db:
         async with db.execute('''
             SELECT flag_name, enabled, description 
             FROM feature_flags 
@@ -2098,181 +2496,201 @@ async def get_all_feature_flags() -> list:
 # Web UI Helpers
 # ============================================================================
 
-async def get_active_battles_for_web():
-    """Get all active missions (status=1) with battle and participant info for web UI.
+# Battles listed per page by the web UI and /api/battles.
+BATTLES_PAGE_SIZE = 50
+
+# Mission statuses shown on the battles page.
+BATTLE_STATUS_ACTIVE = 1
+BATTLE_STATUS_PENDING = 2
+BATTLE_STATUS_COMPLETED = 3
+
+# Keyset sort key of a battles page, newest first; legacy missions without
+# a date come last. Matches idx_mission_stack_status_sort (migration 034).
+_BATTLE_SORT_KEY = "COALESCE(ms.created_date, '')"
 
-    Returns:
-        List of dicts with keys: mission_id, deploy, rules, cell, description,
-        created_date, battle_id, p1_id, p1_nick, p1_alliance, p2_id, p2_nick, p2_alliance
-    """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute('''
-            SELECT ms.id, ms.deploy, ms.rules, ms.cell, ms.mission_description, ms.created_date,
-                   b.id as battle_id,
-                   ba1.attender_id as p1_id, w1.nickname as p1_nick, a1.name as p1_alliance,
-                   ba2.attender_id as p2_id, w2.nickname as p2_nick, a2.name as p2_alliance
-            FROM mission_stack ms
-            JOIN battles b ON b.mission_id = ms.id
-            JOIN (
-                SELECT battle_id, attender_id, MIN(rowid) as rn
-                FROM battle_attenders
-                GROUP BY battle_id
-            ) ba1 ON ba1.battle_id = b.id
-            LEFT JOIN warmasters w1 ON w1.telegram_id = ba1.attender_id
-            LEFT JOIN alliances a1 ON a1.id = w1.alliance
-            JOIN (
-                SELECT battle_id, attender_id, MAX(rowid) as rn
-                FROM battle_attenders
-                GROUP BY battle_id
-            ) ba2 ON ba2.battle_id = b.id AND ba2.attender_id != ba1.attender_id
-            LEFT JOIN warmasters w2 ON w2.telegram_id = ba2.attender_id
-            LEFT JOIN alliances a2 ON a2.id = w2.alliance
-            WHERE ms.status = 1
-            ORDER BY ms.created_date DESC
-        ''') as cursor:
-            rows = await cursor.fetchall()
 
-    result = []
-    for row in rows:
-        result.append({
-            'mission_id': row[0],
-            'deploy': row[1],
-            'rules': row[2],
-            'cell': row[3],
-            'description': row[4],
-            'created_date': row[5],
-            'battle_id': row[6],
-            'p1_id': row[7],
-            'p1_nick': row[8] or str(row[7]),
-            'p1_alliance': row[9] or '—',
-            'p2_id': row[10],
-            'p2_nick': row[11] or str(row[10]),
-            'p2_alliance': row[12] or '—',
+def encode_battles_cursor(created_date, mission_id):
+    """Opaque cursor continuing a battles page after the given mission."""
+    return f"{created_date or ''}|{mission_id}"
+
+
+def decode_battles_cursor(cursor):
+    """(sort key, mission id) of a cursor from encode_battles_cursor.
+
+    Raises:
+        ValueError: cursor is malformed
+    """
+    try:
+        sort_key, mission_id = cursor.rsplit('|', 1)
+        return sort_key, int(mission_id)
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}") from None
+
+
+def _battle_row_for_web(status, row):
+    """Dict of one battle row selected by get_battles_page."""
+    battle = {
+        'mission_id': row[0],
+        'deploy': row[1],
+        'rules': row[2],
+        'cell': row[3],
+        'description': row[4],
+        'created_date': row[5],
+        'battle_id': row[6],
+        'p1_id': row[13],
+        'p1_nick': row[14] or str(row[13]),
+        'p1_alliance': row[15] or '—',
+        'p2_id': row[16],
+        'p2_nick': row[17] or str(row[16]),
+        'p2_alliance': row[18] or '—',
+    }
+    if status == BATTLE_STATUS_PENDING:
+        battle.update({
+            'pending_id': row[9],
+            'submitter_id': row[10],
+            'fst_score': row[11],
+            'snd_score': row[12],
         })
-    return result
+    elif status == BATTLE_STATUS_COMPLETED:
+        p1_score, p2_score = row[7], row[8]
+        winner_nick = None
+        if p1_score is not None and p2_score is not None:
+            if p1_score > p2_score:
+                winner_nick = battle['p1_nick']
+            elif p2_score > p1_score:
+                winner_nick = battle['p2_nick']
+        battle.update({
+            'p1_score': p1_score,
+            'p2_score': p2_score,
+            'winner_nick': winner_nick,
+        })
+    return battle
 
 
-async def get_pending_battles_for_web():
-    """Get all missions (status=2) with pending results and participant info for web UI.
+async def get_battles_page(status, limit=BATTLES_PAGE_SIZE, cursor=None, rules=None,
+                           alliance_id=None, date_from=None, date_to=None):
+    """Get one page of battles of missions with a status for the web UI.
+
+    Missions are paged newest first by (created_date, mission id): a page
+    seeks to its cursor in idx_mission_stack_status_sort instead of skipping
+    the rows before it, so later pages cost the same as the first. All
+    battles of a mission are on the same page.
+
+    Args:
+        status: BATTLE_STATUS_ACTIVE, _PENDING or _COMPLETED
+        limit: Missions per page, None for all
+        cursor: next_cursor of the previous page
+        rules: Only missions with these rules
+        alliance_id: Only battles with a player currently in this alliance
+        date_from: First created_date (YYYY-MM-DD), inclusive
+        date_to: Last created_date (YYYY-MM-DD), inclusive
 
     Returns:
-        List of dicts with keys: mission_id, deploy, rules, cell, description,
-        created_date, battle_id, pending_id, submitter_id, fst_score, snd_score,
-        p1_id, p1_nick, p1_alliance, p2_id, p2_nick, p2_alliance
-    """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute('''
+        dict: {'battles': [dict, ...], 'next_cursor': str or None}. Each
+        battle has mission_id, deploy, rules, cell, description,
+        created_date, battle_id, p1_id, p1_nick, p1_alliance, p2_id,
+        p2_nick, p2_alliance; pending battles add pending_id, submitter_id,
+        fst_score, snd_score; completed ones p1_score, p2_score, winner_nick.
+
+    Raises:
+        ValueError: cursor is malformed
+    """
+    page_sql = f'''
+        SELECT ms.id, {_BATTLE_SORT_KEY}
+        FROM mission_stack ms
+        WHERE ms.status = ?
+    '''
+    params = [status]
+    if cursor is not None:
+        sort_key, mission_id = decode_battles_cursor(cursor)
+        page_sql += f'''
+          AND {_BATTLE_SORT_KEY} <= ?
+          AND ({_BATTLE_SORT_KEY} < ? OR ms.id < ?)
+        '''
+        params += [sort_key, sort_key, mission_id]
+    if rules is not None:
+        page_sql += " AND ms.rules = ?"
+        params.append(rules)
+    if date_from is not None:
+        page_sql += f" AND {_BATTLE_SORT_KEY} >= ?"
+        params.append(str(date_from))
+    if date_to is not None:
+        page_sql += f" AND {_BATTLE_SORT_KEY} <= ? AND ms.created_date IS NOT NULL"
+        params.append(str(date_to))
+    if alliance_id is not None:
+        page_sql += '''
+          AND EXISTS (
+              SELECT 1 FROM battles b
+              JOIN battle_attenders ba ON ba.battle_id = b.id
+              JOIN warmasters w ON w.telegram_id = ba.attender_id
+              WHERE b.mission_id = ms.id AND w.alliance = ?
+          )
+        '''
+        params.append(alliance_id)
+    else:
+        page_sql += " AND EXISTS (SELECT 1 FROM battles b WHERE b.mission_id = ms.id)"
+    page_sql += f" ORDER BY {_BATTLE_SORT_KEY} DESC, ms.id DESC LIMIT ?"
+    # One extra mission tells whether there is a next page.
+    params.append(limit + 1 if limit is not None else -1)
+
+    async with db_pool.read(DATABASE_PATH) as db:
+        async with db.execute(page_sql, params) as db_cursor:
+            page = await db_cursor.fetchall()
+        next_cursor = None
+        if limit is not None and len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_battles_cursor(page[-1][1], page[-1][0])
+        if not page:
+            return {'battles': [], 'next_cursor': None}
+
+        # Players are the first and last attender of each battle (by rowid);
+        # pending missions list only battles with a pending result.
+        async with db.execute(f'''
             SELECT ms.id, ms.deploy, ms.rules, ms.cell, ms.mission_description, ms.created_date,
-                   b.id as battle_id,
-                   pr.id as pending_id, pr.submitter_id, pr.fstplayer_score, pr.sndplayer_score,
-                   ba1.attender_id as p1_id, w1.nickname as p1_nick, a1.name as p1_alliance,
-                   ba2.attender_id as p2_id, w2.nickname as p2_nick, a2.name as p2_alliance
+                   b.id, b.fstplayer, b.sndplayer,
+                   pr.id, pr.submitter_id, pr.fstplayer_score, pr.sndplayer_score,
+                   ba1.attender_id, w1.nickname, a1.name,
+                   ba2.attender_id, w2.nickname, a2.name
             FROM mission_stack ms
             JOIN battles b ON b.mission_id = ms.id
-            JOIN pending_results pr ON pr.battle_id = b.id
-            JOIN (
-                SELECT battle_id, attender_id, MIN(rowid) as rn
-                FROM battle_attenders
-                GROUP BY battle_id
-            ) ba1 ON ba1.battle_id = b.id
+            LEFT JOIN pending_results pr ON pr.battle_id = b.id AND ms.status = 2
+            JOIN battle_attenders ba1 ON ba1.rowid = (
+                SELECT MIN(rowid) FROM battle_attenders WHERE battle_id = b.id
+            )
+            JOIN battle_attenders ba2 ON ba2.rowid = (
+                SELECT MAX(rowid) FROM battle_attenders WHERE battle_id = b.id
+            ) AND ba2.attender_id != ba1.attender_id
             LEFT JOIN warmasters w1 ON w1.telegram_id = ba1.attender_id
             LEFT JOIN alliances a1 ON a1.id = w1.alliance
-            JOIN (
-                SELECT battle_id, attender_id, MAX(rowid) as rn
-                FROM battle_attenders
-                GROUP BY battle_id
-            ) ba2 ON ba2.battle_id = b.id AND ba2.attender_id != ba1.attender_id
             LEFT JOIN warmasters w2 ON w2.telegram_id = ba2.attender_id
             LEFT JOIN alliances a2 ON a2.id = w2.alliance
-            WHERE ms.status = 2
-            ORDER BY ms.created_date DESC
-        ''') as cursor:
-            rows = await cursor.fetchall()
+            WHERE ms.id IN ({','.join('?' * len(page))})
+              AND (ms.status != 2 OR pr.id IS NOT NULL)
+            ORDER BY {_BATTLE_SORT_KEY} DESC, ms.id DESC, b.id
+        ''', [row[0] for row in page]) as db_cursor:
+            rows = await db_cursor.fetchall()
 
-    result = []
-    for row in rows:
-        result.append({
-            'mission_id': row[0],
-            'deploy': row[1],
-            'rules': row[2],
-            'cell': row[3],
-            'description': row[4],
-            'created_date': row[5],
-            'battle_id': row[6],
-            'pending_id': row[7],
-            'submitter_id': row[8],
-            'fst_score': row[9],
-            'snd_score': row[10],
-            'p1_id': row[11],
-            'p1_nick': row[12] or str(row[11]),
-            'p1_alliance': row[13] or '—',
-            'p2_id': row[14],
-            'p2_nick': row[15] or str(row[14]),
-            'p2_alliance': row[16] or '—',
-        })
-    return result
+    return {
+        'battles': [_battle_row_for_web(status, row) for row in rows],
+        'next_cursor': next_cursor,
+    }
 
 
-async def get_completed_battles_for_web():
-    """Get completed missions (status=3) with final scores and participant info for web UI.
+async def get_active_battles_for_web():
+    """Get all active missions (status=1) with battle and participant info for web UI.
 
     Returns:
-        List of dicts with keys: mission_id, deploy, rules, cell, created_date,
-        battle_id, p1_score, p2_score, p1_id, p1_nick, p1_alliance, p2_id, p2_nick, p2_alliance
+        List of dicts, see get_battles_page
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        async with db.execute('''
-            SELECT ms.id, ms.deploy, ms.rules, ms.cell, ms.mission_description, ms.created_date,
-                   b.id as battle_id, b.fstplayer as p1_score, b.sndplayer as p2_score,
-                   ba1.attender_id as p1_id, w1.nickname as p1_nick, a1.name as p1_alliance,
-                   ba2.attender_id as p2_id, w2.nickname as p2_nick, a2.name as p2_alliance
-            FROM mission_stack ms
-            JOIN battles b ON b.mission_id = ms.id
-            JOIN (
-                SELECT battle_id, attender_id, MIN(rowid) as rn
-                FROM battle_attenders
-                GROUP BY battle_id
-            ) ba1 ON ba1.battle_id = b.id
-            LEFT JOIN warmasters w1 ON w1.telegram_id = ba1.attender_id
-            LEFT JOIN alliances a1 ON a1.id = w1.alliance
-            JOIN (
-                SELECT battle_id, attender_id, MAX(rowid) as rn
-                FROM battle_attenders
-                GROUP BY battle_id
-            ) ba2 ON ba2.battle_id = b.id AND ba2.attender_id != ba1.attender_id
-            LEFT JOIN warmasters w2 ON w2.telegram_id = ba2.attender_id
-            LEFT JOIN alliances a2 ON a2.id = w2.alliance
-            WHERE ms.status = 3
-            ORDER BY ms.created_date DESC
-        ''') as cursor:
-            rows = await cursor.fetchall()
+    page = await get_battles_page(BATTLE_STATUS_ACTIVE, limit=None)
+    return page['battles']
 
-    result = []
-    for row in rows:
-        p1_score = row[7]
-        p2_score = row[8]
-        winner_nick = None
-        if p1_score is not None and p2_score is not None:
-            if p1_score > p2_score:
-                winner_nick = row[10] or str(row[9])
-            elif p2_score > p1_score:
-                winner_nick = row[13] or str(row[12])
-        result.append({
-            'mission_id': row[0],
-            'deploy': row[1],
-            'rules': row[2],
-            'cell': row[3],
-            'description': row[4],
-            'created_date': row[5],
-            'battle_id': row[6],
-            'p1_score': p1_score,
-            'p2_score': p2_score,
-            'p1_id': row[9],
-            'p1_nick': row[10] or str(row[9]),
-            'p1_alliance': row[11] or '—',
-            'p2_id': row[12],
-            'p2_nick': row[13] or str(row[12]),
-            'p2_alliance': row[14] or '—',
-            'winner_nick': winner_nick,
-        })
-    return result
+
+async def get_pending_battles_for_web():
+    """Get all missions (status=2) with pending results and participant info for web UI.
+
+    Returns:
+        List of dicts, see get_battles_page
+    """
+    page = await get_battles_page(BATTLE_STATUS_PENDING, limit=None)
+    return page['battles']
@@ -0,0 +1,130 @@
+"""Concurrent update processing that keeps each user's updates in order.
+
+With concurrent_updates > 1 PTB hands every update to the update processor
+as its own task. KeyedUpdateProcessor lets updates of different users run in
+parallel (at most `concurrency` at once) but serializes updates sharing a key
+-- the user, or the chat for updates without one -- in the order they
+arrived, so a player's button presses and conversation steps never overtake
+each other while another player's slow mission claim is running.
+
+Handlers changing alliances (membership, creation, renaming, deletion,
+resources, battle results that may eliminate one) are wrapped in
+exclusive(), which runs them one at a time across all users.
+"""
+
+import asyncio
+import functools
+import logging
+import time
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+# Updates accepted from PTB before it has to wait; they are queued on their
+# key and on the concurrency slots here.
+MAX_PENDING = 256
+
+# One alliance-changing flow at a time (bot event loop only).
+alliance_lock = asyncio.Lock()
+
+_current = None
+
+
+def update_key(update):
+    """Serialization key of an update: the user, else the chat, else None."""
+    if isinstance(update, Update):
+        if update.effective_user is not None:
+            return ('user', update.effective_user.id)
+        if update.effective_chat is not None:
+            return ('chat', update.effective_chat.id)
+    return None
+
+
+class _KeyQueue:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class KeyedUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates concurrently, one at a time per update_key().
+
+    Args:
+        concurrency: updates handled at the same time
+        max_pending: updates accepted before PTB has to wait (>= concurrency)
+    """
+
+    def __init__(self, concurrency, max_pending=MAX_PENDING):
+        super().__init__(max(concurrency, max_pending))
+        self.concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        self._keys = {}
+        self.processed = 0
+        self.queued = 0
+        self.max_wait = 0.0
+
+    async def do_process_update(self, update, coroutine):
+        key = update_key(update)
+        if key is None:
+            async with self._slots:
+                await coroutine
+            self.processed += 1
+            return
+
+        # Tasks reach this point in arrival order and asyncio.Lock wakes its
+        # waiters first in, first out, so a key's updates keep their order.
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = self._keys[key] = _KeyQueue()
+        entry.users += 1
+        if entry.lock.locked():
+            self.queued += 1
+        arrived = time.monotonic()
+        try:
+            async with entry.lock:
+                async with self._slots:
+                    self.max_wait = max(self.max_wait, time.monotonic() - arrived)
+                    await coroutine
+                self.processed += 1
+        finally:
+            entry.users -= 1
+            if not entry.users:
+                del self._keys[key]
+
+    async def initialize(self):
+        global _current
+        _current = self
+
+    async def shutdown(self):
+        global _current
+        if _current is self:
+            _current = None
+
+    def metrics(self):
+        return {
+            'concurrency': self.concurrency,
+            'in_flight': self.current_concurrent_updates,
+            'busy_keys': len(self._keys),
+            'processed': self.processed,
+            'queued_behind_same_key': self.queued,
+            'max_wait_seconds': round(self.max_wait, 3),
+        }
+
+
+def metrics():
+    """Counters of the running bot's processor, empty when it is not running."""
+    processor = _current
+    return processor.metrics() if processor is not None else {}
+
+
+def exclusive(handler):
+    """Run handler under alliance_lock, one alliance-changing flow at a time."""
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        async with alliance_lock:
+            return await handler(update, context)
+    return wrapper
@@ -0,0 +1,115 @@
+"""Reuse Telegram file_ids instead of uploading the same content again.
+
+Every photo the bot uploads comes back with a file_id that can be sent to
+any chat without another upload. The ids are stored in telegram_file_cache
+under a content key and mirrored in memory, so a repeated send is a
+dictionary lookup plus a short API call:
+
+* map exports: "map:<map state hash>" (only the latest map is kept)
+* WH40K deploy images: "deploy:<file name>:<mtime_ns>"
+
+If Telegram rejects a stored id the entry is dropped and the file is
+uploaded again.
+"""
+
+import asyncio
+import logging
+
+from telegram.error import BadRequest
+
+import config
+
+# Автоматическое переключение на mock версию в тестовом режиме
+if config.TEST_MODE:
+    import mock_sqlite_helper as sqllite_helper
+else:
+    import sqllite_helper
+
+logger = logging.getLogger(__name__)
+
+MAP_KIND = 'map'
+DEPLOY_KIND = 'deploy'
+
+# cache_key -> (kind, file_id); None until loaded from the database.
+_file_ids = None
+_load_lock = asyncio.Lock()
+
+
+async def _entries():
+    global _file_ids
+    if _file_ids is None:
+        async with _load_lock:
+            if _file_ids is None:
+                rows = await sqllite_helper.get_cached_file_ids()
+                _file_ids = {key: (kind, file_id) for key, kind, file_id in rows}
+    return _file_ids
+
+
+def map_key(map_hash):
+    return f"{MAP_KIND}:{map_hash}"
+
+
+def deploy_key(path):
+    """Key of a deploy image; changes whenever the file is replaced."""
+    return f"{DEPLOY_KIND}:{path.name}:{path.stat().st_mtime_ns}"
+
+
+async def known_map_hashes():
+    """Map state hashes that already have a file_id."""
+    prefix = MAP_KIND + ':'
+    return {key[len(prefix):] for key, (kind, _) in (await _entries()).items() if kind == MAP_KIND}
+
+
+async def get(cache_key):
+    entry = (await _entries()).get(cache_key)
+    return entry[1] if entry else None
+
+
+async def put(cache_key, kind, file_id):
+    entries = await _entries()
+    replace_kind = kind == MAP_KIND
+    if replace_kind:
+        for key in [k for k, (entry_kind, _) in entries.items() if entry_kind == kind]:
+            del entries[key]
+    entries[cache_key] = (kind, file_id)
+    await sqllite_helper.save_cached_file_id(cache_key, kind, file_id, replace_kind=replace_kind)
+
+
+async def forget(cache_key):
+    (await _entries()).pop(cache_key, None)
+    await sqllite_helper.delete_cached_file_id(cache_key)
+
+
+async def send_photo(send, cache_key, kind, load_photo, **kwargs):
+    """
+    Send a photo by its cached file_id, uploading it only when needed.
+
+    Args:
+        send: bound send method taking photo= (bot.send_photo with chat_id
+            bound, message.reply_photo, ...)
+        cache_key: content key of the photo
+        kind: MAP_KIND or DEPLOY_KIND
+        load_photo: coroutine function returning the photo to upload
+        **kwargs: passed to send (caption, reply_markup, ...)
+
+    Returns:
+        The sent Message
+    """
+    file_id = await get(cache_key)
+    if file_id is not None:
+        try:
+            return await send(photo=file_id, **kwargs)
+        except BadRequest as e:
+            logger.warning(f"Cached file_id for {cache_key} rejected ({e}); uploading again")
+            await forget(cache_key)
+
+    message = await send(photo=await load_photo(), **kwargs)
+    if message is not None and message.photo:
+        await put(cache_key, kind, message.photo[-1].file_id)
+    return message
+
+
+def clear_cache():
+    """Drop the in-memory copy so the next lookup reloads it."""
+    global _file_ids
+    _file_ids = None
@@ -7,26 +7,23 @@ import logging
 from datetime import datetime
 from flask import render_template, jsonify, Response, request
 from . import app
-from . import map_export_service
-from . import sqllite_helper
-from . import mission_helper
 import os
+# Flat imports only, like sqllite_helper's own imports: a relative import
+# would load a second CareBot.* copy of the module. Sharing the bot's copy
+# gives the views one event loop, one db_pool, one map render pool, one
+# mission pool, one web response cache and the bot's metrics for /health.
+import map_export_service
+import sqllite_helper
+import mission_helper
+import web_loop
+import web_cache
+import background_jobs
+import notification_dispatcher
+import update_processor
 
 logger = logging.getLogger(__name__)
 
 
-def _run_async(coro):
-    """Run async code from sync Flask route context."""
-    try:
-        return asyncio.run(coro)
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        try:
-            return loop.run_until_complete(coro)
-        finally:
-            loop.close()
-
-
 @app.route('/')
 @app.route('/home')
 def home():
@@ -69,6 +66,11 @@ def health():
             'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
             'database': 'available' if db_exists else 'missing',
+            'map_render': map_export_service.render_metrics(),
+            'background_jobs': background_jobs.metrics(),
+            'notifications': notification_dispatcher.dispatcher.metrics(),
+            'updates': update_processor.metrics(),
+            'web_cache': web_cache.metrics(),
             'version': '1.0.0'
         }), 200
     except Exception as e:
@@ -82,15 +84,25 @@ def health():
 
 @app.route('/admin/map_export.png', methods=['GET'])
 def export_map_png():
-    """Export full planet map as PNG via HTTP for local network access."""
+    """Export full planet map as PNG via HTTP for local network access.
+
+    The ETag is the map state hash, so a client sending If-None-Match gets
+    a 304 without the map being rendered or read from the cache.
+    """
     try:
-        png_bytes = _run_async(map_export_service.generate_realistic_map_png())
+        export = web_loop.run(map_export_service.export_map(request.if_none_match))
     except map_export_service.EmptyMapExportError:
         return jsonify({
             'status': 'error',
             'message': 'Карта пуста, экспортировать нечего.',
             'timestamp': datetime.now().isoformat(),
         }), 404
+    except map_export_service.MapRenderBusyError:
+        return jsonify({
+            'status': 'error',
+            'message': 'Сейчас формируется слишком много карт, попробуйте позже.',
+            'timestamp': datetime.now().isoformat(),
+        }), 503, {'Retry-After': '30'}
     except Exception as e:
         return jsonify({
             'status': 'error',
@@ -99,26 +111,93 @@ def export_map_png():
             'error': str(e),
         }), 500
 
-    return Response(png_bytes, mimetype='image/png')
+    if export.png is None:
+        response = Response(status=304)
+    else:
+        response = Response(export.png, mimetype='image/png')
+    response.set_etag(export.etag)
+    # Always revalidate: the map changes after every battle.
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 # ============================================================================
 # Battles Web UI
 # ============================================================================
 
+BATTLE_STATUSES = {
+    'active': sqllite_helper.BATTLE_STATUS_ACTIVE,
+    'pending': sqllite_helper.BATTLE_STATUS_PENDING,
+    'completed': sqllite_helper.BATTLE_STATUS_COMPLETED,
+}
+
+# Largest page /api/battles returns.
+MAX_BATTLES_PAGE = 200
+
+
+def _battles_filters(args):
+    """rules, alliance_id, date_from and date_to of a battles request.
+
+    Raises:
+        ValueError: alliance_id or a date is malformed
+    """
+    filters = {}
+    if args.get('rules'):
+        filters['rules'] = args['rules']
+    if args.get('alliance_id'):
+        filters['alliance_id'] = int(args['alliance_id'])
+    for name in ('date_from', 'date_to'):
+        if args.get(name):
+            filters[name] = datetime.strptime(args[name], '%Y-%m-%d').date().isoformat()
+    return filters
+
+
+def _cached_battles(key, load):
+    """Result of load() from web_cache.battles, loading it on a miss."""
+    cached = web_cache.battles.get(key)
+    if cached is not None:
+        return cached
+    generation = web_cache.battles.generation
+    value = web_loop.run(load())
+    web_cache.battles.put(key, value, generation)
+    return value
+
+
+async def _load_battles_page(cursor, filters):
+    """Fetch all /battles data in one trip to the shared loop."""
+    return await asyncio.gather(
+        sqllite_helper.get_active_battles_for_web(),
+        sqllite_helper.get_pending_battles_for_web(),
+        sqllite_helper.get_battles_page(
+            sqllite_helper.BATTLE_STATUS_COMPLETED, cursor=cursor, **filters),
+        sqllite_helper.get_warmasters_with_nicknames(),
+    )
+
+
 @app.route('/battles')
 def battles():
-    """Web UI for managing battle results."""
-    active = _run_async(sqllite_helper.get_active_battles_for_web())
-    pending = _run_async(sqllite_helper.get_pending_battles_for_web())
-    completed = _run_async(sqllite_helper.get_completed_battles_for_web())
-    warmasters = _run_async(sqllite_helper.get_warmasters_with_nicknames())
+    """Web UI for managing battle results.
+
+    Completed battles are paged: ?after=<cursor> shows the next older page;
+    rules, alliance_id, date_from and date_to filter them.
+    """
+    cursor = request.args.get('after') or None
+    try:
+        filters = _battles_filters(request.args)
+        key = ('page', cursor, tuple(sorted(filters.items())))
+        active, pending, completed, warmasters = _cached_battles(
+            key, lambda: _load_battles_page(cursor, filters))
+    except ValueError as e:
+        return _api_error('invalid_request', str(e))
     return render_template(
         'battles.html',
         title='Управление битвами',
         active_battles=active,
         pending_battles=pending,
-        completed_battles=completed,
+        completed_battles=completed['battles'],
+        completed_next=completed['next_cursor'],
+        completed_filters=filters,
+        completed_paged=cursor is not None,
         warmasters=warmasters,
         year=datetime.now().year,
     )
@@ -128,6 +207,47 @@ def _api_error(error_code: str, error: str, status_code: int = 400):
     return jsonify({'ok': False, 'error_code': error_code, 'error': error}), status_code
 
 
+@app.route('/api/battles', methods=['GET'])
+def list_battles():
+    """Battles as JSON, one page at a time, newest mission first.
+
+    Query parameters:
+      - status: active, pending or completed (default)
+      - rules, alliance_id, date_from, date_to (YYYY-MM-DD): filters
+      - limit: missions per page (default 50, at most MAX_BATTLES_PAGE)
+      - after: next_cursor of the previous page
+
+    Pages are cached for a few seconds and dropped whenever a battle changes.
+    """
+    status_name = request.args.get('status', 'completed')
+    if status_name not in BATTLE_STATUSES:
+        return _api_error('invalid_status', f'status must be one of {", ".join(BATTLE_STATUSES)}')
+    cursor = request.args.get('after') or None
+    try:
+        filters = _battles_filters(request.args)
+        limit = int(request.args.get('limit', sqllite_helper.BATTLES_PAGE_SIZE))
+        if cursor is not None:
+            sqllite_helper.decode_battles_cursor(cursor)
+    except ValueError as e:
+        return _api_error('invalid_request', str(e))
+    if not 1 <= limit <= MAX_BATTLES_PAGE:
+        return _api_error('invalid_request', f'limit must be between 1 and {MAX_BATTLES_PAGE}')
+
+    key = ('api', status_name, cursor, limit, tuple(sorted(filters.items())))
+    try:
+        page = _cached_battles(key, lambda: sqllite_helper.get_battles_page(
+            BATTLE_STATUSES[status_name], limit=limit, cursor=cursor, **filters))
+    except Exception as e:
+        logger.error('Web API list battles error: %s', e, exc_info=True)
+        return _api_error('list_failed', str(e), 500)
+    return jsonify({
+        'ok': True,
+        'status': status_name,
+        'battles': page['battles'],
+        'next_cursor': page['next_cursor'],
+    })
+
+
 @app.route('/api/battles/create', methods=['POST'])
 def create_battle():
     """Create a new battle from web UI.
@@ -226,10 +346,8 @@ def create_battle():
                         409
                     )
             else:
-                # --- Auto-generate mission from rules ---
-                mission_tuple = mission_helper.generate_new_one(rules_raw)
-                await sqllite_helper.save_mission(mission_tuple)
-                new_mission = await sqllite_helper.get_mission(rules_raw)
+                # --- Take a ready mission of these rules from the pool ---
+                new_mission = await mission_helper.pool.claim(rules_raw)
                 if not new_mission:
                     return _api_error('mission_gen_failed', 'Не удалось создать миссию. Попробуйте ещё раз.', 500)
                 selected_mission_id = new_mission.id
@@ -279,7 +397,7 @@ def create_battle():
             )
             return jsonify({'ok': True, 'battle_id': battle_id, 'mission_id': selected_mission_id})
 
-        return _run_async(_create())
+        return web_loop.run(_create())
     except Exception as e:
         logger.error('Web UI create battle error: %s', e, exc_info=True)
         return _api_error('create_failed', str(e), 500)
@@ -300,7 +418,7 @@ def submit_battle_result(battle_id):
         return jsonify({'ok': False, 'error': 'submitter_id обязателен'}), 400
 
     try:
-        result = _run_async(
+        result = web_loop.run(
             mission_helper.submit_pending_battle_result(
                 battle_id,
                 submitter_id,
@@ -327,18 +445,24 @@ def submit_battle_result(battle_id):
         return jsonify({'ok': False, 'error': str(e)}), 500
 
 
+async def _exclusive(coro):
+    """Await coro under the bot's alliance_lock, like update_processor.exclusive."""
+    async with update_processor.alliance_lock:
+        return await coro
+
+
 @app.route('/api/battles/<int:battle_id>/confirm', methods=['POST'])
 def confirm_battle_result(battle_id):
     """Confirm a pending battle result from the web UI."""
     try:
-        result = _run_async(
+        result = web_loop.run(_exclusive(
             mission_helper.confirm_pending_battle_result(
                 battle_id,
                 confirmer_id=None,
                 require_participant=False,
                 allow_submitter_confirm=True,
             )
-        )
+        ))
         logger.info('Web UI: confirmed pending result for battle %s', battle_id)
         return jsonify({'ok': True, 'mission_id': result['mission_id']})
     except PermissionError as e:
@@ -356,7 +480,7 @@ def confirm_battle_result(battle_id):
 def reject_battle_result(battle_id):
     """Reject/cancel a pending battle result from the web UI."""
     try:
-        result = _run_async(
+        result = web_loop.run(
             mission_helper.reject_pending_battle_result(
                 battle_id,
                 rejector_id=None,
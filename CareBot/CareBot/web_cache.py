@@ -0,0 +1,89 @@
+"""Short-lived cache for web pages and API responses built from the database.
+
+The bot and the Flask views import this module flat and share one cache, so
+a result confirmed in Telegram also clears the pages the web serves:
+
+* views look results up with get() and store them with put();
+* sqllite_helper clears `battles` whenever a battle, its participants, its
+  pending result or its mission status change (invalidate_battles()).
+
+put() is skipped when the cache was cleared while the result was being
+built, so a page loaded just before a write is never stored after it.
+"""
+
+import threading
+import time
+
+# Seconds a battles page is served from memory; writes clear it earlier.
+BATTLES_TTL = 10
+
+# Entries kept per cache; expired ones are dropped first.
+MAX_ENTRIES = 256
+
+
+class TTLCache:
+    """Thread-safe key -> value cache with expiry and a clear generation."""
+
+    def __init__(self, ttl, max_entries=MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self):
+        """Read before building a value; pass to put()."""
+        return self._generation
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, generation):
+        """Store value unless the cache was cleared since generation was read."""
+        now = time.monotonic()
+        with self._lock:
+            if generation != self._generation:
+                return
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                for stale in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                    del self._entries[stale]
+                if len(self._entries) >= self.max_entries:
+                    # Oldest insertion first.
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (now + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+
+    def metrics(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+        }
+
+
+battles = TTLCache(BATTLES_TTL)
+
+
+def invalidate_battles():
+    battles.clear()
+
+
+def metrics():
+    return {'battles': battles.metrics()}
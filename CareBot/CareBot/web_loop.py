@@ -0,0 +1,122 @@
+"""Long-lived event loop for running async helpers from Flask views.
+
+Flask views are synchronous, but the database and map export helpers are
+coroutines. Instead of building a new event loop for every request, views
+submit coroutines to one long-lived loop:
+
+* In the hybrid process the bot attaches its own running loop on startup,
+  so web requests share the bot's pooled database connections (db_pool only
+  serves the loop it was opened on).
+* Without a bot (runserver.py) a daemon thread runs a private loop. If
+  configure() was given a database path, the connection pool is opened on
+  that loop the first time it starts.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import os
+import threading
+
+import db_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = float(os.environ.get('WEB_LOOP_TIMEOUT', '60'))
+
+_lock = threading.Lock()
+_attached_loop = None
+_own_loop = None
+_pool_path = None
+
+
+def configure(database_path):
+    """Open a db_pool for database_path when the private loop starts."""
+    global _pool_path
+    _pool_path = database_path
+
+
+def attach(loop):
+    """Serve web requests on loop (the bot's loop) from now on."""
+    global _attached_loop
+    with _lock:
+        _attached_loop = loop
+    logger.info("Web requests now run on the bot event loop")
+
+
+def detach(loop=None):
+    """Stop using the attached loop (bot shutdown)."""
+    global _attached_loop
+    with _lock:
+        if loop is None or _attached_loop is loop:
+            _attached_loop = None
+
+
+def _start_own_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name='web-event-loop', daemon=True)
+    thread.start()
+    if _pool_path and os.path.exists(_pool_path):
+        asyncio.run_coroutine_threadsafe(db_pool.init_pool(_pool_path), loop).result()
+    logger.info("Started web event loop thread")
+    return loop
+
+
+def get_loop():
+    """Return the loop web requests should run on, starting one if needed."""
+    global _own_loop
+    with _lock:
+        if _attached_loop is not None and _attached_loop.is_running():
+            return _attached_loop
+        if _own_loop is None or _own_loop.is_closed():
+            _own_loop = _start_own_loop()
+        return _own_loop
+
+
+def run(coro, timeout=DEFAULT_TIMEOUT):
+    """Run coro on the shared loop and return its result (blocking).
+
+    The coroutine runs in a copy of the caller's context, so Flask's
+    application/request context (jsonify, request) stays available.
+    """
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("web_loop.run() called from the loop it submits to")
+
+    context = contextvars.copy_context()
+    result = concurrent.futures.Future()
+
+    def start():
+        if result.cancelled():
+            coro.close()
+            return
+        task = loop.create_task(coro, context=context)
+
+        def done(task):
+            try:
+                if task.cancelled():
+                    result.set_exception(concurrent.futures.CancelledError())
+                elif task.exception() is not None:
+                    result.set_exception(task.exception())
+                else:
+                    result.set_result(task.result())
+            except concurrent.futures.InvalidStateError:
+                pass  # the caller already timed out and cancelled result
+
+        task.add_done_callback(done)
+        # The caller gave up (timeout): stop the task too.
+        result.add_done_callback(
+            lambda f: f.cancelled() and loop.call_soon_threadsafe(task.cancel))
+
+    loop.call_soon_threadsafe(start)
+    try:
+        return result.result(timeout)
+    except concurrent.futures.TimeoutError:
+        result.cancel()
+        raise
@@ -2,8 +2,15 @@
 This script runs the CareBot application using a development server.
 """
 
+import os
+import sys
 from os import environ
-from CareBot import app
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'CareBot'))
+
+from CareBot import app  # noqa: E402
+import sqllite_helper  # noqa: E402
+import web_loop  # noqa: E402
 
 if __name__ == '__main__':
     HOST = environ.get('SERVER_HOST', 'localhost')
@@ -11,4 +18,6 @@ if __name__ == '__main__':
         PORT = int(environ.get('SERVER_PORT', '5555'))
     except ValueError:
         PORT = 5555
+    # No bot in this process: pool connections on the web loop itself.
+    web_loop.configure(sqllite_helper.DATABASE_PATH)
     app.run(HOST, PORT)
@@ -0,0 +1,80 @@
+"""
+Tests for planning alliance elimination (alliance_elimination).
+"""
+import os
+import sys
+import asyncio
+import types
+from collections import Counter
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+import alliance_elimination  # noqa: E402
+import mock_sqlite_helper  # noqa: E402
+
+
+def test_players_go_to_the_least_loaded_alliances():
+    plan = alliance_elimination.plan_players(range(10), {1: 5, 2: 0, 3: 2})
+    counts = Counter(alliance for alliance, _ in plan)
+    assert counts == {2: 6, 3: 3, 1: 1}
+    assert [player for _, player in plan] == list(range(10))
+    assert alliance_elimination.plan_players([7], {}) == [(0, 7)]
+
+
+def test_territories_prefer_neighbours_without_unbalancing():
+    # Row of hexes 1..6 owned by the eliminated alliance, alliance 10 next to
+    # hex 1 and alliance 20 next to hex 6; alliance 30 borders nothing.
+    hexes = [1, 2, 3, 4, 5, 6]
+    neighbours = {h: [h - 1, h + 1] for h in hexes}
+    owner = {0: 10, 7: 20}
+    plan = alliance_elimination.plan_territories(hexes, neighbours, owner, {10: 3, 20: 3, 30: 3})
+
+    assert sorted(h for _, h in plan) == hexes
+    counts = Counter(alliance for alliance, _ in plan)
+    assert counts == {10: 2, 20: 2, 30: 2}
+    patron = {h: alliance for alliance, h in plan}
+    assert patron[1] == 10 and patron[6] == 20
+
+
+def test_large_plan_stays_balanced():
+    hexes = list(range(1, 5001))
+    neighbours = {h: [h - 1, h + 1] for h in hexes}
+    counts = {alliance: alliance % 7 for alliance in range(100, 140)}
+    plan = alliance_elimination.plan_territories(hexes, neighbours, {0: 100}, counts)
+
+    totals = Counter(counts)
+    totals.update(alliance for alliance, _ in plan)
+    assert max(totals.values()) - min(totals.values()) <= alliance_elimination.MAX_IMBALANCE + 1
+
+
+def test_mock_dry_run_changes_nothing(monkeypatch):
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_ALLIANCES', {
+        1: {'id': 1, 'name': 'A', 'common_resource': 7},
+        2: {'id': 2, 'name': 'B', 'common_resource': 0},
+        3: {'id': 3, 'name': 'C', 'common_resource': 0},
+    })
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_MAP_CELLS', [(1, 'Город', 1, 0), (2, 'Леса', 2, 0)])
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_WARMASTERS', {
+        1: {'telegram_id': '1', 'alliance': 1},
+        2: {'telegram_id': '2', 'alliance': 2},
+    })
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_MISSIONS', {})
+
+    plan = asyncio.run(mock_sqlite_helper.eliminate_alliance(
+        1, release_players=True, resource_missions=True, dry_run=True))
+    assert plan.summary() == {
+        'alliance_id': 1, 'alliance_name': 'A', 'territories': 1, 'players': 1,
+        'resources': 7, 'resource_missions': 6, 'executed': False,
+    }
+    assert 1 in mock_sqlite_helper.MOCK_ALLIANCES
+
+    plan = asyncio.run(mock_sqlite_helper.eliminate_alliance(
+        1, release_players=True, resource_missions=True))
+    assert plan.executed and 1 not in mock_sqlite_helper.MOCK_ALLIANCES
+    assert mock_sqlite_helper.MOCK_MAP_CELLS[0] == (1, 'Город', 3, 0)
+    assert mock_sqlite_helper.MOCK_WARMASTERS[1]['alliance'] == 0
+    assert len(mock_sqlite_helper.MOCK_MISSIONS) == 6
@@ -0,0 +1,77 @@
+"""
+Tests for the trigger-maintained alliance_stats table (migration 032).
+"""
+import os
+import shutil
+import sqlite3
+
+from yoyo import get_backend, read_migrations
+
+MIGRATION = os.path.join(
+    os.path.dirname(__file__), '..', 'CareBot', 'migrations', '032_add_alliance_stats.py'
+)
+
+
+def _apply_migration(tmp_path, db_path):
+    migrations_dir = tmp_path / 'migrations'
+    migrations_dir.mkdir()
+    shutil.copy(MIGRATION, migrations_dir)
+    backend = get_backend(f'sqlite:///{db_path}')
+    with backend.lock():
+        backend.apply_migrations(backend.to_apply(read_migrations(str(migrations_dir))))
+
+
+def _recount(conn):
+    return conn.execute('''
+        SELECT a.id,
+               (SELECT COUNT(*) FROM warmasters WHERE alliance = a.id),
+               (SELECT COUNT(*) FROM map WHERE patron = a.id),
+               (SELECT COUNT(*) FROM map WHERE patron = a.id AND has_warehouse = 1)
+        FROM alliances a ORDER BY a.id
+    ''').fetchall()
+
+
+def _stats(conn):
+    return conn.execute('SELECT * FROM alliance_stats ORDER BY alliance_id').fetchall()
+
+
+def test_triggers_keep_counts_in_step_with_tables(tmp_path):
+    db_path = str(tmp_path / 'stats.db')
+    conn = sqlite3.connect(db_path)
+    conn.executescript('''
+        CREATE TABLE alliances (id INTEGER PRIMARY KEY, name TEXT, common_resource INTEGER);
+        CREATE TABLE warmasters (telegram_id TEXT PRIMARY KEY, alliance INTEGER);
+        CREATE TABLE map (id INTEGER PRIMARY KEY, patron INTEGER, has_warehouse INTEGER);
+        INSERT INTO alliances (id, name) VALUES (1, 'A'), (2, 'B');
+        INSERT INTO warmasters VALUES ('10', 1), ('11', 1), ('12', 2), ('13', 0);
+        INSERT INTO map VALUES (1, 1, 1), (2, 1, 0), (3, 2, 0), (4, 0, NULL);
+    ''')
+    conn.commit()
+    _apply_migration(tmp_path, db_path)
+    assert _stats(conn) == [(1, 2, 2, 1), (2, 1, 1, 0)]
+
+    steps = [
+        "UPDATE map SET patron = 2 WHERE id = 1",
+        "UPDATE map SET has_warehouse = 1 WHERE id = 3",
+        "UPDATE map SET has_warehouse = 1 WHERE id = 3",
+        "INSERT INTO map VALUES (5, 1, 1)",
+        "DELETE FROM map WHERE id = 2",
+        "UPDATE warmasters SET alliance = 2 WHERE telegram_id = '10'",
+        "INSERT INTO warmasters VALUES ('14', 1)",
+        "DELETE FROM warmasters WHERE telegram_id = '11'",
+        # A new alliance picks up hexes and players already pointing at it.
+        "INSERT INTO warmasters VALUES ('15', 3)",
+        "INSERT INTO alliances (id, name) VALUES (3, 'C')",
+        "UPDATE map SET patron = 3 WHERE id = 4",
+        "DELETE FROM alliances WHERE id = 1",
+    ]
+    for sql in steps:
+        conn.execute(sql)
+        assert _stats(conn) == _recount(conn), sql
+
+    assert _stats(conn) == [(2, 2, 2, 2), (3, 1, 1, 0)]
+    dominant = conn.execute('''
+        SELECT alliance_id FROM alliance_stats WHERE territory_count > 0
+        ORDER BY territory_count DESC, alliance_id LIMIT 1
+    ''').fetchone()
+    assert dominant == (2,)
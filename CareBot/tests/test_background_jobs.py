@@ -0,0 +1,96 @@
+"""
+Tests for the schedule retention job.
+"""
+import os
+import sys
+import asyncio
+import datetime
+import shutil
+import sqlite3
+import types
+
+from yoyo import get_backend, read_migrations
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+import background_jobs  # noqa: E402
+import mock_sqlite_helper  # noqa: E402
+import sqllite_helper  # noqa: E402
+
+MIGRATIONS = ('029_add_schedule_history.py', '035_rekey_schedule_history.py')
+
+
+def test_cutoff_keeps_previous_week_across_new_year():
+    # 2027-01-04 is the Monday of ISO week 1; the previous week is 2026-W53.
+    assert background_jobs.schedule_retention_cutoff(datetime.date(2027, 1, 6)) == datetime.date(2026, 12, 28)
+    assert background_jobs.schedule_retention_cutoff(datetime.date(2026, 10, 18)) == datetime.date(2026, 10, 5)
+
+
+def test_expired_rows_move_to_history(monkeypatch):
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_SCHEDULES', {})
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_SCHEDULE_HISTORY', [])
+    today = datetime.datetime.now()
+
+    async def run():
+        await mock_sqlite_helper.insert_to_schedule(today - datetime.timedelta(days=30), 'killteam', 1)
+        await mock_sqlite_helper.insert_to_schedule(today, 'killteam', 2)
+        await background_jobs.archive_expired_schedule()
+
+    asyncio.run(run())
+    assert list(mock_sqlite_helper.MOCK_SCHEDULES) == [str(today.date())]
+    assert [row['user_telegram'] for row in mock_sqlite_helper.MOCK_SCHEDULE_HISTORY] == ['1']
+
+
+def test_reused_schedule_ids_keep_their_history(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'schedule.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE schedule (id INTEGER PRIMARY KEY NOT NULL UNIQUE, date TEXT, '
+                 'rules TEXT, user_telegram TEXT NOT NULL, date_week INTEGER)')
+    conn.commit()
+    migrations_dir = tmp_path / 'migrations'
+    migrations_dir.mkdir()
+    for name in MIGRATIONS:
+        shutil.copy(os.path.join(MODULE_DIR, 'migrations', name), migrations_dir)
+    backend = get_backend(f'sqlite:///{db_path}')
+    with backend.lock():
+        backend.apply_migrations(backend.to_apply(read_migrations(str(migrations_dir))))
+    monkeypatch.setattr(sqllite_helper, 'DATABASE_PATH', db_path)
+
+    def book(user):
+        conn.execute("INSERT INTO schedule (date, rules, user_telegram, date_week) "
+                     "VALUES ('2026-01-05', 'killteam', ?, 2)", (user,))
+        conn.commit()
+
+    book('1')
+    assert asyncio.run(sqllite_helper.archive_expired_schedule('2026-02-01')) == 1
+    book('2')  # the emptied table hands out the same id again
+    assert asyncio.run(sqllite_helper.archive_expired_schedule('2026-02-01')) == 1
+
+    rows = conn.execute('SELECT schedule_id, user_telegram FROM schedule_history '
+                        'ORDER BY history_id').fetchall()
+    assert rows == [(1, '1'), (1, '2')]
+
+
+def test_mission_expiry_records_metrics(monkeypatch):
+    results = [3, RuntimeError('database is locked')]
+
+    async def unlock():
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(mock_sqlite_helper, 'unlock_expired_missions', unlock)
+    monkeypatch.setattr(background_jobs, '_stats', {})
+    asyncio.run(background_jobs.unlock_expired_missions())
+    asyncio.run(background_jobs.unlock_expired_missions())
+
+    stats = background_jobs.metrics()['mission_expiry']
+    assert stats['runs'] == 2 and stats['failures'] == 1
+    assert stats['last_rows'] == 3 and stats['total_rows'] == 3
+    assert stats['last_error'] == 'database is locked'
+    assert stats['last_run'] is not None
@@ -0,0 +1,146 @@
+"""
+Tests for webhook mode, driven by a local stub of the Telegram Bot API.
+"""
+import os
+import sys
+import asyncio
+import json
+import socket
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import httpx
+import pytest
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+pytest.importorskip('tornado')
+
+from telegram.ext import ApplicationBuilder, CommandHandler  # noqa: E402
+
+import bot_transport  # noqa: E402
+
+TOKEN = '123:TEST'
+
+
+class StubBotApi(BaseHTTPRequestHandler):
+    """Answers the Bot API methods the bot calls and records them."""
+
+    calls = []
+
+    def do_POST(self):
+        method = self.path.rsplit('/', 1)[-1]
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            params = json.loads(body or '{}')
+        else:
+            params = dict(parse_qsl(body))
+        self.calls.append((method, params))
+
+        if method == 'getMe':
+            result = {'id': 123, 'is_bot': True, 'first_name': 'Stub', 'username': 'stub_bot'}
+        elif method == 'sendMessage':
+            result = {'message_id': 2, 'date': 0, 'text': params.get('text'),
+                      'chat': {'id': int(params['chat_id']), 'type': 'private'}}
+        else:
+            result = True
+        payload = json.dumps({'ok': True, 'result': result}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_settings_come_from_environment(monkeypatch):
+    monkeypatch.setenv('BOT_MODE', 'webhook')
+    monkeypatch.setenv('WEBHOOK_URL', 'https://bot.example.com/')
+    settings = bot_transport.load_settings()
+    assert settings.webhook_url == 'https://bot.example.com/telegram'
+    assert settings.listen == '127.0.0.1' and settings.secret_token
+
+    monkeypatch.delenv('WEBHOOK_URL')
+    with pytest.raises(ValueError):
+        bot_transport.load_settings()
+
+
+def test_webhook_update_reaches_handler(monkeypatch):
+    api = ThreadingHTTPServer(('127.0.0.1', 0), StubBotApi)
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    StubBotApi.calls = []
+
+    port = _free_port()
+    monkeypatch.setenv('BOT_MODE', 'webhook')
+    monkeypatch.setenv('WEBHOOK_URL', 'https://bot.example.com')
+    monkeypatch.setenv('WEBHOOK_PORT', str(port))
+    monkeypatch.setenv('WEBHOOK_SECRET_TOKEN', 'secret')
+    settings = bot_transport.load_settings()
+
+    async def ping(update, context):
+        await update.message.reply_text('pong')
+
+    update = {
+        'update_id': 1,
+        'message': {
+            'message_id': 1, 'date': 0, 'text': '/ping',
+            'chat': {'id': 42, 'type': 'private'},
+            'from': {'id': 42, 'is_bot': False, 'first_name': 'Player'},
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': 5}],
+        },
+    }
+
+    async def run():
+        application = (
+            ApplicationBuilder()
+            .token(TOKEN)
+            .base_url(f'http://127.0.0.1:{api.server_port}/bot')
+            .concurrent_updates(settings.concurrent_updates)
+            .build()
+        )
+        application.add_handler(CommandHandler('ping', ping))
+        async with application:
+            await application.updater.start_webhook(**bot_transport.webhook_kwargs(settings))
+            await application.start()
+            try:
+                url = f'http://127.0.0.1:{port}/{settings.url_path}'
+                async with httpx.AsyncClient() as client:
+                    rejected = await client.post(url, json=update)
+                    accepted = await client.post(
+                        url, json=update,
+                        headers={'X-Telegram-Bot-Api-Secret-Token': 'secret'})
+                for _ in range(50):
+                    if any(method == 'sendMessage' for method, _ in StubBotApi.calls):
+                        break
+                    await asyncio.sleep(0.05)
+            finally:
+                await application.updater.stop()
+                await application.stop()
+        return rejected.status_code, accepted.status_code
+
+    try:
+        rejected, accepted = asyncio.run(run())
+    finally:
+        api.shutdown()
+
+    assert (rejected, accepted) == (403, 200)
+    methods = [method for method, _ in StubBotApi.calls]
+    assert 'setWebhook' in methods
+    webhook = dict(StubBotApi.calls)['setWebhook']
+    assert webhook['url'] == 'https://bot.example.com/telegram'
+    sent = [params for method, params in StubBotApi.calls if method == 'sendMessage']
+    assert len(sent) == 1 and sent[0]['text'] == 'pong' and str(sent[0]['chat_id']) == '42'
@@ -0,0 +1,81 @@
+"""
+Tests for confirming pending battle results from several places at once.
+"""
+import os
+import sys
+import asyncio
+import types
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+import mission_helper  # noqa: E402
+import mock_sqlite_helper  # noqa: E402
+
+
+def _setup(monkeypatch, update_map):
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_PENDING_RESULTS', {})
+    applied = []
+
+    async def get_battle_participants(battle_id):
+        return ('10', '11')
+
+    async def get_mission_id_for_battle(battle_id):
+        return 7
+
+    async def noop(*args):
+        await asyncio.sleep(0)
+
+    async def write_battle_result(battle_id, user_reply):
+        await asyncio.sleep(0)
+        applied.append(battle_id)
+
+    monkeypatch.setattr(mock_sqlite_helper, 'get_battle_participants', get_battle_participants)
+    monkeypatch.setattr(mock_sqlite_helper, 'get_mission_id_for_battle', get_mission_id_for_battle)
+    monkeypatch.setattr(mission_helper, 'ensure_mission_cell', noop)
+    monkeypatch.setattr(mission_helper, 'write_battle_result', write_battle_result)
+    monkeypatch.setattr(mission_helper, 'apply_mission_rewards', noop)
+    monkeypatch.setattr(mission_helper.map_helper, 'update_map', update_map)
+    return applied
+
+
+def _confirm(battle_id):
+    return mission_helper.confirm_pending_battle_result(
+        battle_id, require_participant=False, allow_submitter_confirm=True)
+
+
+def test_concurrent_confirmations_apply_the_result_once(monkeypatch):
+    async def update_map(*args):
+        await asyncio.sleep(0)
+
+    applied = _setup(monkeypatch, update_map)
+
+    async def run():
+        await mock_sqlite_helper.create_pending_result(5, '10', 20, 15)
+        return await asyncio.gather(_confirm(5), _confirm(5), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert applied == [5]
+    assert sum(isinstance(result, ValueError) for result in results) == 1
+    assert mock_sqlite_helper.MOCK_PENDING_RESULTS == {}
+
+
+def test_failed_confirmation_keeps_the_result_pending(monkeypatch):
+    async def update_map(*args):
+        raise RuntimeError('database is locked')
+
+    _setup(monkeypatch, update_map)
+
+    async def run():
+        await mock_sqlite_helper.create_pending_result(5, '10', 20, 15)
+        try:
+            await _confirm(5)
+        except RuntimeError:
+            pass
+        return await mock_sqlite_helper.get_pending_result_by_battle_id(5)
+
+    pending = asyncio.run(run())
+    assert (pending.submitter_id, pending.fstplayer_score, pending.sndplayer_score) == ('10', 20, 15)
@@ -0,0 +1,146 @@
+"""
+Tests for the daily game count rollup (migrations 033 and 036).
+"""
+import os
+import sys
+import asyncio
+import shutil
+import sqlite3
+import types
+
+from yoyo import get_backend, read_migrations
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+import sqllite_helper  # noqa: E402
+
+MIGRATIONS = [
+    os.path.join(MODULE_DIR, 'migrations', name)
+    for name in ('033_add_game_counts_daily.py', '036_add_game_counts_battles.py')
+]
+
+# The per-request query the rollup replaces.
+HISTORY_SQL = '''
+    WITH recent_missions AS (
+        SELECT id FROM mission_stack
+        WHERE status = 3 AND created_date IS NOT NULL AND created_date >= ?
+    ),
+    mission_battles AS (
+        SELECT rm.id AS mission_id,
+               (SELECT id FROM battles b WHERE b.mission_id = rm.id
+                ORDER BY id DESC LIMIT 1) AS battle_id
+        FROM recent_missions rm
+    )
+    SELECT ba.attender_id, COUNT(*)
+    FROM mission_battles mb
+    JOIN battle_attenders ba ON ba.battle_id = mb.battle_id
+    GROUP BY ba.attender_id
+    ORDER BY ba.attender_id
+'''
+
+ROLLUP_SQL = '''
+    SELECT telegram_id, SUM(games) FROM game_counts_daily
+    WHERE day >= ?
+    GROUP BY telegram_id
+    ORDER BY telegram_id
+'''
+
+
+def _apply_migration(tmp_path, db_path):
+    migrations_dir = tmp_path / 'migrations'
+    migrations_dir.mkdir()
+    for migration in MIGRATIONS:
+        shutil.copy(migration, migrations_dir)
+    backend = get_backend(f'sqlite:///{db_path}')
+    with backend.lock():
+        backend.apply_migrations(backend.to_apply(read_migrations(str(migrations_dir))))
+
+
+def _create_history(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executescript('''
+        CREATE TABLE alliances (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE warmasters (telegram_id TEXT UNIQUE, alliance INTEGER, nickname TEXT);
+        CREATE TABLE mission_stack (id INTEGER PRIMARY KEY, rules TEXT, status INTEGER,
+                                    created_date TEXT);
+        CREATE TABLE battles (id INTEGER PRIMARY KEY, mission_id INTEGER);
+        CREATE TABLE battle_attenders (battle_id INTEGER, attender_id INTEGER);
+        INSERT INTO alliances VALUES (1, 'A'), (2, 'B');
+        INSERT INTO warmasters VALUES ('10', 1, 'x'), ('11', 2, 'y'), ('12', 0, 'z');
+    ''')
+    return conn
+
+
+def test_backfill_matches_history_for_any_window(tmp_path):
+    db_path = str(tmp_path / 'games.db')
+    conn = _create_history(db_path)
+    missions = [
+        # id, rules, status, created_date, battles as attender pairs
+        (1, 'killteam', 3, '2026-01-01', [(10, 11)]),
+        (2, 'wh40k', 3, '2026-01-05', [(10, 12), (11, 12)]),  # latest battle counts
+        (3, 'killteam', 1, '2026-01-05', [(10, 11)]),  # not completed
+        (4, 'killteam', 3, None, [(10, 11)]),  # no date
+        (5, None, 3, '2026-02-01', [(11, 12)]),
+        (6, 'wh40k', 3, '2026-02-01', [(10, 11)]),
+    ]
+    battle_id = 0
+    for mission_id, rules, status, created, battles in missions:
+        conn.execute('INSERT INTO mission_stack VALUES (?, ?, ?, ?)',
+                     (mission_id, rules, status, created))
+        for pair in battles:
+            battle_id += 1
+            conn.execute('INSERT INTO battles VALUES (?, ?)', (battle_id, mission_id))
+            conn.executemany('INSERT INTO battle_attenders VALUES (?, ?)',
+                             [(battle_id, attender) for attender in pair])
+    conn.commit()
+
+    _apply_migration(tmp_path, db_path)
+
+    for since in ('2025-12-01', '2026-01-02', '2026-01-05', '2026-02-01', '2026-03-01'):
+        assert (conn.execute(ROLLUP_SQL, (since,)).fetchall()
+                == conn.execute(HISTORY_SQL, (since,)).fetchall()), since
+
+    by_alliance = conn.execute('''
+        SELECT alliance_id, rules, SUM(games) FROM game_counts_daily
+        GROUP BY alliance_id, rules ORDER BY alliance_id, rules
+    ''').fetchall()
+    assert by_alliance == [
+        (0, '', 1), (0, 'wh40k', 1),
+        (1, 'killteam', 1), (1, 'wh40k', 1),
+        (2, '', 1), (2, 'killteam', 1), (2, 'wh40k', 2),
+    ]
+    assert conn.execute('SELECT battle_id FROM game_counts_battles ORDER BY battle_id').fetchall() == [
+        (1,), (3,), (6,), (7,)
+    ]
+
+
+def test_confirming_a_battle_twice_counts_it_once(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'games.db')
+    conn = _create_history(db_path)
+    _apply_migration(tmp_path, db_path)
+    conn.executescript('''
+        INSERT INTO mission_stack VALUES (1, 'killteam', 2, '2026-03-01');
+        INSERT INTO battles VALUES (1, 1);
+        INSERT INTO battle_attenders VALUES (1, 10), (1, 11);
+    ''')
+    monkeypatch.setattr(sqllite_helper, 'DATABASE_PATH', db_path)
+
+    async def confirm_twice():
+        await sqllite_helper.complete_mission(1, 1)
+        await sqllite_helper.complete_mission(1, 1)
+
+    asyncio.run(confirm_twice())
+    assert conn.execute('SELECT status FROM mission_stack').fetchone() == (3,)
+    assert conn.execute(
+        'SELECT telegram_id, games FROM game_counts_daily ORDER BY telegram_id'
+    ).fetchall() == [(10, 1), (11, 1)]
+
+    asyncio.run(sqllite_helper.rebuild_game_counts())
+    assert conn.execute(
+        'SELECT telegram_id, games FROM game_counts_daily ORDER BY telegram_id'
+    ).fetchall() == [(10, 1), (11, 1)]
+    assert conn.execute('SELECT battle_id FROM game_counts_battles').fetchall() == [(1,)]
@@ -0,0 +1,61 @@
+"""
+Tests for the bulk planet generator (database/generate_planet.py).
+"""
+import os
+import sys
+import sqlite3
+import time
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+sys.path.insert(0, os.path.abspath(os.path.join(MODULE_DIR, 'database')))
+
+import generate_planet  # noqa: E402
+import hex_graph  # noqa: E402
+
+
+def test_seeded_planet_is_reproducible_and_consistent():
+    hexes, edges = generate_planet.build_planet(3, [1, 2], seed=42)
+    assert generate_planet.build_planet(3, [1, 2], seed=42) == (hexes, edges)
+    assert generate_planet.build_planet(3, [1, 2], seed=43) != (hexes, edges)
+
+    assert len(hexes) == 1 + 3 * 3 * 4
+    assert hexes[0][5:] == (0, 0)
+    assert len({row[5:] for row in hexes}) == len(hexes)
+    # Ring 1 starts south-west of the centre, like the map renderer expects.
+    assert hexes[1][5:] == (-1, 1)
+
+    from_coordinates = {
+        tuple(sorted(edge))
+        for edge in hex_graph.coordinate_edges((row[0], row[5], row[6]) for row in hexes)
+    }
+    assert {(left, right) for _, left, right in edges} == from_coordinates
+    assert [edge[0] for edge in edges] == list(range(1, len(edges) + 1))
+
+
+def test_large_planet_is_written_in_one_pass(tmp_path):
+    db_path = str(tmp_path / 'planet.db')
+    conn = sqlite3.connect(db_path)
+    conn.executescript('''
+        CREATE TABLE map (id INTEGER PRIMARY KEY, planet_id INTEGER, state TEXT,
+                          patron INTEGER, has_warehouse INTEGER DEFAULT 0, q INTEGER, r INTEGER);
+        CREATE TABLE edges (id INTEGER PRIMARY KEY, left_hexagon INTEGER,
+                            right_hexagon INTEGER, state INTEGER);
+        CREATE TABLE alliances (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE warmasters (telegram_id TEXT, alliance INTEGER);
+        INSERT INTO alliances VALUES (1, 'A'), (2, 'B');
+    ''')
+    conn.executemany('INSERT INTO warmasters VALUES (?, 1)', [(str(i),) for i in range(50)])
+    conn.commit()
+
+    start = time.perf_counter()
+    hexes, edges = generate_planet.generate_map_and_edges(db_path, seed=1)
+    elapsed = time.perf_counter() - start
+    # Regenerating replaces the previous map.
+    generate_planet.generate_map_and_edges(db_path, seed=1, clear=True)
+
+    assert (hexes, edges) == (7651, 22650)
+    assert conn.execute('SELECT COUNT(*) FROM map').fetchone()[0] == hexes
+    assert conn.execute('SELECT COUNT(*) FROM edges').fetchone()[0] == edges
+    assert elapsed < 5
+    conn.close()
@@ -0,0 +1,60 @@
+"""
+Tests for the in-memory hex graph used by map queries.
+"""
+import os
+import sys
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+import hex_graph  # noqa: E402
+from hex_graph import HexGraph  # noqa: E402
+
+
+def _line_graph():
+    # 1 - 2 - 3 - 4, warehouse on 4
+    cells = [(1, 1, 0), (2, 1, 0), (3, 2, 0), (4, 1, 1)]
+    edges = [(1, 2), (2, 3), (3, 4)]
+    return HexGraph(cells, edges)
+
+
+def test_route_to_warehouse_follows_patron_hexes():
+    graph = _line_graph()
+    assert graph.has_route_to_warehouse(4, 1) is True
+    assert graph.has_route_to_warehouse(1, 1) is False
+    graph.set_patron(3, 1)
+    assert graph.has_route_to_warehouse(1, '1') is True
+
+
+def test_set_patron_matches_integer_patrons():
+    graph = _line_graph()
+    graph.set_patron(3, '1')  # patrons arrive as text from callback data
+    assert graph.neighbours_with_patron(2, 1) == [1, 3]
+    assert graph.has_route_to_warehouse(1, 1) is True
+
+
+def test_neighbour_queries():
+    graph = _line_graph()
+    assert graph.safe_neighbour_count(2) == 1
+    assert graph.neighbours_with_patron(3, 1) == [2, 4]
+    assert sorted(graph.adjacent_between(1, 2)) == [3]
+    assert graph.neighbours_with_patron(99, 1) == []
+
+
+def test_unknown_cell_update_requests_reload():
+    graph = _line_graph()
+    assert graph.set_warehouse(1, True) is True
+    assert graph.has_route_to_warehouse(2, 1) is True
+    assert graph.set_patron(99, 1) is False
+
+
+def test_coordinate_edges_match_neighbour_offsets():
+    # Centre hex 1 with its ring: every ring hex touches the centre and two others.
+    cells = [(1, 0, 0)] + [
+        (i + 2, q, r) for i, (q, r) in enumerate(hex_graph.axial_neighbours(0, 0))
+    ]
+    edges = {tuple(sorted(edge)) for edge in hex_graph.coordinate_edges(cells)}
+    assert len(edges) == 12
+    graph = HexGraph([(cell_id, 1, 0) for cell_id, _, _ in cells], edges)
+    assert graph.neighbours_of(1) == [2, 3, 4, 5, 6, 7]
+    assert graph.neighbours_of(2) == [1, 3, 7]
@@ -0,0 +1,46 @@
+"""
+Tests for the preloaded localization catalog.
+"""
+import os
+import sys
+import asyncio
+import types
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+import localization  # noqa: E402
+import mock_sqlite_helper  # noqa: E402
+
+
+def test_text_falls_back_to_russian_and_formats():
+    async def run():
+        localization.clear_cache()
+        text = await localization.get_text(
+            'alliance_resources_message', 'en', alliance_name='A', resources=3)
+        missing = await localization.get_text('no_such_key', 'en')
+        return text, missing
+
+    text, missing = asyncio.run(run())
+    assert text == 'Ресурсы альянса A: 3'
+    assert missing == '[no_such_key]'
+
+
+def test_update_text_invalidates_catalog():
+    async def run():
+        localization.clear_cache()
+        before = await localization.get_text('main_menu', 'en')
+        await mock_sqlite_helper.add_or_update_text('main_menu', 'en', 'Main menu')
+        after = await localization.get_text('main_menu', 'en')
+        return before, after
+
+    try:
+        before, after = asyncio.run(run())
+    finally:
+        mock_sqlite_helper.MOCK_TEXT_OVERRIDES.pop(('main_menu', 'en'), None)
+        localization.clear_cache()
+    assert before == 'Главное меню (тест)'
+    assert after == 'Main menu'
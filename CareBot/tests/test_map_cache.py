@@ -0,0 +1,38 @@
+"""
+Tests for the on-disk map export cache.
+"""
+import os
+import sys
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+from map_cache import MapDiskCache  # noqa: E402
+
+
+def test_put_then_get_round_trips(tmp_path):
+    cache = MapDiskCache(str(tmp_path / 'maps'), max_bytes=1024)
+    assert cache.get('abc') is None
+    cache.put('abc', b'png-bytes')
+    assert cache.get('abc') == b'png-bytes'
+    assert os.listdir(tmp_path / 'maps') == ['abc.png']
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = MapDiskCache(str(tmp_path), max_bytes=1024)
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, b'x' * 100)
+        os.utime(tmp_path / f'{key}.png', (1000 + i, 1000 + i))
+    # Only two fit; 'a' was written first but read most recently.
+    assert cache.get('a') == b'x' * 100
+    cache.max_bytes = 250
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ['a.png', 'c.png']
+
+
+def test_unwritable_directory_is_a_miss(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_bytes(b'')
+    cache = MapDiskCache(str(blocker / 'maps'))
+    cache.put('abc', b'png-bytes')
+    assert cache.get('abc') is None
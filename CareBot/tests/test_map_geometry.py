@@ -0,0 +1,59 @@
+"""
+Tests for the vectorized hex geometry used by the map renderer.
+"""
+import os
+import sys
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+import matplotlib  # noqa: E402
+matplotlib.use('Agg')
+
+import map_exporter  # noqa: E402
+
+
+def _ring_walk(hex_count):
+    coords = [(0, 0)]
+    radius = 1
+    while len(coords) < hex_count:
+        dq, dr = map_exporter._HEX_DIRECTIONS[4]
+        q, r = dq * radius, dr * radius
+        for dq, dr in map_exporter._HEX_DIRECTIONS:
+            for _ in range(radius):
+                coords.append((q, r))
+                q += dq
+                r += dr
+        radius += 1
+    return coords[:hex_count]
+
+
+def test_axial_coordinates_match_ring_walk():
+    for hex_count in (1, 7, 8, 37, 500):
+        coords = [tuple(c) for c in map_exporter._axial_coordinates(hex_count).tolist()]
+        assert coords == _ring_walk(hex_count)
+
+
+def test_neighbour_index_is_symmetric():
+    cells = [(i, 'Пустыня', None, 0) for i in range(1, 20)]
+    scene = map_exporter._MapScene(cells, [])
+    neighbours = scene.neighbour_index()
+    assert (neighbours[0] >= 0).all()
+    # Direction k is opposite direction (k + 3) % 6.
+    for i, row in enumerate(neighbours):
+        for k, j in enumerate(row):
+            if j >= 0:
+                assert neighbours[j][(k + 3) % 6] == i
+
+
+def test_stored_coordinates_replace_the_ring_layout():
+    # Ids that do not follow the ring order, placed by their stored q/r.
+    coords = _ring_walk(7)
+    cells = [(100 - i, 'Пустыня', None, 0, q, r) for i, (q, r) in enumerate(coords)]
+    scene = map_exporter._MapScene(cells, [])
+    by_id = {row[0]: tuple(axial) for row, axial in zip(scene.ordered_cells, scene.axial.tolist())}
+    assert by_id == {100 - i: coord for i, coord in enumerate(coords)}
+
+    # Rows without coordinates fall back to the ring layout.
+    scene = map_exporter._MapScene([row[:4] for row in cells], [])
+    assert [tuple(c) for c in scene.axial.tolist()] == coords
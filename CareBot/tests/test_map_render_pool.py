@@ -0,0 +1,41 @@
+"""
+Tests for coalescing and backpressure in the map render pool.
+"""
+import os
+import sys
+import asyncio
+
+import pytest
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+import map_render_pool  # noqa: E402
+
+CELLS = [(i, 'Пустыня', 1 if i % 2 else None, 0) for i in range(1, 20)]
+
+
+def test_same_state_shares_one_job_and_queue_is_bounded():
+    pool = map_render_pool.MapRenderPool(max_workers=1, max_pending=1)
+
+    async def run():
+        first = pool.render('state-a', CELLS, [], {})
+        second = pool.render('state-a', CELLS, [], {})
+        return await asyncio.gather(first, second)
+
+    try:
+        job = pool.submit('state-a', CELLS, [], {})
+        with pytest.raises(map_render_pool.MapRenderBusyError):
+            pool.submit('state-b', CELLS, [], {})
+        first, second = asyncio.run(run())
+        assert job.done()
+    finally:
+        pool.shutdown()
+
+    assert first == second
+    assert first.startswith(b'\x89PNG')
+    metrics = pool.metrics()
+    assert metrics['submitted'] == 1
+    assert metrics['coalesced'] == 2
+    assert metrics['rejected'] == 1
+    assert metrics['completed'] == 1
@@ -0,0 +1,85 @@
+"""
+Tests for the pre-generated mission pool.
+"""
+import os
+import sys
+import asyncio
+import datetime
+import sqlite3
+import types
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+import mission_pool  # noqa: E402
+import mock_sqlite_helper  # noqa: E402
+import sqllite_helper  # noqa: E402
+
+
+def _generate(rules):
+    return ('Deploy', rules, None, f'{rules} mission', None, None)
+
+
+def test_claims_hit_and_refill_below_low_water(monkeypatch):
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_MISSIONS', {})
+    pool = mission_pool.MissionPool(_generate, rules=['killteam'], target=3, low_water=2)
+
+    async def run():
+        await pool.refill_all()
+        first = await pool.claim('killteam')
+        await asyncio.sleep(0)  # 2 left: no refill
+        after_first = await mock_sqlite_helper.count_available_missions('killteam')
+        await pool.claim('killteam')
+        await asyncio.gather(*pool._refills.values())  # 1 left: topped up to 3
+        after_second = await mock_sqlite_helper.count_available_missions('killteam')
+        return first, after_first, after_second
+
+    first, after_first, after_second = asyncio.run(run())
+    assert first.rules == 'killteam' and first.status == 1
+    assert (after_first, after_second) == (2, 3)
+    assert (pool.hits, pool.misses, pool.generated) == (2, 0, 5)
+
+
+def test_unknown_ruleset_is_generated_on_first_claim(monkeypatch):
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_MISSIONS', {})
+    pool = mission_pool.MissionPool(_generate, rules=[], target=2, low_water=1)
+
+    async def run():
+        mission = await pool.claim('battlefleet')
+        await asyncio.gather(*pool._refills.values())
+        return mission
+
+    mission = asyncio.run(run())
+    assert mission.rules == 'battlefleet'
+    assert pool.misses == 1 and pool.rules == ('battlefleet',)
+
+
+def test_mission_generated_yesterday_stays_claimed_after_expiry_sweep(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'missions.db')
+    yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE mission_stack (id INTEGER PRIMARY KEY AUTOINCREMENT, deploy TEXT,
+            rules TEXT, cell INTEGER, mission_description TEXT, winner_bonus TEXT,
+            status INTEGER DEFAULT 0, created_date TEXT, map_description TEXT,
+            reward_config TEXT)
+    ''')
+    conn.execute("INSERT INTO mission_stack (deploy, rules, mission_description, status, created_date) "
+                 "VALUES ('Deploy', 'killteam', 'pooled', 0, ?)", (yesterday,))
+    conn.commit()
+    monkeypatch.setattr(sqllite_helper, 'DATABASE_PATH', db_path)
+    monkeypatch.setattr(mission_pool, 'sqllite_helper', sqllite_helper)
+    pool = mission_pool.MissionPool(_generate, rules=['killteam'], target=1, low_water=0)
+
+    async def run():
+        mission = await pool.claim('killteam')
+        await asyncio.gather(*pool._refills.values())
+        return mission, await sqllite_helper.unlock_expired_missions()
+
+    mission, unlocked = asyncio.run(run())
+    assert mission.created_date == datetime.date.today().isoformat()
+    assert unlocked == 0
+    assert conn.execute('SELECT status FROM mission_stack').fetchall() == [(1,)]
@@ -0,0 +1,67 @@
+"""
+Tests for concurrent, rate-limited notification delivery.
+"""
+import os
+import sys
+import asyncio
+import time
+import types
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+from telegram.error import Forbidden, RetryAfter  # noqa: E402
+
+import notification_service  # noqa: E402
+from notification_dispatcher import Delivery, NotificationDispatcher  # noqa: E402
+
+
+class FakeBot:
+    def __init__(self, errors=None):
+        self.errors = dict(errors or {})
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        error = self.errors.pop(chat_id, None)
+        if error is not None:
+            raise error
+        self.sent.append((chat_id, text, time.monotonic()))
+
+
+def test_retries_flood_control_and_skips_blocked_chats():
+    bot = FakeBot({1: RetryAfter(0), 2: Forbidden('bot was blocked by the user')})
+    dispatcher = NotificationDispatcher(global_rate=1000, per_chat_interval=0)
+    deliveries = [Delivery(chat, 'send_message', {'text': 'hi'}) for chat in (1, 2, 3)]
+
+    stats = asyncio.run(dispatcher.send(bot, deliveries, 'test'))
+
+    assert sorted(chat for chat, _, _ in bot.sent) == [1, 3]
+    assert (stats.sent, stats.failed, stats.retries) == (2, 1, 1)
+    assert dispatcher.metrics()[-1]['name'] == 'test'
+
+
+def test_messages_to_one_chat_are_spaced():
+    bot = FakeBot()
+    dispatcher = NotificationDispatcher(global_rate=1000, per_chat_interval=0.05)
+    deliveries = [Delivery(7, 'send_message', {'text': str(i)}) for i in range(3)]
+
+    asyncio.run(dispatcher.send(bot, deliveries))
+
+    times = [sent_at for _, _, sent_at in bot.sent]
+    assert all(b - a >= 0.045 for a, b in zip(times, times[1:]))
+
+
+def test_game_notification_rendered_per_recipient_language(monkeypatch):
+    bot = FakeBot()
+    monkeypatch.setattr(notification_service, 'dispatcher',
+                        NotificationDispatcher(global_rate=1000, per_chat_interval=0))
+    context = types.SimpleNamespace(bot=bot)
+
+    asyncio.run(notification_service.notify_players_about_game(
+        context, '325313837', 'Mon Oct 19 00:00:00 2026', 'killteam'))
+
+    recipients = {chat for chat, _, _ in bot.sent}
+    assert recipients and '325313837' not in recipients
@@ -0,0 +1,71 @@
+"""
+Tests for the per-update warmaster cache.
+"""
+import os
+import sys
+import asyncio
+import types
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+import request_cache  # noqa: E402
+
+
+def _counting_lookup(calls):
+    @request_cache.memoize('settings')
+    async def lookup(telegram_id):
+        calls.append(telegram_id)
+        return ('nick', None, 'ru', 1)
+    return lookup
+
+
+def test_lookups_are_memoized_within_update():
+    calls = []
+    lookup = _counting_lookup(calls)
+
+    async def run():
+        context = types.SimpleNamespace()
+        update = types.SimpleNamespace(update_id=1)
+        await request_cache.begin_update(update, context)
+        await lookup(123)
+        await lookup('123')
+        await lookup(456)
+        cache = context.warmaster_cache
+        await request_cache.end_update(update, context)
+        return cache
+
+    cache = asyncio.run(run())
+    assert calls == [123, 456]
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_invalidate_forces_reload():
+    calls = []
+    lookup = _counting_lookup(calls)
+
+    async def run():
+        request_cache.activate()
+        await lookup(123)
+        request_cache.invalidate(123)
+        await lookup(123)
+        request_cache.deactivate()
+
+    asyncio.run(run())
+    assert calls == [123, 123]
+
+
+def test_no_cache_outside_update():
+    calls = []
+    lookup = _counting_lookup(calls)
+
+    async def run():
+        await lookup(123)
+        await lookup(123)
+
+    asyncio.run(run())
+    assert calls == [123, 123]
@@ -0,0 +1,111 @@
+"""
+Load test for update_processor: replays a burst of synthetic updates from
+many users and checks that users run in parallel while each user's updates
+stay in order.
+"""
+import os
+import sys
+import asyncio
+import random
+import time
+import types
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+from telegram import Update  # noqa: E402
+
+import update_processor  # noqa: E402
+
+USERS = 40
+UPDATES_PER_USER = 10
+HANDLER_SECONDS = 0.01
+
+
+def _update(update_id, user_id):
+    return Update.de_json({
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'chat_instance': str(user_id),
+            'data': f'step_{update_id}',
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'Player'},
+        },
+    }, None)
+
+
+def _burst():
+    """Updates of all users interleaved, as they arrive during a busy minute."""
+    updates = [_update(0, 0)]
+    pending = {user: UPDATES_PER_USER for user in range(1, USERS + 1)}
+    rng = random.Random(19)
+    while pending:
+        user = rng.choice(sorted(pending))
+        updates.append(_update(len(updates), user))
+        pending[user] -= 1
+        if not pending[user]:
+            del pending[user]
+    return updates[1:]
+
+
+def test_burst_runs_users_in_parallel_and_each_user_in_order():
+    updates = _burst()
+    seen = {}
+    running = set()
+    overlap = []
+    peak = [0]
+
+    async def handle(update):
+        user = update.effective_user.id
+        if user in running:
+            overlap.append(update.update_id)
+        running.add(user)
+        peak[0] = max(peak[0], len(running))
+        await asyncio.sleep(HANDLER_SECONDS * random.random() * 2)
+        seen.setdefault(user, []).append(update.update_id)
+        running.discard(user)
+
+    async def replay():
+        processor = update_processor.KeyedUpdateProcessor(concurrency=16)
+        async with processor:
+            # Application creates one task per update, in arrival order.
+            tasks = [asyncio.create_task(processor.process_update(u, handle(u))) for u in updates]
+            await asyncio.gather(*tasks)
+            return processor.metrics()
+
+    start = time.perf_counter()
+    metrics = asyncio.run(replay())
+    elapsed = time.perf_counter() - start
+
+    assert not overlap
+    expected = {}
+    for update in updates:
+        expected.setdefault(update.effective_user.id, []).append(update.update_id)
+    assert seen == expected
+    assert metrics['processed'] == len(updates)
+    assert metrics['busy_keys'] == 0
+    assert peak[0] > 1
+    # Sequential processing would take about len(updates) * HANDLER_SECONDS.
+    assert elapsed < len(updates) * HANDLER_SECONDS / 3
+
+
+def test_exclusive_handlers_run_one_at_a_time():
+    active = []
+    peak = [0]
+
+    @update_processor.exclusive
+    async def change_alliance(update, context):
+        active.append(update)
+        peak[0] = max(peak[0], len(active))
+        await asyncio.sleep(0.01)
+        active.remove(update)
+        return update
+
+    async def run():
+        return await asyncio.gather(*(change_alliance(i, None) for i in range(5)))
+
+    assert asyncio.run(run()) == list(range(5))
+    assert peak[0] == 1
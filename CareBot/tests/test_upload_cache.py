@@ -0,0 +1,75 @@
+"""
+Tests for reusing Telegram file_ids of uploaded photos.
+"""
+import os
+import sys
+import asyncio
+import types
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+from telegram.error import BadRequest  # noqa: E402
+
+import mock_sqlite_helper  # noqa: E402
+import upload_cache  # noqa: E402
+
+
+class FakeChat:
+    def __init__(self, rejected=()):
+        self.rejected = set(rejected)
+        self.uploads = 0
+        self.sent = []
+
+    async def send_photo(self, photo, caption=None):
+        if isinstance(photo, str):
+            if photo in self.rejected:
+                raise BadRequest('Wrong file identifier/http url specified')
+        else:
+            self.uploads += 1
+            photo = f'file-{self.uploads}'
+        self.sent.append(photo)
+        return types.SimpleNamespace(photo=[types.SimpleNamespace(file_id=photo)])
+
+
+async def _load():
+    return b'png'
+
+
+def _send(chat, key, kind=upload_cache.DEPLOY_KIND):
+    return upload_cache.send_photo(chat.send_photo, key, kind, _load, caption='x')
+
+
+def test_second_send_reuses_file_id(monkeypatch):
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_FILE_CACHE', {})
+    upload_cache.clear_cache()
+    chat = FakeChat()
+
+    async def run():
+        await _send(chat, 'deploy:a.jpg:1')
+        await _send(chat, 'deploy:a.jpg:1')
+        upload_cache.clear_cache()  # restart: ids come back from the database
+        await _send(chat, 'deploy:a.jpg:1')
+
+    asyncio.run(run())
+    assert chat.uploads == 1
+    assert chat.sent == ['file-1'] * 3
+
+
+def test_rejected_file_id_is_uploaded_again_and_old_maps_dropped(monkeypatch):
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_FILE_CACHE', {})
+    upload_cache.clear_cache()
+    chat = FakeChat(rejected={'file-1'})
+
+    async def run():
+        await _send(chat, upload_cache.map_key('h1'), upload_cache.MAP_KIND)
+        await _send(chat, upload_cache.map_key('h1'), upload_cache.MAP_KIND)
+        return await upload_cache.known_map_hashes()
+
+    known = asyncio.run(run())
+    assert chat.uploads == 2
+    assert known == {'h1'}
+    assert mock_sqlite_helper.MOCK_FILE_CACHE == {'map:h1': ('map', 'file-2')}
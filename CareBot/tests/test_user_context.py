@@ -0,0 +1,53 @@
+"""
+Tests for building the menus from one user context read.
+"""
+import os
+import sys
+import asyncio
+import types
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+import keyboard_constructor  # noqa: E402
+import mock_sqlite_helper  # noqa: E402
+
+
+def _callbacks(menu):
+    return [row[0].callback_data for row in menu]
+
+
+def test_main_menu_needs_one_user_read(monkeypatch):
+    calls = []
+    original = mock_sqlite_helper.get_user_context
+
+    async def counting(user_id):
+        calls.append(user_id)
+        return await original(user_id)
+
+    async def unexpected(*args, **kwargs):
+        raise AssertionError("menu must be built from the user context")
+
+    monkeypatch.setattr(mock_sqlite_helper, 'get_user_context', counting)
+    for name in ('get_settings', 'get_alliance_of_warmaster', 'is_user_admin'):
+        monkeypatch.setattr(mock_sqlite_helper, name, unexpected)
+
+    menu = asyncio.run(keyboard_constructor.get_main_menu('325313837'))
+
+    assert calls == ['325313837']
+    assert _callbacks(menu) == [
+        'missions', 'games', 'alliance_resources', 'admin_menu', 'setting']
+
+
+def test_unknown_user_gets_settings_only():
+    async def run():
+        main = await keyboard_constructor.get_main_menu('no-such-user')
+        settings = await keyboard_constructor.setting('no-such-user')
+        return main, settings
+
+    main, settings = asyncio.run(run())
+    assert _callbacks(main) == ['setting']
+    assert _callbacks(settings) == ['requestsetname', 'back_to_main']
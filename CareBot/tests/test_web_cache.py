@@ -0,0 +1,74 @@
+"""
+Tests for the web response cache and keyset-paged battle lists.
+"""
+import os
+import sys
+import asyncio
+import types
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+os.environ['CAREBOT_TEST_MODE'] = 'true'
+sys.modules.setdefault("config", types.SimpleNamespace(TEST_MODE=True))
+
+import mock_sqlite_helper  # noqa: E402
+import web_cache  # noqa: E402
+
+
+def test_cache_expires_and_is_cleared_by_writes(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(web_cache.time, 'monotonic', lambda: now[0])
+    cache = web_cache.TTLCache(ttl=10)
+
+    cache.put('page', ['a'], cache.generation)
+    assert cache.get('page') == ['a']
+    now[0] += 11
+    assert cache.get('page') is None
+
+    cache.put('page', ['a'], cache.generation)
+    cache.clear()
+    assert cache.get('page') is None
+
+
+def test_result_built_before_a_write_is_not_stored():
+    cache = web_cache.TTLCache(ttl=10)
+    generation = cache.generation
+    cache.clear()  # a battle changed while the page was being loaded
+    cache.put('page', ['stale'], generation)
+    assert cache.get('page') is None
+
+
+def test_oldest_entry_is_dropped_when_full():
+    cache = web_cache.TTLCache(ttl=10, max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, key, cache.generation)
+    assert cache.get('a') is None
+    assert cache.get('b') == 'b' and cache.get('c') == 'c'
+
+
+def test_battle_pages_cover_every_battle_once(monkeypatch):
+    missions = {}
+    battles = {}
+    attenders = {}
+    for mission_id in range(1, 12):
+        # Two missions without a date, several on the same day.
+        created = None if mission_id <= 2 else f"2026-01-{mission_id // 3:02d}"
+        missions[mission_id] = {'status': 3, 'rules': 'wh40k', 'created_date': created}
+        battles[mission_id] = {'mission_id': mission_id, 'fstplayer': 1, 'sndplayer': 0}
+        attenders[mission_id] = ['325313837', '123456789']
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_MISSIONS', missions)
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_BATTLES', battles)
+    monkeypatch.setattr(mock_sqlite_helper, 'MOCK_BATTLE_ATTENDERS', attenders)
+
+    async def walk():
+        seen, cursor = [], None
+        while True:
+            page = await mock_sqlite_helper.get_battles_page(3, limit=4, cursor=cursor)
+            seen += [battle['mission_id'] for battle in page['battles']]
+            cursor = page['next_cursor']
+            if cursor is None:
+                return seen
+
+    seen = asyncio.run(walk())
+    assert seen == [11, 10, 9, 8, 7, 6, 5, 4, 3, 2, 1]
@@ -0,0 +1,43 @@
+"""
+Tests for the shared event loop used by the Flask views.
+"""
+import os
+import sys
+import asyncio
+import contextvars
+import threading
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot')
+sys.path.insert(0, os.path.abspath(MODULE_DIR))
+
+import web_loop  # noqa: E402
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+async def _describe():
+    return asyncio.get_running_loop(), request_id.get()
+
+
+def test_requests_share_one_loop_and_keep_caller_context():
+    request_id.set('req-1')
+    first_loop, seen = web_loop.run(_describe())
+    second_loop, _ = web_loop.run(_describe())
+    assert first_loop is second_loop
+    assert seen == 'req-1'
+
+
+def test_attached_loop_takes_over():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        web_loop.attach(loop)
+        used_loop, _ = web_loop.run(_describe())
+        assert used_loop is loop
+    finally:
+        web_loop.detach(loop)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+    assert web_loop.run(_describe())[0] is not loop
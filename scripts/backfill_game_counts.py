@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Rebuild the daily game count rollup from the battle history.
+
+game_counts_daily (migration 033) is filled by the migration and then kept
+current as results are confirmed. This rebuilds it from scratch in one
+transaction, e.g. after results were edited by hand. Backfilled games count
+for the alliance each player is in now.
+
+Usage:
+    python scripts/backfill_game_counts.py [--database PATH]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+MODULE_DIR = os.path.join(os.path.dirname(__file__), '..', 'CareBot', 'CareBot')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database', default=os.environ.get('DATABASE_PATH'),
+                        help='database to rebuild (default: $DATABASE_PATH)')
+    args = parser.parse_args()
+    if not args.database or not os.path.exists(args.database):
+        parser.error(f"database not found: {args.database}")
+
+    os.environ['DATABASE_PATH'] = args.database
+    sys.path.insert(0, os.path.abspath(MODULE_DIR))
+    import sqllite_helper
+
+    rows = asyncio.run(sqllite_helper.rebuild_game_counts())
+    print(f"game_counts_daily rebuilt: {rows} rows")
+
+
+if __name__ == '__main__':
+    main()
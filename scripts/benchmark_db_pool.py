@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark per-call latency of sqllite_helper with and without db_pool.
+
+Builds a throwaway database shaped like production (warmasters, alliances,
+schedule, map) and times a typical "button press" mix of helper calls:
+settings lookup, alliance lookup, nickname lookup, a schedule count and an
+occasional language write.
+
+Usage:
+    python scripts/benchmark_db_pool.py [--players 300] [--iterations 2000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'CareBot', 'CareBot'))
+
+import db_pool  # noqa: E402
+import sqllite_helper  # noqa: E402
+
+RULES = ['killteam', 'wh40k', 'battlefleet', 'boarding_action']
+
+
+def build_database(path, players, seed=42):
+    """Create a database with realistic row counts."""
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    cur = conn.cursor()
+    cur.executescript('''
+        CREATE TABLE alliances (name TEXT NOT NULL UNIQUE, id INTEGER PRIMARY KEY,
+                                common_resource INTEGER DEFAULT 0);
+        CREATE TABLE warmasters (id INTEGER PRIMARY KEY, telegram_id TEXT UNIQUE,
+                                 alliance INTEGER DEFAULT 0, nickname TEXT,
+                                 registered_as TEXT UNIQUE, faction TEXT,
+                                 language TEXT DEFAULT 'ru',
+                                 notifications_enabled INTEGER DEFAULT 1,
+                                 is_admin INTEGER DEFAULT 0);
+        CREATE TABLE schedule (id INTEGER PRIMARY KEY, date TEXT, rules TEXT,
+                               user_telegram TEXT NOT NULL, date_week INTEGER);
+        CREATE TABLE map (id INTEGER PRIMARY KEY, planet_id INTEGER, state TEXT,
+                          patron INTEGER, has_warehouse INTEGER DEFAULT 0);
+    ''')
+    cur.executemany('INSERT INTO alliances (id, name) VALUES (?, ?)',
+                    [(i, f'Alliance {i}') for i in range(1, 6)])
+    cur.executemany(
+        'INSERT INTO warmasters (telegram_id, alliance, nickname, registered_as, language) '
+        'VALUES (?, ?, ?, ?, ?)',
+        [(str(100000 + i), rnd.randint(1, 5), f'player{i}', f'+7900{i:07d}',
+          rnd.choice(['ru', 'en'])) for i in range(players)])
+    cur.executemany(
+        'INSERT INTO schedule (date, rules, user_telegram, date_week) VALUES (?, ?, ?, ?)',
+        [(f'2025-01-{rnd.randint(1, 28):02d}', rnd.choice(RULES),
+          str(100000 + rnd.randrange(players)), rnd.randint(1, 4))
+         for _ in range(players * 10)])
+    hexes = players * 20
+    cur.executemany(
+        'INSERT INTO map (id, planet_id, state, patron) VALUES (?, 1, ?, ?)',
+        [(i, 'Город', rnd.randint(1, 5)) for i in range(1, hexes + 1)])
+    conn.commit()
+    conn.close()
+
+
+async def one_interaction(rnd, players):
+    user_id = str(100000 + rnd.randrange(players))
+    await sqllite_helper.get_settings(user_id)
+    await sqllite_helper.get_alliance_of_warmaster(user_id)
+    await sqllite_helper.get_nicknamane(user_id)
+    await sqllite_helper.get_daily_rule_participant_count(
+        rnd.choice(RULES), f'2025-01-{rnd.randint(1, 28):02d}')
+    if rnd.random() < 0.1:
+        await sqllite_helper.set_language(user_id, rnd.choice(['ru', 'en']))
+
+
+async def run(players, iterations, pooled, concurrency):
+    rnd = random.Random(7)
+    if pooled:
+        await db_pool.init_pool(sqllite_helper.DATABASE_PATH)
+    timings = []
+
+    async def worker(count):
+        for _ in range(count):
+            start = time.perf_counter()
+            await one_interaction(rnd, players)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    try:
+        started = time.perf_counter()
+        per_worker = iterations // concurrency
+        await asyncio.gather(*(worker(per_worker) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        if pooled:
+            await db_pool.close_pool()
+    return timings, elapsed
+
+
+def report(label, timings, elapsed):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<10} interactions={len(timings):<6} "
+          f"mean={statistics.mean(timings):.3f}ms "
+          f"median={statistics.median(timings):.3f}ms "
+          f"p95={p95:.3f}ms "
+          f"throughput={len(timings) / elapsed:.0f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--players', type=int, default=300)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'benchmark.db')
+        build_database(path, args.players)
+        sqllite_helper.DATABASE_PATH = path
+
+        for label, pooled in (('connect', False), ('pooled', True)):
+            timings, elapsed = asyncio.run(
+                run(args.players, args.iterations, pooled, args.concurrency))
+            report(label, timings, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark map PNG render time as the planet grows.
+
+Generates random planets (terrain, patrons, warehouses) and times a full
+render_realistic_map_png plus an IncrementalMapRenderer re-render after a
+single patron change, so scaling regressions show up per map size.
+
+Usage:
+    python scripts/benchmark_map_render.py [--sizes 100 500 2000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'CareBot', 'CareBot'))
+
+import matplotlib  # noqa: E402
+matplotlib.use('Agg')
+
+import map_exporter  # noqa: E402
+
+ALLIANCES = [(1, 'Alliance 1', None), (2, 'Alliance 2', None),
+             (3, 'Alliance 3', '#00838F'), (4, 'Alliance 4', None)]
+
+
+def build_cells(hexes, seed=42):
+    rnd = random.Random(seed)
+    terrains = list(map_exporter.TERRAIN_STYLES)
+    return [
+        (i, rnd.choice(terrains), rnd.choice([None, 1, 2, 3, 4]), int(rnd.random() < 0.05))
+        for i in range(1, hexes + 1)
+    ]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    png = func(*args)
+    return (time.perf_counter() - start) * 1000, len(png)
+
+
+def bench_size(hexes, repeat):
+    cells = build_cells(hexes)
+    full = [timed(map_exporter.render_realistic_map_png, cells, ALLIANCES) for _ in range(repeat)]
+
+    renderer = map_exporter.IncrementalMapRenderer()
+    renderer.render(cells, ALLIANCES)
+    rnd = random.Random(hexes)
+    incremental = []
+    for _ in range(repeat):
+        idx = rnd.randrange(hexes)
+        cell_id, state, _patron, has_warehouse = cells[idx]
+        cells[idx] = (cell_id, state, rnd.randint(1, 4), has_warehouse)
+        incremental.append(timed(renderer.render, cells, ALLIANCES))
+
+    return full, incremental
+
+
+def report(hexes, label, samples):
+    timings = [ms for ms, _ in samples]
+    print(f"hexes={hexes:<5} {label:<12} "
+          f"mean={statistics.mean(timings):8.1f}ms "
+          f"min={min(timings):8.1f}ms "
+          f"png={samples[-1][1] / 1024:.0f}KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for hexes in args.sizes:
+        full, incremental = bench_size(hexes, args.repeat)
+        report(hexes, 'full', full)
+        report(hexes, 'incremental', incremental)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Fail when a sqllite_helper query full-scans a large table.
+
+Collects every SQL statement passed to execute()/executemany() in
+sqllite_helper.py (string literals, f-strings, str.format templates and queries assembled
+with ``query += ...``), runs EXPLAIN QUERY PLAN for each one against a database
+with the current schema, and reports plan steps that SCAN one of
+LARGE_TABLES without an index. Interpolated parts are replaced by a single
+``?``. Statements referring to tables or columns missing from the database
+are reported as warnings: several deployments predate some columns.
+
+Functions that deliberately read a whole table (map export, hex graph
+load, ...) are listed in ALLOWED_FULL_SCANS with the reason.
+
+Usage:
+    python scripts/check_query_plans.py [--database PATH] [--verbose]
+
+Exit status is 1 if any unexpected full scan was found.
+"""
+import argparse
+import ast
+import os
+import re
+import sqlite3
+import sys
+
+HELPER_PATH = os.path.join(os.path.dirname(__file__), '..', 'CareBot', 'CareBot', 'sqllite_helper.py')
+
+# Tables that grow with players, games or map size.
+LARGE_TABLES = {
+    'schedule', 'battles', 'battle_attenders', 'map', 'edges', 'mission_stack',
+    'pending_results', 'map_story', 'warmasters',
+}
+
+# function -> tables it is expected to read in full, with the reason.
+ALLOWED_FULL_SCANS = {
+    'get_hex_graph': ({'map', 'edges'}, 'loads the whole map graph into memory'),
+    'get_map_cells_for_export': ({'map'}, 'exports every cell'),
+    'get_warmasters_with_nicknames': ({'warmasters'}, 'lists every player'),
+    'get_all_players': ({'warmasters'}, 'lists every player'),
+    'fix_mission_null_id': ({'mission_stack'}, 'legacy repair of rows without a rowid id'),
+}
+
+SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS \w+)?(?: USING (COVERING )?INDEX (\w+))?')
+
+
+def _sql_of(node, assignments):
+    """Best-effort SQL text for an AST expression, or None if unknown."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+            else:
+                parts.append('?')
+        return ''.join(parts)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left = _sql_of(node.left, assignments)
+        right = _sql_of(node.right, assignments)
+        if left is not None and right is not None:
+            return left + right
+        return None
+    if isinstance(node, ast.Name):
+        return assignments.get(node.id)
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == 'format'):
+        template = _sql_of(node.func.value, assignments)
+        if template is not None:
+            return re.sub(r'\{[^}]*\}', '?', template)
+    return None
+
+
+def _function_queries(func):
+    """Yield (lineno, sql) for execute calls inside one function."""
+    assignments = {}
+    nodes = sorted(
+        (n for n in ast.walk(func) if hasattr(n, 'lineno')),
+        key=lambda n: (n.lineno, n.col_offset),
+    )
+    for node in nodes:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            sql = _sql_of(node.value, assignments)
+            if sql is not None:
+                assignments[node.targets[0].id] = sql
+        elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+            base = assignments.get(node.target.id)
+            extra = _sql_of(node.value, assignments)
+            if base is not None and extra is not None:
+                assignments[node.target.id] = base + extra
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+              and node.func.attr in ('execute', 'executemany') and node.args):
+            sql = _sql_of(node.args[0], assignments)
+            yield node.lineno, sql
+
+
+def collect_queries(path=HELPER_PATH):
+    """Return [(function, lineno, sql_or_None)] for every execute call."""
+    with open(path, encoding='utf-8-sig') as f:
+        tree = ast.parse(f.read())
+    queries = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for lineno, sql in _function_queries(node):
+                queries.append((node.name, lineno, sql))
+    return queries
+
+
+def _parameter_count(sql):
+    # Drop string literals, then count positional placeholders.
+    return re.sub(r"'(?:[^']|'')*'", "''", sql).count('?')
+
+
+def full_scans(conn, sql):
+    """Return (table, detail) for plan steps scanning a large table without an index."""
+    rows = conn.execute('EXPLAIN QUERY PLAN ' + sql, [None] * _parameter_count(sql)).fetchall()
+    scans = []
+    for row in rows:
+        detail = row[-1]
+        match = SCAN_RE.match(detail)
+        if match and match.group(1) in LARGE_TABLES and not match.group(3):
+            scans.append((match.group(1), detail))
+    return scans
+
+
+def check(database, verbose=False):
+    conn = sqlite3.connect(f'file:{database}?mode=ro', uri=True)
+    problems = 0
+    for function, lineno, sql in collect_queries():
+        where = f'sqllite_helper.py:{lineno} {function}()'
+        if sql is None:
+            if verbose:
+                print(f'SKIP  {where}: query built dynamically')
+            continue
+        statement = sql.strip().split(None, 1)[0].upper() if sql.strip() else ''
+        if statement in ('PRAGMA', 'CREATE', 'ALTER', 'DROP', 'BEGIN', 'COMMIT'):
+            continue
+        try:
+            scans = full_scans(conn, sql)
+        except sqlite3.OperationalError as e:
+            if 'no such table' in str(e) or 'no such column' in str(e):
+                print(f'WARN  {where}: {e}')
+            else:
+                print(f'ERROR {where}: {e}')
+                problems += 1
+            continue
+        allowed_tables, reason = ALLOWED_FULL_SCANS.get(function, (set(), ''))
+        for table, detail in scans:
+            if table in allowed_tables:
+                if verbose:
+                    print(f'OK    {where}: {detail} ({reason})')
+                continue
+            print(f'SCAN  {where}: {detail}')
+            problems += 1
+        if verbose and not scans:
+            print(f'OK    {where}')
+    conn.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--database', default=os.environ.get('DATABASE_PATH'),
+                        help='database with the current schema (default: $DATABASE_PATH)')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    if not args.database or not os.path.exists(args.database):
+        parser.error('--database must point to an existing, migrated database')
+
+    problems = check(args.database, args.verbose)
+    if problems:
+        print(f'{problems} unexpected full scan(s)')
+        sys.exit(1)
+    print('No unexpected full scans')
+
+
+if __name__ == '__main__':
+    main()